@@ -1,13 +1,11 @@
 import argparse
 import sys
 
-import pandas as pd
-
-from .graph_routes import graph_locations
 from .input_data_generator import create_random_data_model_test
 from .quick_vrp import quick_vrp_from_df
+from .result_io import RESULT_FORMATS
 from .scheduled_vrp import ScheduledVRP
-from .solver import ModelType, graph_routes, run_solve_from_file
+from .solver import ModelType, run_solve_from_file
 from .test_data import get_test_data
 from .vrp_parameters import VRPParameters
 
@@ -31,6 +29,8 @@ def try_random(parameters: VRPParameters, n: int, param: int, show_output: bool)
     model = ScheduledVRP(data, parameters)
     res, routes = model.solve()
     if show_output:
+        from .graph_routes import graph_routes
+
         print(res)
         graph_routes(data, routes)
 
@@ -49,6 +49,8 @@ def try_all(
     show_output=False,
 ):
     """Run random models"""
+    import pandas as pd
+
     df = None
     for n in range(start_n, max_n + 1, 10):
         res, routes = try_random(parameters, n, param, show_output)
@@ -61,6 +63,8 @@ def try_all(
 
 def try_test(parameters: VRPParameters):
     """Solve the test data."""
+    from .graph_routes import graph_routes
+
     data = get_test_data()
     model = ScheduledVRP(data, parameters)
     res, routes = model.solve()
@@ -136,6 +140,69 @@ def get_args():
         action="store_true",
         help="Track the solver cost progress.",
     )
+    arg_parser.add_argument(
+        "--portfolio-workers",
+        "-pw",
+        default=None,
+        type=int,
+        help="Number of processes solving in parallel with different search strategies.",
+    )
+    arg_parser.add_argument(
+        "--initial-solution",
+        "-is",
+        default=None,
+        type=str,
+        help="Output file (json or npz) of a previous solve to start the search from.",
+    )
+    arg_parser.add_argument(
+        "--distance-cache",
+        "-dc",
+        default=None,
+        type=str,
+        help="Directory to cache the distance matrices.",
+    )
+    arg_parser.add_argument(
+        "--decomposition",
+        "-dm",
+        default=None,
+        choices=["sweep", "kmeans"],
+        help="Solve large order sets in geographic clusters, clustered by this method.",
+    )
+    arg_parser.add_argument(
+        "--cluster-size",
+        "-cs",
+        default=None,
+        type=int,
+        help="Maximum number of orders per cluster when decomposing.",
+    )
+    arg_parser.add_argument(
+        "--decomposition-workers",
+        "-dw",
+        default=None,
+        type=int,
+        help="Number of processes solving clusters in parallel when decomposing.",
+    )
+    arg_parser.add_argument(
+        "--estimate-fleet-size",
+        "-efs",
+        default=None,
+        action="store_true",
+        help="Create the model with the estimated number of vehicles instead of one per order.",
+    )
+    arg_parser.add_argument(
+        "--profile-phases",
+        "-pp",
+        default=None,
+        action="store_true",
+        help="Add the time and memory used per phase to the solver result.",
+    )
+    arg_parser.add_argument(
+        "--output-format",
+        "-of",
+        default=None,
+        choices=RESULT_FORMATS,
+        help="Format of the output file with the result.",
+    )
     arg_parser.add_argument(
         "--config",
         "-c",
@@ -159,6 +226,10 @@ def main():
         if not args.input:
             print("Error: an input csv file is required to show them on a graph.")
         else:
+            import pandas as pd
+
+            from .graph_routes import graph_locations
+
             df = pd.read_csv(args.input)
             graph_locations(df, args.output, True)
         sys.exit(0)
@@ -179,18 +250,38 @@ def main():
         vrp_parameters.courier_cost = args.courier_cost
     if args.track_solver_progress:
         vrp_parameters.track_solver_progress = args.track_solver_progress
+    if args.portfolio_workers:
+        vrp_parameters.n_portfolio_workers = args.portfolio_workers
+    if args.distance_cache:
+        vrp_parameters.distance_cache_dir = args.distance_cache
+    if args.estimate_fleet_size:
+        vrp_parameters.estimate_fleet_size = args.estimate_fleet_size
+    if args.profile_phases:
+        vrp_parameters.profile_phases = args.profile_phases
+    if args.output_format:
+        vrp_parameters.result_format = args.output_format
+    if args.decomposition:
+        vrp_parameters.decomposition = args.decomposition
+    if args.cluster_size:
+        vrp_parameters.decomposition_cluster_size = args.cluster_size
+    if args.decomposition_workers:
+        vrp_parameters.n_decomposition_workers = args.decomposition_workers
 
     print("VRP parameters:")
     print(vrp_parameters.to_str())
 
     if vrp_parameters.model_type == ModelType.quick:
+        import pandas as pd
+
         df = pd.read_csv(args.input)
         res = quick_vrp_from_df(df, vrp_parameters.max_calc_time, verbose=True)
         print("Results:")
         print(res)
     elif args.input:
         print(f"Input file: {args.input}")
-        run_solve_from_file(args.input, args.output, vrp_parameters)
+        run_solve_from_file(
+            args.input, args.output, vrp_parameters, initial_solution=args.initial_solution
+        )
     elif args.test:
         print("TEST")
         try_test(vrp_parameters)
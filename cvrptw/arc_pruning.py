@@ -0,0 +1,80 @@
+"""
+Find the arcs that can never be part of a feasible route of the ScheduledVRP and LiveVRP models,
+such that they can be removed from the model and the search does not evaluate moves using them.
+
+An arc from node i to j is infeasible if:
+- the earliest arrival at j (leaving i at the start of its time window) is after the time window
+  of j closes,
+- the latest arrival at j (leaving i at the end of its time window and waiting at most
+  allowed_waiting_time_at_del) is before the time window of j opens,
+- the travel time from the depot via i to j is more than max_delivery_time,
+- the items (weights) of i and j do not fit in the largest courier,
+- i is the delivery and j the pickup of the same order.
+Arcs from and to the depot are never pruned.
+"""
+
+from typing import List
+
+import numpy as np
+
+from .vrp_parameters import VRPParameters
+
+
+def infeasible_arcs(data: dict, parameters: VRPParameters) -> np.ndarray:
+    """Matrix with the infeasible arcs (from, to) of the data model."""
+    time_matrix = np.asarray(data["time_matrix"])
+    depot = data["depot"]
+    infeasible = np.zeros(time_matrix.shape, dtype=bool)
+
+    if "time_windows" in data:
+        time_windows = np.asarray(data["time_windows"])
+        infeasible |= time_windows[:, 0, None] + time_matrix > time_windows[None, :, 1]
+        infeasible |= (
+            time_windows[:, 1, None] + time_matrix + parameters.allowed_waiting_time_at_del
+            < time_windows[None, :, 0]
+        )
+
+    infeasible |= time_matrix[depot][:, None] + time_matrix > parameters.max_delivery_time
+
+    # the capacities can differ per vehicle (see fleet_size), an arc is only infeasible if it
+    # does not fit in the largest vehicle
+    items = np.asarray(data["number_of_items"])
+    item_capacity = max(data["courier_item_capacities"])
+    infeasible |= items[:, None] + items[None, :] > item_capacity
+    if "weights" in data:
+        weights = np.asarray(data["weights"])
+        weight_capacity = max(data["courier_weight_capacities"])
+        infeasible |= weights[:, None] + weights[None, :] > weight_capacity
+
+    if "pickups_deliveries" in data:
+        pickups, deliveries = np.array(data["pickups_deliveries"], dtype=np.int64).T
+        infeasible[deliveries, pickups] = True
+
+    infeasible[depot, :] = False
+    infeasible[:, depot] = False
+    np.fill_diagonal(infeasible, False)
+    return infeasible
+
+
+def prune_arcs(data: dict, parameters: VRPParameters) -> np.ndarray:
+    """
+    Find the infeasible arcs and store the feasible successors of each node in
+    `data["feasible_successors"]` (sparse adjacency lists) and the number of pruned arcs in
+    `data["filter"]`. Returns the infeasible arcs matrix.
+    """
+    infeasible = infeasible_arcs(data, parameters)
+    data["feasible_successors"] = feasible_successors(infeasible)
+    n_nodes = len(infeasible)
+    data.setdefault("filter", dict())
+    data["filter"]["n_arcs"] = n_nodes * (n_nodes - 1)
+    data["filter"]["n_pruned_arcs"] = int(infeasible.sum())
+    return infeasible
+
+
+def feasible_successors(infeasible: np.ndarray) -> List[np.ndarray]:
+    """The feasible successors (node indices) of each node, without the node itself."""
+    successors = []
+    for node, row in enumerate(infeasible):
+        nodes = np.flatnonzero(~row)
+        successors.append(nodes[nodes != node])
+    return successors
@@ -0,0 +1,324 @@
+"""
+Solve large order sets by decomposing them in geographic clusters.
+
+The orders are partitioned in clusters (sweep by angle around the depot, or k-means on the
+delivery locations), the sectors of the sweep and the clusters larger than the cluster size
+are split by time window. Each
+cluster is solved as its own model in a process pool. Then a boundary repair pass tries to
+move the orders of single order routes to the routes of the neighbouring clusters (see
+`insertion`). The routes are merged in the same format as `process_solution_data`.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .distance import coord_distance
+from .initial_solution import InitialSolution, create_initial_routes, routes_from_result
+from .input_data_generator import create_data_model_from_dataframe
+from .insertion import add_orders_to_data_model, evaluate_routes, insert_nodes
+from .model_factory import model_factory
+from .process_solution import add_node_lists_to_route, process_routes_data
+from .result_io import load_result
+from .vrp_model import SOLVER_EXCEPTION, solver_status_name
+from .vrp_parameters import ModelType, VRPParameters
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DECOMPOSITION_METHODS = ["sweep", "kmeans"]
+# number of neighbouring clusters to move orders to in the boundary repair
+N_NEIGHBOUR_CLUSTERS = 2
+
+
+def projected_locations(df: "pd.DataFrame") -> np.ndarray:
+    """Delivery locations relative to the pickup, projected such that distances are comparable."""
+    lat = df["delivery_lat"].values - df["pickup_lat"].values
+    lon = (df["delivery_lon"].values - df["pickup_lon"].values) * np.cos(
+        np.radians(df["pickup_lat"].values)
+    )
+    return np.column_stack([lat, lon])
+
+
+def split_clusters_by_time_window(
+    df: "pd.DataFrame", clusters: List[np.ndarray], cluster_size: int
+) -> List[np.ndarray]:
+    """Split the clusters larger than the cluster size by the time window start of the orders."""
+    time_window_start = df["time_window_start_s"].values
+    split_clusters = []
+    for cluster in clusters:
+        if len(cluster) <= cluster_size:
+            split_clusters.append(cluster)
+            continue
+        by_time_window = cluster[np.argsort(time_window_start[cluster], kind="stable")]
+        n_splits = int(np.ceil(len(cluster) / cluster_size))
+        split_clusters += np.array_split(by_time_window, n_splits)
+    return split_clusters
+
+
+def sweep_clusters(df: "pd.DataFrame", cluster_size: int) -> List[np.ndarray]:
+    """
+    Partition the orders (row positions) in sectors by their angle around the depot, and split
+    the sectors by time window: with k clusters there are about sqrt(k) sectors of sqrt(k)
+    time window slices each.
+    """
+    locations = projected_locations(df)
+    angles = np.arctan2(locations[:, 0], locations[:, 1])
+    n_clusters = int(np.ceil(df.shape[0] / cluster_size))
+    n_sectors = int(np.ceil(np.sqrt(n_clusters)))
+    sectors = np.array_split(np.argsort(angles, kind="stable"), n_sectors)
+    return split_clusters_by_time_window(df, sectors, cluster_size)
+
+
+def kmeans_clusters(
+    df: "pd.DataFrame", cluster_size: int, seed: int = 0, max_iterations: int = 50
+) -> List[np.ndarray]:
+    """Partition the orders (row positions) with k-means on the delivery locations."""
+    locations = projected_locations(df)
+    n_clusters = int(np.ceil(df.shape[0] / cluster_size))
+    rng = np.random.default_rng(seed)
+    centroids = locations[rng.choice(len(locations), n_clusters, replace=False)]
+    labels = np.zeros(len(locations), dtype=np.int64)
+    for i in range(max_iterations):
+        distances = ((locations[:, np.newaxis, :] - centroids[np.newaxis, :, :]) ** 2).sum(axis=2)
+        new_labels = distances.argmin(axis=1)
+        if i > 0 and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for k in range(n_clusters):
+            if (labels == k).any():
+                centroids[k] = locations[labels == k].mean(axis=0)
+
+    clusters = [np.flatnonzero(labels == k) for k in range(n_clusters)]
+    clusters = [cluster for cluster in clusters if len(cluster) > 0]
+    return split_clusters_by_time_window(df, clusters, cluster_size)
+
+
+def create_clusters(df: "pd.DataFrame", parameters: VRPParameters) -> List[np.ndarray]:
+    if parameters.decomposition == "sweep":
+        return sweep_clusters(df, parameters.decomposition_cluster_size)
+    elif parameters.decomposition == "kmeans":
+        return kmeans_clusters(df, parameters.decomposition_cluster_size)
+    raise Exception(f"Unknown decomposition method {parameters.decomposition}")
+
+
+def solve_cluster(
+    df: "pd.DataFrame", parameters: VRPParameters, initial_routes: Optional[List[List[str]]] = None
+) -> Tuple[dict, dict]:
+    """
+    Create the data model of the orders and solve it (run in a worker process), starting from
+    the initial routes (node names) of which the nodes of other clusters are ignored.
+    """
+    data = create_data_model_from_dataframe(df, parameters)
+    return data, model_factory(data, parameters).solve(initial_routes)
+
+
+def delivery_node_names(df: "pd.DataFrame", parameters: VRPParameters) -> List[str]:
+    """The node name of the delivery of each order, as in the data model."""
+    order_ids = df["id"] if "id" in df.columns else df["order_id"]
+    if parameters.model_type == ModelType.live:
+        return [f"D{i}" for i in order_ids]
+    return list(map(str, order_ids))
+
+
+def global_node_layout(
+    df: "pd.DataFrame", parameters: VRPParameters
+) -> Tuple[List[str], np.ndarray]:
+    """Node names and locations as if the orders were in one data model (without filtering)."""
+    order_ids = df["id"] if "id" in df.columns else df["order_id"]
+    pickup_location = df[["pickup_lat", "pickup_lon"]].values[0]
+    order_locations = df[["delivery_lat", "delivery_lon"]].values
+    if parameters.model_type == ModelType.live:
+        node_names = ["depot"] + [f"P{i}" for i in order_ids] + [f"D{i}" for i in order_ids]
+        pickup_locations = [pickup_location] * (1 + df.shape[0])
+    else:
+        node_names = ["depot"] + list(map(str, order_ids))
+        pickup_locations = [pickup_location]
+    return node_names, np.concatenate([pickup_locations, order_locations])
+
+
+def initial_routes_by_name(
+    initial_solution: InitialSolution, df: "pd.DataFrame", parameters: VRPParameters
+) -> List[List[str]]:
+    """The routes of the initial solution with node names, indices as in `global_node_layout`."""
+    if isinstance(initial_solution, str):
+        initial_solution = load_result(initial_solution)
+    if isinstance(initial_solution, dict):
+        return routes_from_result(initial_solution)
+    node_names, _ = global_node_layout(df, parameters)
+    return [
+        [node if isinstance(node, str) else node_names[int(node)] for node in route]
+        for route in initial_solution
+    ]
+
+
+def repair_boundaries(
+    df: "pd.DataFrame",
+    clusters: List[np.ndarray],
+    plans: List[dict],
+    parameters: VRPParameters,
+) -> int:
+    """
+    Move the orders of single order routes to a route of a neighbouring cluster if the
+    cost decreases. The order is added to a copy of the data model of each neighbour, only
+    the data model and routes of the accepted move replace those of the neighbour.
+    Returns the number of moved orders.
+    """
+    locations = projected_locations(df)
+    centroids = np.array([locations[cluster].mean(axis=0) for cluster in clusters])
+    delivery_names = delivery_node_names(df, parameters)
+    row_per_name = {name: i for i, name in enumerate(delivery_names)}
+
+    n_moved = 0
+    for cluster_index, plan in enumerate(plans):
+        data = plan["data"]
+        for route in list(plan["routes"]):
+            delivery_name = data["node_names"][route[-1]]
+            if len(route) != (2 if "pickups_deliveries" in data else 1):
+                continue
+            row = row_per_name[delivery_name]
+            route_cost = evaluate_routes(data, parameters, np.array([[data["depot"]] + route]))[1]
+            distance_to_centroids = ((centroids - locations[row]) ** 2).sum(axis=1)
+            distance_to_centroids[cluster_index] = np.inf
+            neighbours = np.argsort(distance_to_centroids)[:N_NEIGHBOUR_CLUSTERS]
+
+            best = None
+            for neighbour in neighbours:
+                if not np.isfinite(distance_to_centroids[neighbour]):
+                    continue
+                neighbour_plan = plans[neighbour]
+                # the fields are replaced (not changed in place), a shallow copy is enough
+                trial_plan = {
+                    **neighbour_plan,
+                    "data": dict(neighbour_plan["data"]),
+                    "routes": [list(r) for r in neighbour_plan["routes"]],
+                }
+                new_nodes = add_orders_to_data_model(
+                    trial_plan["data"], df.iloc[[row]], parameters, coord_distance
+                )[0]
+                insertion = insert_nodes(trial_plan, new_nodes)
+                if insertion is None or insertion["cost"] >= route_cost[0]:
+                    continue
+                if best is None or insertion["cost"] < best[0]:
+                    best = (insertion["cost"], neighbour_plan, trial_plan)
+
+            if best is not None:
+                _, neighbour_plan, trial_plan = best
+                neighbour_plan["data"] = trial_plan["data"]
+                neighbour_plan["routes"] = trial_plan["routes"]
+                plan["routes"].remove(route)
+                n_moved += 1
+    return n_moved
+
+
+def merge_results(df: "pd.DataFrame", plans: List[dict], parameters: VRPParameters) -> Dict:
+    """Merge the routes of all clusters in one result, node indices as in `global_node_layout`."""
+    node_names, _ = global_node_layout(df, parameters)
+    node_index_per_name = {name: i for i, name in enumerate(node_names)}
+
+    routes = []
+    summary: Dict[str, int] = dict()
+    filter_counts: Dict[str, int] = dict()
+    meta = None
+    for plan in plans:
+        result = process_routes_data(plan["data"], parameters, plan["routes"])
+        meta = result["meta"]
+        for route in result["routes"]:
+            route["vehicle_id"] = len(routes)
+            for node in route["route"]:
+                node["node_index"] = node_index_per_name[node["node_name"]]
+            routes.append(route)
+        for key, value in result["summary"].items():
+            summary[key] = summary.get(key, 0) + value
+        for key, value in result["filter"].items():
+            filter_counts[key] = filter_counts.get(key, 0) + value
+
+    add_node_lists_to_route(routes)
+    return {
+        "routes": routes,
+        "meta": {**meta, "n_orders": df.shape[0], "n_max_couriers": df.shape[0]},
+        "filter": filter_counts,
+        "summary": summary,
+        "parameters": parameters.to_dict(),
+    }
+
+
+def solve_decomposed(
+    df: "pd.DataFrame",
+    parameters: VRPParameters,
+    initial_solution: Optional[InitialSolution] = None,
+) -> dict:
+    """
+    Solve the orders by solving geographic clusters of at most `decomposition_cluster_size`
+    orders, using `n_decomposition_workers` processes. Per cluster information is added
+    in `result["solver"]["decomposition"]`.
+    Each cluster starts from the routes of the initial solution with its orders (if set).
+    The orders of the clusters without solution are listed in `result["unassigned"]`, the
+    status is that of the failed clusters only if no cluster was solved.
+    """
+    assert not parameters.multi_pickup, "decomposition is not implemented for multi-pickup"
+    t = time.time()
+    df = df.reset_index(drop=True)
+    clusters = create_clusters(df, parameters)
+    print(f"Solving {len(clusters)} clusters of {df.shape[0]} orders ...")
+    initial_routes = None
+    if initial_solution is not None:
+        initial_routes = initial_routes_by_name(initial_solution, df, parameters)
+
+    with ProcessPoolExecutor(max_workers=parameters.n_decomposition_workers) as executor:
+        futures = [
+            executor.submit(solve_cluster, df.iloc[c], parameters, initial_routes) for c in clusters
+        ]
+        cluster_solutions = [future.result() for future in futures]
+
+    plans = []
+    cluster_info = []
+    # the orders of the clusters without solution are not routed, the first status of those
+    # is the status of the result if no cluster was solved
+    unassigned = []
+    failed_status_code = None
+    delivery_names = delivery_node_names(df, parameters)
+    for cluster, (data, result) in zip(clusters, cluster_solutions):
+        routes = create_initial_routes(result, data) if "routes" in result else []
+        plans.append({"data": data, "parameters": parameters, "routes": routes})
+        cluster_status_code = result["solver"].get("status_code", SOLVER_EXCEPTION)
+        cluster_info.append(
+            {
+                "n_orders": len(cluster),
+                "status": solver_status_name(cluster_status_code),
+                "duration": result["solver"].get("duration"),
+            }
+        )
+        if "initial_solution_used" in result["solver"]:
+            cluster_info[-1]["initial_solution_used"] = result["solver"]["initial_solution_used"]
+        if "routes" not in result:
+            unassigned += [delivery_names[i] for i in cluster]
+            if failed_status_code is None:
+                failed_status_code = cluster_status_code
+
+    n_moved = repair_boundaries(df, clusters, plans, parameters)
+    result = merge_results(df, plans, parameters)
+    if len(unassigned) > 0:
+        print(f"Warning: {len(unassigned)} orders of clusters without solution are unassigned")
+        result["unassigned"] = unassigned
+    status_code = failed_status_code if len(unassigned) == df.shape[0] else 1
+    duration = time.time() - t
+    result["solver"] = {
+        "model": parameters.model_type.name,
+        "duration": duration,
+        "status_code": status_code,
+        "status": solver_status_name(status_code),
+        "decomposition": {
+            "method": parameters.decomposition,
+            "n_clusters": len(clusters),
+            "moved_orders": n_moved,
+            "clusters": cluster_info,
+        },
+    }
+
+    print("---decomposition stats----")
+    print(f"Clusters: {len(clusters)}; moved orders: {n_moved}")
+    print(f"Duration: {duration:.2f} s")
+    return result
@@ -1,6 +1,9 @@
 import numpy as np
 from haversine import Unit, haversine
 
+# mean earth radius (m), the same value used by the haversine package
+AVG_EARTH_RADIUS_M = 6371008.8
+
 
 def euclidean_distance(pos1, pos2):
     return int(np.sqrt((pos1[0] - pos2[0]) ** 2 + (pos1[1] - pos2[1]) ** 2))
@@ -8,3 +11,128 @@ def euclidean_distance(pos1, pos2):
 
 def coord_distance(pos1, pos2):
     return haversine(pos1, pos2, unit=Unit.METERS)
+
+
+def euclidean_distance_pairs(locations_from, locations_to) -> np.ndarray:
+    """
+    Euclidean distance (truncated, as `euclidean_distance`) between each pair of locations,
+    the arrays (..., 2) of (x, y) locations are broadcast.
+    """
+    locations_from = np.asarray(locations_from, dtype=float)
+    locations_to = np.asarray(locations_to, dtype=float)
+    dx = locations_from[..., 0] - locations_to[..., 0]
+    dy = locations_from[..., 1] - locations_to[..., 1]
+    return np.trunc(np.sqrt(dx**2 + dy**2))
+
+
+def coord_distance_pairs(locations_from, locations_to) -> np.ndarray:
+    """
+    Haversine distance (m) between each pair of locations, same formula as `coord_distance`,
+    the arrays (..., 2) of (latitude, longitude) are broadcast.
+    """
+    locations_from = np.radians(np.asarray(locations_from, dtype=float))
+    locations_to = np.radians(np.asarray(locations_to, dtype=float))
+    lat1 = locations_from[..., 0]
+    lat2 = locations_to[..., 0]
+    lat = lat2 - lat1
+    lon = locations_to[..., 1] - locations_from[..., 1]
+    d = np.sin(lat * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(lon * 0.5) ** 2
+    return AVG_EARTH_RADIUS_M * (2 * np.arcsin(np.sqrt(d)))
+
+
+def euclidean_distance_matrix(locations_from, locations_to) -> np.ndarray:
+    """
+    Euclidean distance between all pairs of locations (truncated, as `euclidean_distance`).
+    Args:
+        locations_from: array (n, 2) of (x, y) locations
+        locations_to:   array (m, 2) of (x, y) locations
+    Returns:
+        distance matrix (n, m)
+    """
+    locations_from = np.asarray(locations_from, dtype=float)
+    locations_to = np.asarray(locations_to, dtype=float)
+    return euclidean_distance_pairs(locations_from[:, np.newaxis], locations_to[np.newaxis])
+
+
+def coord_distance_matrix(locations_from, locations_to) -> np.ndarray:
+    """
+    Haversine distance (m) between all pairs of locations, same formula as `coord_distance`.
+    Args:
+        locations_from: array (n, 2) of (latitude, longitude)
+        locations_to:   array (m, 2) of (latitude, longitude)
+    Returns:
+        distance matrix (n, m)
+    """
+    locations_from = np.asarray(locations_from, dtype=float)
+    locations_to = np.asarray(locations_to, dtype=float)
+    return coord_distance_pairs(locations_from[:, np.newaxis], locations_to[np.newaxis])
+
+
+# vectorized versions of the point to point distance functions
+DISTANCE_MATRIX_FUNCS = {
+    euclidean_distance: euclidean_distance_matrix,
+    coord_distance: coord_distance_matrix,
+}
+DISTANCE_PAIRS_FUNCS = {
+    euclidean_distance: euclidean_distance_pairs,
+    coord_distance: coord_distance_pairs,
+}
+
+
+def get_distance_matrix_func(dist_func):
+    """Return the vectorized version of the distance function, None if there is none."""
+    return DISTANCE_MATRIX_FUNCS.get(dist_func)
+
+
+def calculate_distances(locations_from, locations_to, distance_func) -> np.ndarray:
+    """
+    Calculate the distance from all locations_from to all locations_to, using the
+    vectorized version of the distance function if there is one.
+    """
+    distance_matrix_func = get_distance_matrix_func(distance_func)
+    if distance_matrix_func is not None:
+        return distance_matrix_func(locations_from, locations_to)
+    return np.array(
+        [[distance_func(p, q) for q in locations_to] for p in locations_from], dtype=float
+    ).reshape(len(locations_from), len(locations_to))
+
+
+def calculate_paired_distances(locations_from, locations_to, distance_func) -> np.ndarray:
+    """
+    Calculate the distance from each location in locations_from to the location at the same
+    position in locations_to, using the vectorized version of the distance function if there
+    is one (see `DISTANCE_PAIRS_FUNCS`).
+    """
+    distance_pairs_func = DISTANCE_PAIRS_FUNCS.get(distance_func)
+    if distance_pairs_func is not None:
+        return distance_pairs_func(locations_from, locations_to)
+    return np.array(
+        [distance_func(p, q) for p, q in zip(locations_from, locations_to)], dtype=float
+    )
+
+
+def calculate_all_pairs_distances(locations, distance_func) -> np.ndarray:
+    """
+    Calculate the (symmetric) distance between all pairs of locations.
+    If the distance function has a vectorized version (see `DISTANCE_MATRIX_FUNCS`)
+    all pairs are calculated at once, otherwise it is called for each pair.
+    Args:
+        locations: a list of all locations (x, y) or (latitude, longitude)
+        distance_func: distance function
+    Returns:
+        distance matrix
+    """
+    distance_matrix_func = get_distance_matrix_func(distance_func)
+    if distance_matrix_func is None:
+        n_items = len(locations)
+        dist_mat = np.zeros((n_items, n_items))
+        for i in range(n_items):
+            for j in range(i + 1, n_items):
+                dist_mat[i, j] = dist_mat[j, i] = distance_func(locations[i], locations[j])
+        return dist_mat
+
+    locations = np.asarray(locations, dtype=float)
+    dist_mat = distance_matrix_func(locations, locations)
+    # use the upper triangle (i < j) for both directions
+    dist_mat = np.triu(dist_mat, 1)
+    return dist_mat + dist_mat.T
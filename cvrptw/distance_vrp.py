@@ -19,9 +19,8 @@ class DistanceVRP(VRPModel):
         return self.transit_callback_index_dist
 
     def _create_model(self):
-        # Create and register a transit callback for the distance between 2 points
-        dist_callback = self.create_callback("distance_matrix")
-        self.transit_callback_index_dist = self.routing.RegisterTransitCallback(dist_callback)
+        # Register the transit for the distance between 2 points
+        self.transit_callback_index_dist = self.register_transit("distance_matrix")
 
         # Add route distance constraint.
         if self.parameters.max_delivery_distance is not None:
@@ -0,0 +1,221 @@
+"""
+Estimate the number of vehicles needed, such that the model does not have to be created with
+one vehicle per order.
+
+The lower bound is the maximum of:
+- the total number of items (weight) divided by the courier capacity,
+- the minimal total travel time (distance) divided by the maximum time (distance) per route,
+- the number of orders that can't be combined in one route (greedy clique of incompatible
+  orders, i.e. orders of which the time windows are too far apart or the items don't fit).
+
+The upper bound is the number of routes of a quick greedy heuristic that appends each order
+(sorted by time window) to the route with the lowest extra cost where it is feasible.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+from .process_solution import cost_matrix_field
+from .vrp_parameters import ModelType, VRPParameters
+
+
+def has_capacity_constraints(parameters: VRPParameters) -> bool:
+    return parameters.model_type in [ModelType.no_tw, ModelType.scheduled, ModelType.live]
+
+
+def has_time_window_constraints(data: dict, parameters: VRPParameters) -> bool:
+    return "time_windows" in data and parameters.model_type in [
+        ModelType.scheduled,
+        ModelType.live,
+    ]
+
+
+def order_nodes(data: dict) -> List[List[int]]:
+    """The nodes of each order: [delivery] or [pickup, delivery]."""
+    if "pickups_deliveries" in data:
+        return [[int(pickup), int(delivery)] for pickup, delivery in data["pickups_deliveries"]]
+    return [[node] for node in range(len(data["time_matrix"])) if node != data["depot"]]
+
+
+def order_load(data: dict, field: str, orders: List[List[int]]) -> np.ndarray:
+    """The load (number_of_items or weights) of each order, the sum over its nodes."""
+    return np.array([np.sum(data[field][nodes]) for nodes in orders])
+
+
+def min_incoming(matrix: np.ndarray, depot: int) -> np.ndarray:
+    """The minimum of each column of the matrix, excluding the diagonal and the depot column."""
+    matrix = np.asarray(matrix, dtype=float).copy()
+    np.fill_diagonal(matrix, np.inf)
+    minimum = matrix.min(axis=0)
+    minimum[depot] = 0
+    return minimum
+
+
+def incompatible_orders(
+    data: dict, parameters: VRPParameters, order: List[int], others: List[List[int]]
+) -> np.ndarray:
+    """
+    Check for the other orders if they can't be in the same route as the order, in any order.
+    Only the time windows of the deliveries are used, which makes it a relaxation of the model.
+    """
+    delivery = order[-1]
+    other_deliveries = np.array([nodes[-1] for nodes in others], dtype=np.int64)
+    incompatible = np.zeros(len(others), dtype=bool)
+    if has_capacity_constraints(parameters):
+        items = order_load(data, "number_of_items", [order] + others)
+        incompatible |= items[0] + items[1:] > parameters.courier_item_capacity
+        if "weights" in data:
+            weights = order_load(data, "weights", [order] + others)
+            incompatible |= weights[0] + weights[1:] > parameters.courier_weight_capacity
+    if has_time_window_constraints(data, parameters):
+        time_windows = np.asarray(data["time_windows"])
+        waiting = parameters.allowed_waiting_time_at_del
+
+        def can_precede(from_nodes, to_nodes, times):
+            # range of arrival times at the next node overlaps with its time window
+            return (time_windows[from_nodes, 0] + times <= time_windows[to_nodes, 1]) & (
+                time_windows[from_nodes, 1] + times + waiting >= time_windows[to_nodes, 0]
+            )
+
+        time_matrix = data["time_matrix"]
+        incompatible |= ~can_precede(
+            delivery, other_deliveries, time_matrix[delivery, other_deliveries]
+        ) & ~can_precede(other_deliveries, delivery, time_matrix[other_deliveries, delivery])
+    return incompatible
+
+
+def fleet_size_lower_bound(data: dict, parameters: VRPParameters) -> int:
+    """Lower bound of the number of vehicles needed to visit all orders."""
+    orders = order_nodes(data)
+    if len(orders) == 0:
+        return 0
+    lower_bound = 1
+    if has_capacity_constraints(parameters):
+        n_items = np.sum(data["number_of_items"])
+        lower_bound = max(lower_bound, int(np.ceil(n_items / parameters.courier_item_capacity)))
+        if "weights" in data:
+            weight = np.sum(data["weights"])
+            lower_bound = max(
+                lower_bound, int(np.ceil(weight / parameters.courier_weight_capacity))
+            )
+    if parameters.model_type == ModelType.distance:
+        if parameters.max_delivery_distance is not None:
+            distance = min_incoming(data["distance_matrix"], data["depot"]).sum()
+            lower_bound = max(
+                lower_bound, int(np.ceil(distance / parameters.max_delivery_distance))
+            )
+    else:
+        travel_time = min_incoming(data["time_matrix"], data["depot"]).sum()
+        lower_bound = max(lower_bound, int(np.ceil(travel_time / parameters.max_delivery_time)))
+
+    # greedy clique of incompatible orders, starting with the narrowest time windows
+    if has_time_window_constraints(data, parameters):
+        widths = [np.diff(data["time_windows"][nodes[-1]])[0] for nodes in orders]
+        candidates = [orders[i] for i in np.argsort(widths, kind="stable")]
+    else:
+        items = order_load(data, "number_of_items", orders)
+        candidates = [orders[i] for i in np.argsort(-items, kind="stable")]
+    clique = [candidates[0]]
+    for order in candidates[1:]:
+        if incompatible_orders(data, parameters, order, clique).all():
+            clique.append(order)
+    return max(lower_bound, len(clique))
+
+
+def fleet_size_upper_bound(data: dict, parameters: VRPParameters) -> int:
+    """
+    Number of routes of a greedy heuristic, appending each order to the route with the lowest
+    extra cost, using the same constraints as `insertion.evaluate_routes`. On the way bundles
+    are not taken into account.
+    """
+    orders = order_nodes(data)
+    if has_time_window_constraints(data, parameters):
+        orders = sorted(orders, key=lambda nodes: tuple(data["time_windows"][nodes[0]]))
+    cost_matrix = data[cost_matrix_field(parameters.model_type)]
+    time_windows = np.asarray(data["time_windows"]) if "time_windows" in data else None
+    check_time = parameters.model_type != ModelType.distance
+    check_capacity = has_capacity_constraints(parameters)
+    check_time_windows = has_time_window_constraints(data, parameters)
+    depot = data["depot"]
+
+    # state per route, the last element is always an empty route
+    state: Dict[str, np.ndarray] = {
+        "last": np.array([depot]),
+        "time": np.zeros(1),
+        "distance": np.zeros(1),
+        "items": np.zeros(1),
+        "weight": np.zeros(1),
+        "earliest": np.full(1, time_windows[depot][0] if check_time_windows else 0),
+        "latest": np.full(1, time_windows[depot][1] if check_time_windows else 0),
+    }
+    empty_route = {field: values.copy() for field, values in state.items()}
+    for nodes in orders:
+        new_state = dict(state)
+        cost = np.zeros(len(state["last"]))
+        feasible = np.ones(len(state["last"]), dtype=bool)
+        for node in nodes:
+            arc_time = data["time_matrix"][new_state["last"], node]
+            cost = cost + cost_matrix[new_state["last"], node]
+            new_state["time"] = new_state["time"] + arc_time
+            new_state["distance"] = (
+                new_state["distance"] + data["distance_matrix"][new_state["last"], node]
+            )
+            new_state["items"] = new_state["items"] + data["number_of_items"][node]
+            if "weights" in data:
+                new_state["weight"] = new_state["weight"] + data["weights"][node]
+            if check_time_windows:
+                new_state["earliest"] = np.maximum(
+                    new_state["earliest"] + arc_time, time_windows[node][0]
+                )
+                new_state["latest"] = np.minimum(
+                    new_state["latest"] + arc_time + parameters.allowed_waiting_time_at_del,
+                    min(time_windows[node][1], parameters.max_time_duration),
+                )
+                feasible &= new_state["earliest"] <= new_state["latest"]
+            new_state["last"] = np.full(len(cost), node)
+
+        if parameters.max_delivery_distance is not None:
+            feasible &= new_state["distance"] <= parameters.max_delivery_distance
+        if check_time:
+            feasible &= new_state["time"] <= parameters.max_delivery_time
+        if check_capacity:
+            feasible &= new_state["items"] <= parameters.courier_item_capacity
+            if "weights" in data:
+                feasible &= new_state["weight"] <= parameters.courier_weight_capacity
+
+        # orders that are not feasible in any route get their own route
+        if feasible.any():
+            route = int(np.argmin(np.where(feasible, cost, np.inf)))
+        else:
+            route = len(cost) - 1
+        for field, values in state.items():
+            values[route] = new_state[field][route]
+        if route == len(cost) - 1:
+            for field, values in state.items():
+                state[field] = np.append(values, empty_route[field])
+    return len(state["last"]) - 1
+
+
+def estimate_fleet_size(data: dict, parameters: VRPParameters) -> Dict[str, int]:
+    """
+    Estimate the number of vehicles: the upper bound with a safety margin
+    (fleet_size_margin), at least the lower bound and at most one vehicle per order.
+    """
+    n_orders = len(order_nodes(data))
+    lower_bound = fleet_size_lower_bound(data, parameters)
+    upper_bound = fleet_size_upper_bound(data, parameters)
+    n_vehicles = int(np.ceil(upper_bound * (1 + parameters.fleet_size_margin))) + 1
+    return {
+        "lower_bound": lower_bound,
+        "upper_bound": upper_bound,
+        "n_vehicles": max(1, min(n_orders, max(lower_bound, n_vehicles))),
+    }
+
+
+def set_fleet_size(data: dict, parameters: VRPParameters, n_vehicles: int):
+    """Set the number of vehicles of the data model (in place) with the courier capacities."""
+    data["num_vehicles"] = n_vehicles
+    data["courier_item_capacities"] = [parameters.courier_item_capacity] * n_vehicles
+    if "courier_weight_capacities" in data:
+        data["courier_weight_capacities"] = [parameters.courier_weight_capacity] * n_vehicles
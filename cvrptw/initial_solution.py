@@ -0,0 +1,119 @@
+"""Create the initial routes to warm start the solver from a previous plan."""
+
+from typing import Dict, List, Optional, Union
+
+from .fleet_size import order_nodes
+from .result_io import load_result
+from .vrp_parameters import VRPParameters
+
+InitialSolution = Union[str, dict, List[List[Union[int, str]]]]
+
+
+def routes_from_result(result: dict) -> List[List[str]]:
+    """Get the routes as lists of node names from a result of `process_solution_data`."""
+    routes = []
+    for route in result.get("routes", []):
+        if "node_index_names" in route:
+            routes.append(list(route["node_index_names"]))
+        else:
+            routes.append([node["node_name"] for node in route["route"]])
+    return routes
+
+
+def routes_to_node_indices(routes: List[List[Union[int, str]]], data: dict) -> List[List[int]]:
+    """
+    Convert the routes to node indices of the data model, nodes can be given as index or name.
+    The depot and nodes that do not exist (anymore) are removed.
+    """
+    node_index_per_name = {str(name): i for i, name in enumerate(data["node_names"])}
+    n_nodes = len(data["node_names"])
+    node_routes = []
+    for route in routes:
+        node_route = []
+        for node in route:
+            if isinstance(node, str):
+                node_index = node_index_per_name.get(node)
+            else:
+                node_index = int(node)
+            if node_index is None or node_index == data["depot"] or not 0 <= node_index < n_nodes:
+                continue
+            node_route.append(node_index)
+        node_routes.append(node_route)
+    return node_routes
+
+
+def remove_incomplete_pickups_deliveries(routes: List[List[int]], data: dict) -> List[List[int]]:
+    """Remove pickups and deliveries of which the other node is not in the same route."""
+    if "pickups_deliveries" not in data:
+        return routes
+
+    other_node: Dict[int, int] = dict()
+    for pickup, delivery in data["pickups_deliveries"]:
+        other_node[pickup] = delivery
+        other_node[delivery] = pickup
+
+    clean_routes = []
+    for route in routes:
+        nodes = set(route)
+        clean_routes.append([n for n in route if n not in other_node or other_node[n] in nodes])
+    return clean_routes
+
+
+def add_missing_orders(
+    routes: List[List[int]], data: dict, parameters: VRPParameters
+) -> List[List[int]]:
+    """
+    Add the orders that are not in the routes (e.g. new orders since the previous solution),
+    the solver can only start from routes that visit all nodes. Each order is inserted at the
+    cheapest feasible position (see `insertion.insert_nodes`), or gets a new route if there is
+    no feasible position and there is an unused vehicle.
+    """
+    from .insertion import insert_nodes
+
+    routed = {node for route in routes for node in route}
+    plan = {"data": data, "parameters": parameters, "routes": [list(r) for r in routes]}
+    for nodes in order_nodes(data):
+        if any(node in routed for node in nodes):
+            continue
+        if insert_nodes(plan, nodes) is not None:
+            continue
+        if len(plan["routes"]) < data["num_vehicles"]:
+            plan["routes"].append(nodes)
+    return plan["routes"]
+
+
+def create_initial_routes(
+    initial_solution: InitialSolution, data: dict, parameters: Optional[VRPParameters] = None
+) -> List[List[int]]:
+    """
+    Create the initial routes (node indices, without depot) for the data model.
+    Args:
+        initial_solution: a previous solution, either:
+            - the output file (json or npz) of a previous solve,
+            - the result of a previous solve (see `process_solution_data`),
+            - a list of routes with node indices or node names.
+        data: the data model
+        parameters: VRP parameters, when set the orders that are not in the previous solution
+            are inserted in the routes (see `add_missing_orders`)
+    Returns:
+        list of routes (at most one per vehicle) with the node indices
+    """
+    if isinstance(initial_solution, str):
+        initial_solution = load_result(initial_solution)
+    if isinstance(initial_solution, dict):
+        routes = routes_from_result(initial_solution)
+    else:
+        routes = initial_solution
+
+    routes = routes_to_node_indices(routes, data)
+    routes = remove_incomplete_pickups_deliveries(routes, data)
+    routes = [route for route in routes if len(route) > 0]
+    if len(routes) > data["num_vehicles"]:
+        print(
+            f"Warning: initial solution has {len(routes)} routes, "
+            f"only using the first {data['num_vehicles']}"
+        )
+        routes = routes[: data["num_vehicles"]]
+    if parameters is not None:
+        routes = add_missing_orders(routes, data, parameters)
+    return routes
@@ -1,36 +1,72 @@
-from typing import Dict, List, Optional
+from functools import lru_cache
+from itertools import permutations
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 import numpy as np
-import pandas as pd
 
-from .distance import coord_distance, euclidean_distance
+from .distance import (
+    calculate_all_pairs_distances,
+    calculate_distances,
+    calculate_paired_distances,
+    coord_distance,
+    euclidean_distance,
+)
+from .matrix_cache import DistanceMatrixCache, distance_func_name, get_distance_matrix_cache
+from .profiling import create_phases, measure_phase
 from .quick_vrp import QuickVRP
 from .utils import convert_field_to_int
 from .vrp_parameters import ModelType, VRPParameters
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-def calculate_distance_matrix(locations: List[List[float]], distance_func) -> List[List[float]]:
-    """ "
-    Calculate the distance between all points i n the locations list.
+
+def intern_locations(locations) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the unique locations, such that distances only have to be calculated once
+    for nodes that share the same location (e.g. all pickups at the same store).
+    Args:
+        locations: a list of all node locations (x, y) or (latitude, longitude)
+    Returns:
+        unique locations (in order of first appearance),
+        index of each node's location in the unique locations
+    """
+    locations = np.asarray(locations, dtype=float)
+    unique_locations, first_index, location_index = np.unique(
+        locations, axis=0, return_index=True, return_inverse=True
+    )
+    order = np.argsort(first_index)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return unique_locations[order], rank[location_index.reshape(-1)]
+
+
+def calculate_distance_matrix(
+    locations: List[List[float]],
+    distance_func,
+    location_index=None,
+    cache: Optional[DistanceMatrixCache] = None,
+) -> List[List[float]]:
+    """
+    Calculate the distance between all points in the locations list.
     Args:
         locations: a list of all locations (x, y) or (latitude, longitude)
         distance_func: distance function
+        location_index: if set, `locations` are the unique locations and this is the index
+            in `locations` per node (see `intern_locations`), the matrix is then per node.
+        cache: optional on-disk cache of the distances between the locations
     Returns:
         distance matrix
     """
-    n_items = len(locations)
-    dist_mat = np.zeros((n_items, n_items))
-    for i in range(n_items):
-        for j in range(i, n_items):
-            if i == j:
-                continue
-            # Setting distance to depot 0, since we don't want to go back.
-            d = distance_func(locations[i], locations[j])
-            if j != 0:
-                dist_mat[i, j] = d
-            if i != 0:
-                dist_mat[j, i] = d
-
+    if cache is None:
+        dist_mat = calculate_all_pairs_distances(locations, distance_func)
+    else:
+        dist_mat = cache.all_pairs_distances(locations, distance_func)
+    if location_index is not None:
+        dist_mat = dist_mat[np.ix_(location_index, location_index)]
+    # Setting distance to depot 0, since we don't want to go back.
+    dist_mat[:, 0] = 0
+    np.fill_diagonal(dist_mat, 0)
     return dist_mat
 
 
@@ -83,14 +119,52 @@ def filter_time_window_constraints(
     return ~inconsistent_time_windows & pass_time_window_constraint
 
 
-def estimate_distance_time_items_and_weight_bundle(
-    pickup_location,
-    order_locations,
-    order_number_items,
-    weights,
-    parameters: VRPParameters,
-    dist_func,
-):
+# bundles up to this size are evaluated exactly (all visiting orders), larger ones with QuickVRP
+MAX_EXACT_BUNDLE_SIZE = 7
+
+
+@lru_cache(maxsize=None)
+def visiting_orders(n_orders: int) -> np.ndarray:
+    """All orders (permutations) to visit n orders."""
+    return np.array(list(permutations(range(n_orders))), dtype=np.int64).reshape(-1, n_orders)
+
+
+@lru_cache(maxsize=4096)
+def shortest_bundle_route_distance(pickup_location: tuple, order_locations: tuple, dist_func):
+    """
+    Distance of the shortest route from the pickup location visiting all orders of the bundle
+    (without going back), by evaluating all visiting orders at once.
+    The locations are tuples such that the result is cached per bundle composition and
+    distance function (see `bundle_route_distance`).
+    """
+    distances = calculate_distances(
+        [pickup_location] + list(order_locations), order_locations, dist_func
+    )
+    routes = visiting_orders(len(order_locations))
+    # row 0 is the pickup location, row i + 1 is order i
+    route_distances = distances[0, routes[:, 0]]
+    route_distances += distances[routes[:, :-1] + 1, routes[:, 1:]].sum(axis=1)
+    return float(route_distances.min())
+
+
+def bundle_route_distance(pickup_location, order_locations, dist_func):
+    """
+    Distance of the (shortest) route of a bundle, exact for bundles with a single pickup location
+    up to MAX_EXACT_BUNDLE_SIZE orders, otherwise estimated with QuickVRP.
+    Returns the distance and the number of routes.
+    """
+    order_locations = np.asarray(order_locations, dtype=float)
+    if np.ndim(pickup_location) == 1 and len(order_locations) <= MAX_EXACT_BUNDLE_SIZE:
+        # sort the locations such that the cache does not depend on the order in the bundle
+        locations = tuple(sorted(map(tuple, order_locations.tolist())))
+        pickup = tuple(np.asarray(pickup_location, dtype=float).tolist())
+        # the cache keeps a reference to the distance function, only cache the named functions
+        # (which live as long as their module), not e.g. lambdas
+        route_distance = shortest_bundle_route_distance
+        if distance_func_name(dist_func) is None:
+            route_distance = shortest_bundle_route_distance.__wrapped__
+        return route_distance(pickup, locations, dist_func), 1
+
     qvrp = QuickVRP(
         pickup_location,
         order_locations,
@@ -99,13 +173,24 @@ def estimate_distance_time_items_and_weight_bundle(
         max_calc_time=10,
     )
     solution = qvrp.solve()
-    distance = solution["total_cost"]
-    duration = distance / parameters.speed
     for route in solution["routes"]:
         # Note: for this case we actually want it to be 1 route, since
         # they were already bundled and will be constrained to be in the same route.
         assert len(route) > 0
-        duration += parameters.waiting_time_at_delivery * (len(route) - 1)
+    return solution["total_cost"], len(solution["routes"])
+
+
+def estimate_distance_time_items_and_weight_bundle(
+    pickup_location,
+    order_locations,
+    order_number_items,
+    weights,
+    parameters: VRPParameters,
+    dist_func,
+):
+    distance, n_routes = bundle_route_distance(pickup_location, order_locations, dist_func)
+    duration = distance / parameters.speed
+    duration += parameters.waiting_time_at_delivery * (len(order_locations) - n_routes)
 
     if order_number_items is None:
         number_items = None
@@ -121,6 +206,8 @@ def estimate_distance_time_items_and_weight_bundle(
 
 
 def bundle_lists(existing_bundle_ids, index_delta: int = 0):
+    import pandas as pd
+
     df = pd.DataFrame({"existing_bundle_ids": existing_bundle_ids}).reset_index()
     if index_delta > 0:
         df["index"] += index_delta
@@ -195,17 +282,23 @@ def filter_orders(
     it to 1 route it passes the constraints.
     """
     meta_results = dict()
+    if order_time_windows is not None:
+        order_time_windows = np.asarray(order_time_windows)
+    if order_pickup_time_windows is not None:
+        order_pickup_time_windows = np.asarray(order_pickup_time_windows)
 
     if parameters.multi_pickup:
         assert len(pickup_location) == len(order_locations), (
             f"the number of pickup locations {len(pickup_location)} should be equal to "
             f"the number of order locations {len(order_locations)}"
         )
-        distance = np.array(
-            [dist_func(pickup_location[i], order_locations[i]) for i in range(len(order_locations))]
-        )
+        pickup_locations = np.asarray(pickup_location, dtype=float)
     else:
-        distance = np.array([dist_func(pickup_location, o) for o in order_locations])
+        pickup_locations = np.broadcast_to(
+            np.asarray(pickup_location, dtype=float), np.shape(order_locations)
+        )
+    # one batched distance call for all orders
+    distance = calculate_paired_distances(pickup_locations, order_locations, dist_func)
     pass_distance_constraint = distance <= parameters.max_delivery_distance
     meta_results["distance_infeasible"] = (~pass_distance_constraint).sum()
 
@@ -260,7 +353,7 @@ def filter_orders(
         None if order_pickup_time_windows is None else order_pickup_time_windows[pass_constraints],
         meta_results,
         None if order_ids is None else order_ids[pass_constraints],
-        existing_bundle_ids[pass_constraints],
+        None if existing_bundle_ids is None else existing_bundle_ids[pass_constraints],
     )
 
 
@@ -286,45 +379,54 @@ def create_data_model_from_orders(
         n_couriers,
         "delivery",
     )
+    phases = create_phases(parameters)
 
     if do_filter:
-        (
-            order_locations,
-            order_time_windows,
-            order_number_items,
-            weights,
-            _,
-            data["filter"],
-            order_ids,
-            existing_bundle_ids,
-        ) = filter_orders(
-            order_locations,
-            order_time_windows,
-            order_number_items,
-            weights,
-            pickup_location,
-            None,
-            parameters,
-            dist_func,
-            order_ids,
-            existing_bundle_ids,
-        )
+        with measure_phase(phases, "filtering"):
+            (
+                order_locations,
+                order_time_windows,
+                order_number_items,
+                weights,
+                _,
+                data["filter"],
+                order_ids,
+                existing_bundle_ids,
+            ) = filter_orders(
+                order_locations,
+                order_time_windows,
+                order_number_items,
+                weights,
+                pickup_location,
+                None,
+                parameters,
+                dist_func,
+                order_ids,
+                existing_bundle_ids,
+            )
 
     n_items = len(order_locations) + 1  # pickup store
     loc_mat = np.concatenate([[pickup_location], order_locations])
     # note: first is the start (pickup) location.
     data["locations"] = loc_mat
 
-    data["distance_matrix"] = calculate_distance_matrix(loc_mat, dist_func)
-    data["time_matrix"] = calculate_time_matrix(
-        data["distance_matrix"], parameters.speed, parameters.waiting_time_at_delivery
-    )
+    with measure_phase(phases, "matrices"):
+        unique_locations, data["location_index"] = intern_locations(loc_mat)
+        data["distance_matrix"] = calculate_distance_matrix(
+            unique_locations,
+            dist_func,
+            data["location_index"],
+            get_distance_matrix_cache(parameters),
+        )
+        data["time_matrix"] = calculate_time_matrix(
+            data["distance_matrix"], parameters.speed, parameters.waiting_time_at_delivery
+        )
 
-    # add courier weight to first distance (start to any) for the cost
-    cost_mat = data["distance_matrix"].copy()
-    cost_mat[0, :] += parameters.courier_cost
-    cost_mat[0, 0] = 0
-    data["cost_matrix"] = cost_mat
+        # add courier weight to first distance (start to any) for the cost
+        cost_mat = data["distance_matrix"].copy()
+        cost_mat[0, :] += parameters.courier_cost
+        cost_mat[0, 0] = 0
+        data["cost_matrix"] = cost_mat
 
     # these are num items in order
     data["number_of_items"] = np.append([0], order_number_items)
@@ -363,6 +465,8 @@ def create_data_model_from_orders(
     # general info
     data["num_vehicles"] = n_couriers
     data["depot"] = 0
+    if phases is not None:
+        data["phases"] = phases
 
     return data
 
@@ -391,29 +495,31 @@ def create_data_pu_del_model_from_orders(
         n_couriers,
         "pickup-delivery",
     )
+    phases = create_phases(parameters)
 
     if do_filter:
-        (
-            order_locations,
-            order_time_windows,
-            order_number_items,
-            weights,
-            order_pickup_time_windows,
-            data["filter"],
-            order_ids,
-            existing_bundle_ids,
-        ) = filter_orders(
-            order_locations,
-            order_time_windows,
-            order_number_items,
-            weights,
-            pickup_location,
-            order_pickup_time_windows,
-            parameters,
-            dist_func,
-            order_ids,
-            existing_bundle_ids,
-        )
+        with measure_phase(phases, "filtering"):
+            (
+                order_locations,
+                order_time_windows,
+                order_number_items,
+                weights,
+                order_pickup_time_windows,
+                data["filter"],
+                order_ids,
+                existing_bundle_ids,
+            ) = filter_orders(
+                order_locations,
+                order_time_windows,
+                order_number_items,
+                weights,
+                pickup_location,
+                order_pickup_time_windows,
+                parameters,
+                dist_func,
+                order_ids,
+                existing_bundle_ids,
+            )
 
     n_orders = len(order_locations)
 
@@ -428,19 +534,27 @@ def create_data_pu_del_model_from_orders(
     # (note: we skip index 0 because it is the 'depot')
     data["pickups_deliveries"] = [(i, i + n_orders) for i in range(1, n_orders + 1)]
 
-    data["distance_matrix"] = calculate_distance_matrix(loc_mat, dist_func)
-    data["time_matrix"] = calculate_time_matrix(
-        data["distance_matrix"],
-        parameters.speed,
-        parameters.waiting_time_at_delivery,
-        range(1 + n_orders),
-    )
+    # only calculate the distances once for co-located nodes (i.e. the depot and all pickups)
+    with measure_phase(phases, "matrices"):
+        unique_locations, data["location_index"] = intern_locations(loc_mat)
+        data["distance_matrix"] = calculate_distance_matrix(
+            unique_locations,
+            dist_func,
+            data["location_index"],
+            get_distance_matrix_cache(parameters),
+        )
+        data["time_matrix"] = calculate_time_matrix(
+            data["distance_matrix"],
+            parameters.speed,
+            parameters.waiting_time_at_delivery,
+            range(1 + n_orders),
+        )
 
-    # add courier weight to first distance (start to any) for the cost
-    cost_mat = data["time_matrix"].copy()
-    cost_mat[0, range(1, 1 + n_orders)] += parameters.courier_cost
-    cost_mat[0, 0] = 0
-    data["cost_matrix"] = cost_mat
+        # add courier weight to first distance (start to any) for the cost
+        cost_mat = data["time_matrix"].copy()
+        cost_mat[0, range(1, 1 + n_orders)] += parameters.courier_cost
+        cost_mat[0, 0] = 0
+        data["cost_matrix"] = cost_mat
 
     # set the time windows for the depot, pickup of the orders and delivery of the orders
     data["time_windows"] = np.concatenate(
@@ -477,7 +591,8 @@ def create_data_pu_del_model_from_orders(
         "time_windows",
         "pickup_time_windows",
         "number_of_items",
-        "weights" "courier_item_capacities",
+        "weights",
+        "courier_item_capacities",
         "courier_weight_capacities",
     ]:
         if field in data:
@@ -486,6 +601,8 @@ def create_data_pu_del_model_from_orders(
     # general info
     data["num_vehicles"] = n_couriers
     data["depot"] = 0
+    if phases is not None:
+        data["phases"] = phases
     return data
 
 
@@ -496,30 +613,42 @@ def create_random_data_model_test(
     max_dist: int = 4000,
     max_demand: int = 4,
     xparam: int = 0,
+    spatial: str = "uniform",
 ):
     """
     Stores and created the random data for the problem of size n_orders
     (note that it includes the start location).
+    The order locations are uniform, or "clustered" around a few random centers.
     """
     pickup_loc = np.random.random(2) * max_dist / 2
-    order_locs = np.random.random((n_orders, 2)) * max_dist / 2
-    order_num_items = np.append([0], np.random.randint(1, max_demand + 1, size=n_orders))
+    if spatial == "clustered":
+        n_clusters = max(1, n_orders // 50)
+        centers = np.random.random((n_clusters, 2)) * max_dist / 2
+        order_locs = centers[np.random.randint(n_clusters, size=n_orders)]
+        order_locs = np.clip(
+            order_locs + np.random.normal(0, max_dist / 40, size=(n_orders, 2)), 0, max_dist / 2
+        )
+    elif spatial == "uniform":
+        order_locs = np.random.random((n_orders, 2)) * max_dist / 2
+    else:
+        raise Exception(f"Unknown spatial distribution {spatial}")
+    order_num_items = np.random.randint(1, max_demand + 1, size=n_orders)
 
     if xparam == 0:
-        order_time_windows = [(0, 24 * 3600) for _ in range(n_orders)]
+        order_time_windows = np.tile([0, 24 * 3600], (n_orders, 1))
     else:
         print("Using tighter time windows")
-        time_windows = [(s, s + 30 * 60) for s in range(10 * 3600, 22 * 3600, 30 * 60)]
-        order_time_windows = [
-            time_windows[np.random.randint(len(time_windows))] for _ in range(n_orders)
-        ]
+        starts = np.arange(10 * 3600, 22 * 3600, 30 * 60)
+        start = starts[np.random.randint(len(starts), size=n_orders)]
+        order_time_windows = np.column_stack([start, start + 30 * 60])
 
     if parameters.model_type == ModelType.live:
-        pickup_order_time_windows = [(0, 24 * 3600) for _ in range(n_orders)]
+        pickup_order_time_windows = np.tile([0, 24 * 3600], (n_orders, 1))
         return create_data_pu_del_model_from_orders(
             order_locs,
             order_time_windows,
             order_num_items,
+            None,
             pickup_loc,
             n_couriers,
             pickup_order_time_windows,
@@ -531,6 +660,7 @@ def create_random_data_model_test(
         order_locs,
         order_time_windows,
         order_num_items,
+        None,
         pickup_loc,
         n_couriers,
         parameters,
@@ -538,14 +668,22 @@ def create_random_data_model_test(
     )
 
 
+def read_orders_csv(file_name: str) -> "pd.DataFrame":
+    """Read the orders from a csv file (see the input section of the README)."""
+    import pandas as pd
+
+    print(f"Loading {file_name} ...")
+    df_in = pd.read_csv(file_name)
+    df_in.columns = df_in.columns.str.strip()
+    return df_in
+
+
 def create_data_model_from_csv_file(
     file_name: str,
     parameters: VRPParameters,
     return_df=False,
 ):
-    print(f"Loading {file_name} ...")
-    df_in = pd.read_csv(file_name)
-    df_in.columns = df_in.columns.str.strip()
+    df_in = read_orders_csv(file_name)
     data = create_data_model_from_dataframe(df_in, parameters)
     if return_df:
         return data, df_in
@@ -554,7 +692,7 @@ def create_data_model_from_csv_file(
 
 
 def create_data_model_from_dataframe(
-    df: pd.DataFrame,
+    df: "pd.DataFrame",
     parameters: VRPParameters,
 ):
     """
@@ -0,0 +1,368 @@
+"""
+Insert new orders in an existing plan without solving the full model again.
+
+A plan is a dictionary with:
+- data: the data model (see `input_data_generator`),
+- parameters: the VRP parameters,
+- routes: list of routes with the node indices (without depot), one per used vehicle.
+
+The matrices of the data model are extended with only the rows and columns of the new
+nodes, then each order is inserted at the cheapest feasible position of all routes
+(or in a new route), evaluating all positions at once.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import replace
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+
+from .distance import calculate_distances, coord_distance
+from .initial_solution import create_initial_routes
+from .input_data_generator import intern_locations
+from .model_factory import model_factory
+from .process_solution import cost_matrix_field
+from .vrp_parameters import ModelType, VRPParameters
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def create_plan(data: dict, parameters: VRPParameters, result: dict) -> dict:
+    """Create a plan of the solve result (see `VRPModel.solve()`) and its data model."""
+    return {
+        "data": data,
+        "parameters": parameters,
+        "routes": create_initial_routes(result, data),
+    }
+
+
+def is_pickup_delivery(data: dict) -> bool:
+    return "pickups_deliveries" in data
+
+
+def extend_matrix(matrix: np.ndarray, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """Add the rows (k, n + k) and columns (n + k, k) of k new nodes to the matrix (n, n)."""
+    n_old = len(matrix)
+    extended = np.zeros((n_old + rows.shape[0],) * 2, dtype=matrix.dtype)
+    extended[:n_old, :n_old] = matrix
+    extended[:, n_old:] = columns
+    extended[n_old:, :] = rows
+    return extended
+
+
+def extend_data_model(
+    data: dict,
+    new_locations: np.ndarray,
+    new_is_pickup: np.ndarray,
+    parameters: VRPParameters,
+    dist_func,
+):
+    """
+    Extend the distance, time and cost matrices with the new nodes (in place), using
+    the same rules as `create_data_model_from_orders`/`create_data_pu_del_model_from_orders`.
+    """
+    n_old = len(data["locations"])
+    locations = np.concatenate([data["locations"], new_locations])
+    n_nodes = len(locations)
+
+    is_pickup = np.zeros(n_nodes, dtype=bool)
+    is_pickup[data["depot"]] = True
+    if is_pickup_delivery(data):
+        is_pickup[[pickup for pickup, _ in data["pickups_deliveries"]]] = True
+    is_pickup[n_old:] = new_is_pickup
+
+    # distance from all nodes to the new nodes, between new nodes use the upper triangle
+    # for both directions as `calculate_distance_matrix`.
+    dist_to_new = calculate_distances(locations, new_locations, dist_func)
+    new_block = np.triu(dist_to_new[n_old:], 1)
+    dist_to_new[n_old:] = new_block + new_block.T
+    dist_from_new = dist_to_new.T.copy()
+    # Setting distance to depot 0, since we don't want to go back.
+    dist_from_new[:, data["depot"]] = 0
+
+    time_to_new = dist_to_new / parameters.speed
+    time_to_new[:, ~new_is_pickup] += parameters.waiting_time_at_delivery
+    time_from_new = dist_from_new / parameters.speed
+    time_from_new[:, ~is_pickup] += parameters.waiting_time_at_delivery
+    time_from_new[:, data["depot"]] = 0
+    for i in range(n_nodes - n_old):
+        time_to_new[n_old + i, i] = time_from_new[i, n_old + i] = 0
+
+    if is_pickup_delivery(data):
+        cost_to_new, cost_from_new = time_to_new.copy(), time_from_new.copy()
+        cost_to_new[data["depot"], new_is_pickup] += parameters.courier_cost
+    else:
+        cost_to_new, cost_from_new = dist_to_new.copy(), dist_from_new.copy()
+        cost_to_new[data["depot"], :] += parameters.courier_cost
+
+    for field, rows, columns in [
+        ("distance_matrix", dist_from_new, dist_to_new),
+        ("time_matrix", time_from_new, time_to_new),
+        ("cost_matrix", cost_from_new, cost_to_new),
+    ]:
+        data[field] = extend_matrix(
+            data[field], rows.round().astype(np.int64), columns.round().astype(np.int64)
+        )
+
+    data["locations"] = locations
+    _, data["location_index"] = intern_locations(locations)
+
+
+def order_groups(orders: "pd.DataFrame") -> List[List[int]]:
+    """Positions of the orders per bundle (`bundle_id`), each order is a group if not set."""
+    if "bundle_id" not in orders.columns:
+        return [[i] for i in range(orders.shape[0])]
+    bundle_ids = orders["bundle_id"].values
+    groups: Dict[int, List[int]] = dict()
+    for i, bundle_id in enumerate(bundle_ids):
+        groups.setdefault(bundle_id, []).append(i)
+    return list(groups.values())
+
+
+def add_orders_to_data_model(
+    data: dict, new_orders: "pd.DataFrame", parameters: VRPParameters, dist_func
+) -> List[List[int]]:
+    """
+    Add the orders to the data model (in place) and return the new nodes per order,
+    i.e. [delivery] or [pickup, delivery].
+    The orders with the same `bundle_id` are added as an on the way bundle (same vehicle), the
+    new orders are not bundled with the orders that are already in the data model.
+    """
+    n_new = new_orders.shape[0]
+    n_old = len(data["locations"])
+    order_locations = new_orders[["delivery_lat", "delivery_lon"]].values
+    order_ids = new_orders["id"] if "id" in new_orders.columns else new_orders["order_id"]
+    order_time_windows = np.int_(new_orders[["time_window_start_s", "time_window_end_s"]].values)
+    order_number_items = new_orders["order_number_items"].values
+    weights = new_orders["weight"].values if "weight" in new_orders else np.zeros(n_new)
+
+    if is_pickup_delivery(data):
+        pickup_location = data["locations"][data["depot"]]
+        new_locations = np.concatenate([[pickup_location] * n_new, order_locations])
+        new_is_pickup = np.arange(2 * n_new) < n_new
+        new_nodes = [[n_old + i, n_old + n_new + i] for i in range(n_new)]
+        pickup_time_windows = np.int_(
+            new_orders[["pickup_time_window_start_s", "pickup_time_window_end_s"]].values
+        )
+        time_windows = np.concatenate([pickup_time_windows, order_time_windows])
+        number_of_items = np.append(order_number_items, [0] * n_new)
+        new_weights = np.append(weights, [0] * n_new)
+        node_names = [f"P{i}" for i in order_ids] + [f"D{i}" for i in order_ids]
+        data["pickups_deliveries"] = list(data["pickups_deliveries"]) + [
+            tuple(nodes) for nodes in new_nodes
+        ]
+    else:
+        new_locations = order_locations
+        new_is_pickup = np.zeros(n_new, dtype=bool)
+        new_nodes = [[n_old + i] for i in range(n_new)]
+        time_windows = order_time_windows
+        number_of_items = order_number_items
+        new_weights = weights
+        node_names = list(map(str, order_ids))
+
+    extend_data_model(data, new_locations, new_is_pickup, parameters, dist_func)
+
+    if "time_windows" in data:
+        data["time_windows"] = np.concatenate([data["time_windows"], time_windows])
+    data["number_of_items"] = np.append(data["number_of_items"], number_of_items).round()
+    data["number_of_items"] = data["number_of_items"].astype(np.int64)
+    if "weights" in data:
+        data["weights"] = np.append(data["weights"], new_weights).round().astype(np.int64)
+        data["courier_weight_capacities"] = (
+            list(data["courier_weight_capacities"]) + [parameters.courier_weight_capacity] * n_new
+        )
+    data["courier_item_capacities"] = (
+        list(data["courier_item_capacities"]) + [parameters.courier_item_capacity] * n_new
+    )
+    data["node_names"] = list(data["node_names"]) + node_names
+    bundles = [[new_nodes[i][0] for i in group] for group in order_groups(new_orders)]
+    bundles = [bundle for bundle in bundles if len(bundle) > 1]
+    if len(bundles) > 0:
+        data["on_the_way_bundles"] = list(data.get("on_the_way_bundles", [])) + bundles
+    data["num_vehicles"] += n_new
+    data["meta"] = {**data["meta"], "n_orders": data["meta"]["n_orders"] + n_new}
+    return new_nodes
+
+
+def evaluate_routes(data: dict, parameters: VRPParameters, routes: np.ndarray):
+    """
+    Evaluate several routes of the same length at once.
+    Args:
+        data: data model
+        parameters: VRP parameters
+        routes: (n_routes, length) node indices, starting at the depot
+    Returns:
+        feasible (bool per route), cost (per route)
+    """
+    from_nodes, to_nodes = routes[:, :-1], routes[:, 1:]
+    cost = data[cost_matrix_field(parameters.model_type)][from_nodes, to_nodes].sum(axis=1)
+
+    feasible = np.ones(len(routes), dtype=bool)
+    if parameters.max_delivery_distance is not None:
+        distance = data["distance_matrix"][from_nodes, to_nodes].sum(axis=1)
+        feasible &= distance <= parameters.max_delivery_distance
+    if parameters.model_type == ModelType.distance:
+        return feasible, cost
+
+    times = data["time_matrix"][from_nodes, to_nodes]
+    feasible &= times.sum(axis=1) <= parameters.max_delivery_time
+    if parameters.model_type == ModelType.time:
+        return feasible, cost
+
+    feasible &= data["number_of_items"][routes].sum(axis=1) <= parameters.courier_item_capacity
+    if "weights" in data:
+        feasible &= data["weights"][routes].sum(axis=1) <= parameters.courier_weight_capacity
+    if "time_windows" not in data or parameters.model_type == ModelType.no_tw:
+        return feasible, cost
+
+    # Propagate the interval of feasible times at each node: the vehicle can wait at most
+    # allowed_waiting_time_at_del at each node and the start time of the route is free.
+    time_windows = data["time_windows"]
+    earliest = np.full(len(routes), time_windows[data["depot"]][0])
+    latest = np.full(len(routes), time_windows[data["depot"]][1])
+    for k in range(times.shape[1]):
+        window = time_windows[to_nodes[:, k]]
+        earliest = np.maximum(earliest + times[:, k], window[:, 0])
+        latest = np.minimum(
+            latest + times[:, k] + parameters.allowed_waiting_time_at_del,
+            np.minimum(window[:, 1], parameters.max_time_duration),
+        )
+        feasible &= earliest <= latest
+    return feasible, cost
+
+
+def insertion_candidates(route: List[int], new_nodes: List[int], depot: int) -> np.ndarray:
+    """
+    All routes (incl. depot) that insert the new nodes in the route, keeping the order of
+    the new nodes (i.e. the pickup before the delivery).
+    """
+    candidates = [[depot] + list(route)]
+    previous_node = depot
+    for node in new_nodes:
+        candidates = [
+            candidate[:position] + [node] + candidate[position:]
+            for candidate in candidates
+            for position in range(candidate.index(previous_node) + 1, len(candidate) + 1)
+        ]
+        previous_node = node
+    return np.array(candidates, dtype=np.int64)
+
+
+def insert_nodes(
+    plan: dict, new_nodes: List[int], only_route: Optional[int] = None
+) -> Optional[Dict]:
+    """
+    Insert the nodes of an order in the route with the lowest increase in cost, or only in the
+    route with index `only_route` if set.
+    Returns the insertion (route index and increase in cost) or None if not feasible.
+    """
+    data, parameters, routes = plan["data"], plan["parameters"], plan["routes"]
+    best = None
+    candidate_routes = list(routes)
+    if len(routes) < data["num_vehicles"]:
+        candidate_routes.append([])
+    for route_index, route in enumerate(candidate_routes):
+        if only_route is not None and route_index != only_route:
+            continue
+        current_route = np.array([[data["depot"]] + list(route)], dtype=np.int64)
+        current_cost = evaluate_routes(data, parameters, current_route)[1][0]
+        candidates = insertion_candidates(route, new_nodes, data["depot"])
+        feasible, cost = evaluate_routes(data, parameters, candidates)
+        if not feasible.any():
+            continue
+        cost = np.where(feasible, cost - current_cost, np.iinfo(np.int64).max)
+        i = int(np.argmin(cost))
+        if best is None or cost[i] < best["cost"]:
+            best = {"route_index": route_index, "cost": int(cost[i]), "route": candidates[i]}
+
+    if best is None:
+        return None
+
+    new_route = best.pop("route")[1:].tolist()
+    if best["route_index"] < len(routes):
+        routes[best["route_index"]] = new_route
+    else:
+        routes.append(new_route)
+    return best
+
+
+def insert_bundle(plan: dict, nodes_per_order: List[List[int]]) -> Optional[Dict]:
+    """
+    Insert the nodes of the orders of a bundle in the route with the lowest total increase in
+    cost, all in the same route. Returns the insertion or None if not feasible.
+    """
+    if len(nodes_per_order) == 1:
+        return insert_nodes(plan, nodes_per_order[0])
+
+    best = None
+    n_routes = len(plan["routes"])
+    for route_index in range(n_routes + int(n_routes < plan["data"]["num_vehicles"])):
+        trial_plan = {**plan, "routes": [list(route) for route in plan["routes"]]}
+        cost = 0
+        for nodes in nodes_per_order:
+            insertion = insert_nodes(trial_plan, nodes, only_route=route_index)
+            if insertion is None:
+                break
+            cost += insertion["cost"]
+        else:
+            if best is None or cost < best["cost"]:
+                best = {"route_index": route_index, "cost": cost, "routes": trial_plan["routes"]}
+
+    if best is None:
+        return None
+    plan["routes"] = best.pop("routes")
+    return best
+
+
+def insert_orders(
+    plan: dict,
+    new_orders: "pd.DataFrame",
+    dist_func=coord_distance,
+) -> dict:
+    """
+    Insert the new orders in the plan (in place) without solving the full model.
+    The orders of a bundle (see `add_orders_to_data_model`) are inserted in the same route,
+    or are all unassigned.
+    Args:
+        plan: the current plan (see `create_plan`)
+        new_orders: dataframe with the new orders (same columns as the input file)
+        dist_func: distance function
+    Returns:
+        the plan, with for this insertion the "inserted" orders (name: route index) and
+        the "unassigned" orders that could not be inserted in any route
+    """
+    new_nodes_per_order = add_orders_to_data_model(
+        plan["data"], new_orders, plan["parameters"], dist_func
+    )
+    plan["inserted"] = dict()
+    plan["unassigned"] = []
+    for group in order_groups(new_orders):
+        names = [plan["data"]["node_names"][new_nodes_per_order[i][-1]] for i in group]
+        insertion = insert_bundle(plan, [new_nodes_per_order[i] for i in group])
+        if insertion is None:
+            plan["unassigned"] += names
+        else:
+            plan["inserted"].update({name: insertion["route_index"] for name in names})
+    return plan
+
+
+def reoptimize_worker(data: dict, parameters: VRPParameters, routes: List[List[int]]) -> dict:
+    """Solve the model starting from the routes (run in a worker process)."""
+    return model_factory(data, parameters).solve(initial_solution=routes)
+
+
+def reoptimize_plan(plan: dict, max_calc_time: Optional[int] = None) -> Future:
+    """
+    Solve the model of the plan in a background process, starting from the plan's routes.
+    Returns a future with the result (see `VRPModel.solve()`).
+    """
+    parameters = plan["parameters"]
+    if max_calc_time is not None:
+        parameters = replace(parameters, max_calc_time=max_calc_time)
+    executor = ProcessPoolExecutor(max_workers=1)
+    future = executor.submit(
+        reoptimize_worker, plan["data"], parameters, [list(r) for r in plan["routes"]]
+    )
+    executor.shutdown(wait=False)
+    return future
@@ -0,0 +1,196 @@
+"""
+Generate synthetic orders (seeded and vectorized) with the columns of the input csv, such that
+they can be solved with `create_data_model_from_dataframe` or `run_solve_from_dataframe`.
+
+- Stores: one or more stores (pickup locations) spread in the city, each order is picked up
+  at one of them. The models have one pickup location, solve the orders of each store
+  separately (see `orders_per_store`).
+- Delivery locations: uniform in a circle around the store, or clustered around a few random
+  centers (neighbourhoods) near the store.
+- Time windows: the start of the delivery time window follows a daily demand profile with a
+  lunch and a (larger) dinner peak, or is uniform over the opening hours. The pickup time window
+  starts a lead time before the delivery window.
+- Items and weights: number of items 1 + Poisson, weight log-normal per item.
+- Bundles: a fraction of the orders is bundled with other orders of the same store with a
+  similar time window (`bundle_id`, only added if bundle_fraction is set), the other orders
+  have their own bundle id.
+"""
+
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+SPATIAL_DISTRIBUTIONS = ["uniform", "clustered"]
+TIME_WINDOW_PROFILES = ["dinner_peak", "uniform"]
+# (weight, mean, standard deviation) of the peaks of the dinner_peak profile (s since midnight)
+DEMAND_PEAKS = [(0.3, 13.5 * 3600, 0.75 * 3600), (0.6, 20.5 * 3600, 3600)]
+METERS_PER_DEGREE = 111320.0
+
+
+def offset_locations(center, dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+    """(latitude, longitude) of the offsets (m) east (dx) and north (dy) of the center."""
+    lat = center[0] + dy / METERS_PER_DEGREE
+    lon = center[1] + dx / (METERS_PER_DEGREE * np.cos(np.radians(center[0])))
+    return np.column_stack([lat, lon])
+
+
+def uniform_in_circle(rng: np.random.Generator, n: int, radius: float) -> Tuple[np.ndarray, ...]:
+    """Offsets (dx, dy) of n points uniform in a circle of the radius (m)."""
+    r = radius * np.sqrt(rng.random(n))
+    angle = rng.random(n) * 2 * np.pi
+    return r * np.cos(angle), r * np.sin(angle)
+
+
+def time_window_starts(
+    rng: np.random.Generator, n: int, profile: str, opening_s: int, closing_s: int
+) -> np.ndarray:
+    """Start (s) of the delivery time windows following the daily demand profile."""
+    if profile == "uniform":
+        starts = rng.uniform(opening_s, closing_s, n)
+    elif profile == "dinner_peak":
+        # the remaining weight is spread uniformly over the opening hours
+        weights = [w for w, _, _ in DEMAND_PEAKS]
+        peak = rng.choice(len(DEMAND_PEAKS) + 1, size=n, p=weights + [1 - sum(weights)])
+        means = np.array([m for _, m, _ in DEMAND_PEAKS] + [0.0])[peak]
+        stds = np.array([s for _, _, s in DEMAND_PEAKS] + [0.0])[peak]
+        starts = np.where(
+            peak < len(DEMAND_PEAKS),
+            rng.normal(means, np.maximum(stds, 1)),
+            rng.uniform(opening_s, closing_s, n),
+        )
+    else:
+        raise Exception(f"Unknown time window profile {profile}")
+    return np.clip(starts, opening_s, closing_s).astype(np.int64)
+
+
+def bundle_ids(
+    rng: np.random.Generator,
+    stores: np.ndarray,
+    starts: np.ndarray,
+    bundle_fraction: float,
+    bundle_size: int,
+) -> np.ndarray:
+    """
+    Bundle id per order: a fraction of the orders is bundled per bundle_size orders of the same
+    store with the closest time window starts, the others are a bundle on their own.
+    """
+    n = len(stores)
+    ids = np.arange(n)
+    bundled = np.flatnonzero(rng.random(n) < bundle_fraction)
+    if len(bundled) < 2 or bundle_size < 2:
+        return ids
+    bundled = bundled[np.lexsort((starts[bundled], stores[bundled]))]
+    # the first order of each group gives the id, groups of different stores are not bundled
+    group_first = bundled[(np.arange(len(bundled)) // bundle_size) * bundle_size]
+    same_store = stores[group_first] == stores[bundled]
+    ids[bundled[same_store]] = group_first[same_store]
+    return ids
+
+
+def generate_orders(
+    n_orders: int,
+    seed: Optional[int] = None,
+    center: Tuple[float, float] = (52.3702, 4.8952),
+    n_stores: int = 1,
+    city_radius_m: float = 5000,
+    delivery_radius_m: float = 3000,
+    spatial: str = "uniform",
+    n_clusters: Optional[int] = None,
+    cluster_std_m: float = 300,
+    time_window_profile: str = "dinner_peak",
+    opening_s: int = 11 * 3600,
+    closing_s: int = 23 * 3600,
+    time_window_width_s: int = 30 * 60,
+    pickup_lead_time_s: int = 45 * 60,
+    mean_items: float = 2.0,
+    mean_item_weight: float = 0.7,
+    bundle_fraction: float = 0.0,
+    bundle_size: int = 2,
+) -> "pd.DataFrame":
+    """
+    Generate the orders (see the module description), the same seed gives the same orders.
+    Args:
+        n_orders: number of orders
+        seed: random seed
+        center: (latitude, longitude) of the city center
+        n_stores: number of stores, uniform in the city (only at the center if 1)
+        city_radius_m: radius (m) of the city
+        delivery_radius_m: maximum distance (m) of the deliveries to their store
+        spatial: distribution of the delivery locations ("uniform" or "clustered")
+        n_clusters: number of clusters per store (1 per 50 orders of the store if not set)
+        cluster_std_m: standard deviation (m) of the locations around the cluster center
+        time_window_profile: distribution of the time windows ("dinner_peak" or "uniform")
+        opening_s, closing_s: opening hours (s since midnight), the time windows start in them
+        time_window_width_s: width of the delivery time windows (s)
+        pickup_lead_time_s: the pickup time window starts this time (s) before the delivery one
+        mean_items: mean number of items per order
+        mean_item_weight: mean weight per item
+        bundle_fraction: fraction of the orders that is bundled
+        bundle_size: number of orders per bundle
+    Returns:
+        dataframe with the orders, with the columns of the input csv, store_address_id and
+        bundle_id (if bundle_fraction > 0)
+    """
+    import pandas as pd
+
+    if spatial not in SPATIAL_DISTRIBUTIONS:
+        raise Exception(f"Unknown spatial distribution {spatial}")
+    rng = np.random.default_rng(seed)
+
+    if n_stores == 1:
+        store_offsets = np.zeros((1, 2))
+    else:
+        store_offsets = np.column_stack(uniform_in_circle(rng, n_stores, city_radius_m))
+    stores = rng.integers(n_stores, size=n_orders)
+
+    if spatial == "uniform":
+        dx, dy = uniform_in_circle(rng, n_orders, delivery_radius_m)
+    else:
+        n_store_clusters = n_clusters or max(1, n_orders // (50 * n_stores))
+        # the cluster centers are within the delivery radius of their store
+        cluster_dx, cluster_dy = uniform_in_circle(
+            rng, n_stores * n_store_clusters, max(delivery_radius_m - 2 * cluster_std_m, 0)
+        )
+        cluster = stores * n_store_clusters + rng.integers(n_store_clusters, size=n_orders)
+        dx = cluster_dx[cluster] + rng.normal(0, cluster_std_m, n_orders)
+        dy = cluster_dy[cluster] + rng.normal(0, cluster_std_m, n_orders)
+    pickup_locations = offset_locations(center, store_offsets[stores, 0], store_offsets[stores, 1])
+    delivery_locations = offset_locations(
+        center, store_offsets[stores, 0] + dx, store_offsets[stores, 1] + dy
+    )
+
+    starts = time_window_starts(rng, n_orders, time_window_profile, opening_s, closing_s)
+    n_items = 1 + rng.poisson(max(mean_items - 1, 0), n_orders)
+    # log-normal weight per item with the mean weight
+    sigma = 0.5
+    item_weights = rng.lognormal(np.log(mean_item_weight) - sigma**2 / 2, sigma, n_orders)
+
+    df = pd.DataFrame(
+        {
+            "order_id": np.arange(1, n_orders + 1),
+            "store_address_id": stores,
+            "pickup_lat": pickup_locations[:, 0],
+            "pickup_lon": pickup_locations[:, 1],
+            "delivery_lat": delivery_locations[:, 0],
+            "delivery_lon": delivery_locations[:, 1],
+            "order_number_items": n_items,
+            "weight": np.maximum(np.round(n_items * item_weights, 1), 0.1),
+            "time_window_start_s": starts,
+            "time_window_end_s": starts + time_window_width_s,
+            "pickup_time_window_start_s": np.maximum(starts - pickup_lead_time_s, 0),
+            "pickup_time_window_end_s": starts + time_window_width_s,
+        }
+    )
+    if bundle_fraction > 0:
+        df["bundle_id"] = bundle_ids(rng, stores, starts, bundle_fraction, bundle_size)
+    return df
+
+
+def orders_per_store(df: "pd.DataFrame") -> Dict[int, "pd.DataFrame"]:
+    """The orders of each store, each can be solved as a separate model."""
+    return {
+        store: df_store.reset_index(drop=True) for store, df_store in df.groupby("store_address_id")
+    }
@@ -0,0 +1,237 @@
+"""
+Persistent on-disk cache of the distance matrices between (unique) locations.
+
+The matrices and their locations are stored as `.npy` files, keyed by a hash of the locations
+and the distance function, and loaded memory-mapped. The same locations in a different order
+are reordered from the cached matrix. When the cache exceeds its maximum size the least
+recently used matrices are removed, a cache hit only updates the modification time of the
+matrix file. When there is no matrix for the same locations, the distances of the largest
+cached subset of the locations are reused and only the distances of the other locations are
+calculated.
+
+The index (with the distance function and number of locations of each matrix) is shared by
+parallel workers: it is only changed while holding a file lock (on POSIX systems), and the
+index and the matrices are written atomically, such that they can be read without the lock.
+"""
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, the index is not locked
+    fcntl = None
+
+import numpy as np
+
+from .distance import calculate_all_pairs_distances, calculate_distances
+
+INDEX_FILE = "index.json"
+LOCK_FILE = "index.lock"
+
+
+def distance_func_name(distance_func) -> Optional[str]:
+    """
+    Name to identify the distance function, None if it can't be identified (e.g. lambda or
+    functools.partial).
+    """
+    module = getattr(distance_func, "__module__", None)
+    qualname = getattr(distance_func, "__qualname__", None)
+    if module is None or qualname is None or "<" in qualname:
+        return None
+    return f"{module}.{qualname}"
+
+
+def locations_key(locations: np.ndarray, distance_func_id: str) -> str:
+    """Fingerprint of the locations (in order) and the distance function."""
+    h = hashlib.sha1(distance_func_id.encode())
+    h.update(np.ascontiguousarray(locations, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def entry_size(n: int) -> int:
+    """Size (bytes) of the matrix and the locations of n locations."""
+    return 8 * (n * n + 2 * n)
+
+
+class DistanceMatrixCache:
+    """
+    Cache of the distance matrices between all pairs of locations.
+    Parameters:
+        cache_dir: directory where the matrices are stored
+        max_size_mb: maximum size of all stored matrices (MB)
+    """
+
+    def __init__(self, cache_dir: str, max_size_mb: int = 1024):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str, name: str = "distances") -> str:
+        return os.path.join(self.cache_dir, f"{key}_{name}.npy")
+
+    def read_index(self) -> Dict[str, dict]:
+        path = os.path.join(self.cache_dir, INDEX_FILE)
+        if not os.path.exists(path):
+            return dict()
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except ValueError:
+            print("Warning: distance matrix cache index is corrupt, starting a new one")
+            return dict()
+
+    def write_index(self, index: Dict[str, dict]):
+        path = os.path.join(self.cache_dir, INDEX_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def locked_index(self):
+        """
+        Read the index while holding the lock, the changes to it are written when leaving.
+        The lock is held for the read-modify-write only, not while calculating distances.
+        """
+        with open(os.path.join(self.cache_dir, LOCK_FILE), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                index = self.read_index()
+                yield index
+                self.write_index(index)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def find_subset(self, index: Dict[str, dict], locations: np.ndarray, distance_func_id: str):
+        """
+        Find the largest cached matrix of which all locations are in `locations` (the same
+        locations in any order included), loading only the locations of the matrices that are
+        not larger than `locations`.
+        Returns the key and the index in `locations` of each cached location.
+        """
+        location_index = {tuple(loc): i for i, loc in enumerate(locations.tolist())}
+        candidates = sorted(
+            (
+                (entry["n"], key)
+                for key, entry in index.items()
+                if entry["distance_func"] == distance_func_id and entry["n"] <= len(locations)
+            ),
+            reverse=True,
+        )
+        for _, key in candidates:
+            try:
+                cached_locations = np.load(self._path(key, "locations"))
+            except OSError:
+                # evicted by another worker
+                continue
+            positions = [location_index.get(tuple(loc)) for loc in cached_locations.tolist()]
+            if None not in positions:
+                return key, np.array(positions, dtype=np.int64)
+        return None, None
+
+    def last_used(self, key: str) -> float:
+        """The time the matrix was stored or last used (modification time of its file)."""
+        try:
+            return os.path.getmtime(self._path(key))
+        except OSError:
+            return 0
+
+    def touch(self, key: str):
+        """Mark the matrix as used, without changing the index."""
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def evict(self, index: Dict[str, dict]):
+        """Remove the least recently used matrices until the cache is within its size."""
+        total_size = sum(entry_size(entry["n"]) for entry in index.values())
+        for key in sorted(index, key=self.last_used):
+            if total_size <= self.max_size_bytes:
+                break
+            for name in ["distances", "locations"]:
+                if os.path.exists(self._path(key, name)):
+                    os.remove(self._path(key, name))
+            total_size -= entry_size(index.pop(key)["n"])
+
+    def save_array(self, key: str, array: np.ndarray, name: str = "distances"):
+        """Write the array atomically, a parallel worker never loads a partial file."""
+        path = self._path(key, name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+    def store(self, index: Dict[str, dict], key: str, locations, distance_func_id):
+        index[key] = {"distance_func": distance_func_id, "n": len(locations)}
+        self.evict(index)
+
+    def all_pairs_distances(self, locations, distance_func) -> np.ndarray:
+        """
+        Get the (symmetric) distance between all pairs of locations from the cache, or
+        calculate them (reusing a cached subset) and store them.
+        """
+        distance_func_id = distance_func_name(distance_func)
+        if distance_func_id is None:
+            return calculate_all_pairs_distances(locations, distance_func)
+
+        locations = np.ascontiguousarray(locations, dtype=np.float64)
+        key = locations_key(locations, distance_func_id)
+        # the index is written atomically, it is only locked to change it
+        index = self.read_index()
+        if key in index:
+            try:
+                # copy-on-write: reads from disk, changes stay in memory
+                distances = np.load(self._path(key), mmap_mode="c")
+                self.touch(key)
+                return distances
+            except OSError:
+                # evicted by another worker, the matrix is calculated and stored again
+                pass
+        subset_key, positions = self.find_subset(index, locations, distance_func_id)
+        subset = None
+        if subset_key is not None:
+            try:
+                # a memory map stays valid when the file is evicted by another worker
+                subset = np.load(self._path(subset_key), mmap_mode="r")
+                self.touch(subset_key)
+            except OSError:
+                pass
+
+        if subset is None:
+            distances = calculate_all_pairs_distances(locations, distance_func)
+        elif len(positions) == len(locations):
+            # the same locations in a different order
+            order = np.argsort(positions)
+            return subset[np.ix_(order, order)]
+        else:
+            distances = np.zeros((len(locations), len(locations)))
+            distances[np.ix_(positions, positions)] = subset
+            is_new = np.ones(len(locations), dtype=bool)
+            is_new[positions] = False
+            new = np.flatnonzero(is_new)
+            new_distances = calculate_distances(locations, locations[new], distance_func)
+            # between new locations use the upper triangle for both directions
+            new_block = np.triu(new_distances[new], 1)
+            new_distances[new] = new_block + new_block.T
+            distances[:, new] = new_distances
+            distances[new, :] = new_distances.T
+
+        self.save_array(key, locations, "locations")
+        self.save_array(key, distances)
+        with self.locked_index() as index:
+            self.store(index, key, locations, distance_func_id)
+        return distances
+
+
+def get_distance_matrix_cache(parameters) -> Optional[DistanceMatrixCache]:
+    """Create the distance matrix cache if it is set in the VRP parameters."""
+    if not parameters.distance_cache_dir:
+        return None
+    return DistanceMatrixCache(parameters.distance_cache_dir, parameters.distance_cache_max_size_mb)
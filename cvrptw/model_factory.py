@@ -0,0 +1,21 @@
+from .distance_vrp import DistanceVRP
+from .live_vrp import LiveVRP
+from .notw_vrp import NoTWVRP
+from .scheduled_vrp import ScheduledVRP
+from .time_vrp import TimeVRP
+from .vrp_parameters import ModelType, VRPParameters
+
+
+def model_factory(data, parameters: VRPParameters):
+    """Create a VPR model based on the type."""
+    if parameters.model_type == ModelType.distance:
+        return DistanceVRP(data, parameters)
+    elif parameters.model_type == ModelType.time:
+        return TimeVRP(data, parameters)
+    elif parameters.model_type == ModelType.scheduled:
+        return ScheduledVRP(data, parameters)
+    elif parameters.model_type == ModelType.live:
+        return LiveVRP(data, parameters)
+    elif parameters.model_type == ModelType.no_tw:
+        return NoTWVRP(data, parameters)
+    raise Exception(f"Unknown solver type {parameters.model_type.name}")
@@ -0,0 +1,86 @@
+"""
+Granular neighborhoods: the k nearest successors of each node, such that the local search only
+has to evaluate moves between nodes that are close to each other.
+
+The neighbors are selected by distance from the distance matrix of the data model, for the
+scheduled and live models only arcs that can be feasible (see `arc_pruning`) are used.
+The search is limited to the neighbors in two ways:
+- the local search operators of OR-tools only use the nearest neighbors (search parameters),
+- optionally the other arcs are removed from the model (restrict_to_neighbors). Arcs from and to
+  the depot, and nodes at the depot location (e.g. the pickups), are kept.
+"""
+
+from typing import List
+
+import numpy as np
+
+from .arc_pruning import infeasible_arcs
+from .vrp_parameters import ModelType, VRPParameters
+
+# number of rows of the distance matrix that are processed at once
+ROW_BLOCK_SIZE = 1024
+
+
+def nearest_neighbors(data: dict, parameters: VRPParameters, n_neighbors: int) -> List[np.ndarray]:
+    """
+    The n nearest successors (node indices, sorted by distance) of each node, excluding the
+    depot and infeasible arcs. Nodes with less feasible successors have shorter lists.
+    """
+    distance_matrix = np.asarray(data["distance_matrix"])
+    n_nodes = len(distance_matrix)
+    depot = data["depot"]
+    check_feasible = parameters.model_type in [ModelType.scheduled, ModelType.live]
+    infeasible = infeasible_arcs(data, parameters) if check_feasible else None
+    k = max(1, min(n_neighbors, n_nodes - 2))
+
+    neighbors = []
+    for start in range(0, n_nodes, ROW_BLOCK_SIZE):
+        rows = np.arange(start, min(start + ROW_BLOCK_SIZE, n_nodes))
+        distances = distance_matrix[rows].astype(float)
+        distances[np.arange(len(rows)), rows] = np.inf
+        distances[:, depot] = np.inf
+        if infeasible is not None:
+            distances[infeasible[rows]] = np.inf
+
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+        order = np.argsort(nearest_distances, axis=1, kind="stable")
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        nearest_distances = np.take_along_axis(nearest_distances, order, axis=1)
+        for row_nearest, row_distances in zip(nearest, nearest_distances):
+            neighbors.append(row_nearest[np.isfinite(row_distances)])
+    return neighbors
+
+
+def non_neighbor_arcs(data: dict, neighbors: List[np.ndarray]) -> List[np.ndarray]:
+    """
+    The successors of each node that are not its neighbors, the arcs from and to the depot and
+    nodes at the depot location are not included.
+    """
+    n_nodes = len(neighbors)
+    depot = data["depot"]
+    if "location_index" in data:
+        location_index = np.asarray(data["location_index"])
+        at_depot = location_index == location_index[depot]
+    else:
+        at_depot = np.arange(n_nodes) == depot
+
+    arcs = []
+    for node, node_neighbors in enumerate(neighbors):
+        if at_depot[node]:
+            arcs.append(np.array([], dtype=np.int64))
+            continue
+        keep = at_depot.copy()
+        keep[node_neighbors] = True
+        keep[node] = True
+        arcs.append(np.flatnonzero(~keep))
+    return arcs
+
+
+def set_neighbor_search_parameters(search_parameters, n_neighbors: int, n_nodes: int):
+    """Only use the nearest neighbors in the local search operators of OR-tools (if supported)."""
+    fields = search_parameters.DESCRIPTOR.fields_by_name
+    if "ls_operator_neighbors_ratio" in fields:
+        search_parameters.ls_operator_neighbors_ratio = min(1.0, n_neighbors / max(1, n_nodes))
+    if "ls_operator_min_neighbors" in fields:
+        search_parameters.ls_operator_min_neighbors = n_neighbors
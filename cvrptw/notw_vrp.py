@@ -19,13 +19,11 @@ class NoTWVRP(TimeVRP):
     def _create_model(self):
         super()._create_model()
 
-        cost_callback = self.create_callback("cost_matrix")
-        self._transit_callback_index_cost = self.routing.RegisterTransitCallback(cost_callback)
+        self._transit_callback_index_cost = self.register_transit("cost_matrix")
 
         # Add number of items constraint.
         if "courier_item_capacities" in self.data:
-            items_callback = self.create_callback_1d("number_of_items")
-            items_callback_index = self.routing.RegisterUnaryTransitCallback(items_callback)
+            items_callback_index = self.register_unary_transit("number_of_items")
             self.routing.AddDimensionWithVehicleCapacity(
                 items_callback_index,
                 0,  # null capacity slack
@@ -38,8 +36,7 @@ class NoTWVRP(TimeVRP):
 
         # Add weight constraint.
         if "courier_weight_capacities" in self.data:
-            weight_callback = self.create_callback_1d("weights")
-            weight_callback_index = self.routing.RegisterUnaryTransitCallback(weight_callback)
+            weight_callback_index = self.register_unary_transit("weights")
             self.routing.AddDimensionWithVehicleCapacity(
                 weight_callback_index,
                 0,  # null capacity slack
@@ -0,0 +1,152 @@
+"""Solve a VRP model with a portfolio of search strategies in parallel processes."""
+
+import multiprocessing as mp
+import time
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+
+from .vrp_parameters import ConfigError
+
+# Note: None keeps the strategy of the model (see `get_search_parameters`) or the parameters.
+FIRST_SOLUTION_STRATEGIES = [
+    None,
+    "PARALLEL_CHEAPEST_INSERTION",
+    "PATH_CHEAPEST_ARC",
+    "LOCAL_CHEAPEST_INSERTION",
+    "SAVINGS",
+    "GLOBAL_CHEAPEST_ARC",
+    "SEQUENTIAL_CHEAPEST_INSERTION",
+    "PATH_MOST_CONSTRAINED_ARC",
+]
+LOCAL_SEARCH_METAHEURISTICS = [
+    None,
+    "GUIDED_LOCAL_SEARCH",
+    "SIMULATED_ANNEALING",
+    "TABU_SEARCH",
+]
+
+# extra time (s) on top of max_calc_time for the workers to build the model and process the result
+PORTFOLIO_GRACE_TIME = 10
+
+
+def strategy_combinations() -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    All combinations of first solution strategy and metaheuristic in diagonal order, such that
+    both vary between consecutive workers.
+    """
+    n_strategies = len(FIRST_SOLUTION_STRATEGIES)
+    n_metaheuristics = len(LOCAL_SEARCH_METAHEURISTICS)
+    return [
+        (FIRST_SOLUTION_STRATEGIES[i], LOCAL_SEARCH_METAHEURISTICS[(i + d) % n_metaheuristics])
+        for d in range(n_metaheuristics)
+        for i in range(n_strategies)
+    ]
+
+
+def portfolio_configurations(n_workers: int) -> List[Dict]:
+    """
+    Create the parameter overrides for each worker, the first worker uses the parameters as they
+    are. Each worker has a different combination of first solution strategy and metaheuristic,
+    when there are more workers than combinations they are repeated with a different seed.
+    """
+    combinations = strategy_combinations()
+    configurations = []
+    for i in range(n_workers):
+        strategy, metaheuristic = combinations[i % len(combinations)]
+        configuration = {"random_seed": i}
+        if strategy is not None:
+            configuration["first_solution_strategy"] = strategy
+        if metaheuristic is not None:
+            configuration["local_search_metaheuristic"] = metaheuristic
+        configurations.append(configuration)
+    return configurations
+
+
+def solve_worker(model_class, data, parameters, initial_solution) -> dict:
+    """Create the model and solve it (run in a worker process)."""
+    return model_class(data, parameters).solve(initial_solution)
+
+
+def is_better_result(result: dict, best_result: Optional[dict]) -> bool:
+    """
+    Check if the result has a solution with a lower cost than the best result so far, also
+    solutions found when the time limit was reached are compared.
+    """
+    if "routes" not in result:
+        return False
+    if best_result is None or "routes" not in best_result:
+        return True
+    return result["summary"]["total_cost"] < best_result["summary"]["total_cost"]
+
+
+def solve_portfolio(vrp_model, initial_solution=None) -> dict:
+    """
+    Solve the model in `n_portfolio_workers` processes, each with different search
+    parameters, and return the best result found within the time limit.
+    All workers start from the initial solution if set.
+    The result contains the per worker status in `result["solver"]["portfolio"]`.
+    """
+    n_workers = vrp_model.parameters.n_portfolio_workers
+    configurations = portfolio_configurations(n_workers)
+    max_calc_time = vrp_model.parameters.max_calc_time
+    if not max_calc_time:
+        raise ConfigError(
+            "max_calc_time is required for the portfolio, the metaheuristics never stop"
+        )
+    timeout = max_calc_time + PORTFOLIO_GRACE_TIME
+
+    print(f"Solving with a portfolio of {n_workers} workers ...")
+    t = time.time()
+    best_result = None
+    portfolio = []
+    # the pool is terminated at the end, which also stops the workers that timed out
+    with mp.Pool(processes=n_workers) as pool:
+        async_results = [
+            pool.apply_async(
+                solve_worker,
+                (
+                    type(vrp_model),
+                    vrp_model.data,
+                    replace(vrp_model.parameters, n_portfolio_workers=1, **configuration),
+                    initial_solution,
+                ),
+            )
+            for configuration in configurations
+        ]
+        for configuration, async_result in zip(configurations, async_results):
+            remaining = max(0.0, timeout - (time.time() - t))
+            try:
+                result = async_result.get(timeout=remaining)
+            except mp.TimeoutError:
+                portfolio.append({**configuration, "status": "time-out"})
+                continue
+            except Exception as e:
+                print("Error in portfolio worker:", e)
+                portfolio.append({**configuration, "status": "exception", "error": str(e)})
+                continue
+
+            portfolio.append(
+                {
+                    **configuration,
+                    "status": result["solver"]["status"],
+                    "duration": result["solver"].get("duration"),
+                    "total_cost": result.get("summary", {}).get("total_cost"),
+                }
+            )
+            if best_result is None or is_better_result(result, best_result):
+                best_result = result
+
+    duration = time.time() - t
+    if best_result is None:
+        best_result = {
+            "solver": {"model": vrp_model.model_name, "status_code": -1, "status": "exception"}
+        }
+
+    best_result["solver"]["duration"] = duration
+    best_result["solver"]["portfolio"] = portfolio
+
+    print("---portfolio stats----")
+    print("Status:  ", best_result["solver"]["status"])
+    print(f"Duration: {duration:.2f} s")
+
+    return best_result
@@ -1,14 +1,32 @@
-from typing import Dict, List
+from collections.abc import Sequence
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 
 from .vrp_parameters import ModelType, VehicleConstraintParameters, VRPParameters
 
+# fields with a value per node, that are also accumulated over the route
+ACCUMULATED_FIELDS = ["time", "distance", "cost", "load", "weight"]
+NODE_VALUE_FIELDS = ["index"] + [
+    name for field in ACCUMULATED_FIELDS for name in [field, f"{field}_accumulated"]
+]
+
+
+def cost_matrix_field(model_type: ModelType) -> str:
+    """The matrix that is used as arc cost by the model type."""
+    if model_type == ModelType.distance:
+        return "distance_matrix"
+    elif model_type == ModelType.time:
+        return "time_matrix"
+    return "cost_matrix"
+
 
 def add_node_lists_to_route(routes: List[Dict]) -> List[Dict]:
     """Add a simple list of the visited nodes (in the order) by index and name."""
     for route in routes:
         route["node_index_route"] = [n["node_index"] for n in route["route"]]
         route["node_index_names"] = [n["node_name"] for n in route["route"]]
-    return route
+    return routes
 
 
 def flag_vehicle_constraints(routes: List[Dict], vrp_parameters: VRPParameters) -> List[Dict]:
@@ -29,6 +47,136 @@ def flag_vehicle_constraints(routes: List[Dict], vrp_parameters: VRPParameters)
     return routes
 
 
+def extract_route_columns(solution, vrp_model) -> List[Dict]:
+    """
+    Extract the used routes of the solution as NumPy arrays (one value per visited node,
+    starting at the depot): node and routing indices, node names, locations, time windows,
+    time range (time dimension) and the time, distance, cost, load and weight of each node
+    with their accumulated values. The time, distance and cost of the arc to the node are taken
+    from the data matrices, such that the cost callback of the model is not called again.
+    """
+    data = vrp_model.data
+    routing = vrp_model.routing
+    has_time_dimension = vrp_model.model_type != ModelType.distance
+    time_dimension = routing.GetDimensionOrDie("Time") if has_time_dimension else None
+    arc_matrices = {
+        "time": np.asarray(data["time_matrix"]),
+        "distance": np.asarray(data["distance_matrix"]),
+        "cost": np.asarray(data[cost_matrix_field(vrp_model.model_type)]),
+    }
+    node_values = {
+        "load": np.asarray(data["number_of_items"]) if "number_of_items" in data else None,
+        "weight": np.asarray(data["weights"]) if "weights" in data else None,
+    }
+    locations = np.asarray(data["locations"])
+    time_windows = np.asarray(data["time_windows"]) if "time_windows" in data else None
+
+    route_columns = []
+    for vehicle_id in range(data["num_vehicles"]):
+        index = routing.Start(vehicle_id)
+        indices = []
+        while not routing.IsEnd(index):
+            indices.append(index)
+            index = solution.Value(routing.NextVar(index))
+        if len(indices) == 1:
+            # vehicle not used
+            continue
+
+        nodes = np.array([vrp_model.manager.IndexToNode(i) for i in indices], dtype=np.int64)
+        columns = {
+            "vehicle_id": vehicle_id,
+            "node_index": nodes,
+            "index": np.array(indices, dtype=np.int64),
+            "node_name": [data["node_names"][node] for node in nodes],
+            "location": locations[nodes],
+            "time_window": time_windows[nodes] if time_windows is not None else None,
+        }
+        if has_time_dimension:
+            time_vars = [time_dimension.CumulVar(i) for i in indices]
+            columns["time_start"] = np.array([solution.Min(v) for v in time_vars], dtype=np.int64)
+            columns["time_end"] = np.array([solution.Max(v) for v in time_vars], dtype=np.int64)
+        else:
+            columns["time_start"] = columns["time_end"] = None
+
+        for field, matrix in arc_matrices.items():
+            columns[field] = np.append([0], matrix[nodes[:-1], nodes[1:]])
+        # the arc cost of the solver is an integer
+        columns["cost"] = columns["cost"].astype(np.int64)
+        for field, values in node_values.items():
+            columns[field] = values[nodes] if values is not None else np.zeros_like(nodes)
+        for field in ACCUMULATED_FIELDS:
+            columns[f"{field}_accumulated"] = np.cumsum(columns[field])
+
+        for capacity in ["courier_item_capacities", "courier_weight_capacities"]:
+            if capacity in data:
+                columns[capacity] = data[capacity][vehicle_id]
+        route_columns.append(columns)
+
+    return route_columns
+
+
+def route_columns_to_dicts(route_columns: List[Dict], vrp_parameters: VRPParameters) -> List[Dict]:
+    """Create the routes as list of node dicts (see `process_solution_data`) from the columns."""
+    routes = []
+    for columns in route_columns:
+        values = {field: columns[field].tolist() for field in NODE_VALUE_FIELDS}
+        has_time_dimension = columns["time_start"] is not None
+        if has_time_dimension:
+            time_start, time_end = columns["time_start"].tolist(), columns["time_end"].tolist()
+        route = []
+        for i, node_index in enumerate(columns["node_index"].tolist()):
+            route.append(
+                {
+                    "node_index": node_index,
+                    "index": values["index"][i],
+                    "node_name": columns["node_name"][i],
+                    "location": columns["location"][i],
+                    "time_start": time_start[i] if has_time_dimension else None,
+                    "time_end": time_end[i] if has_time_dimension else None,
+                    "time_window": (
+                        columns["time_window"][i] if columns["time_window"] is not None else []
+                    ),
+                    **{field: values[field][i] for field in NODE_VALUE_FIELDS[1:]},
+                }
+            )
+
+        capacities = dict()
+        for capacity in ["courier_item_capacities", "courier_weight_capacities"]:
+            if capacity in columns:
+                capacities[capacity] = columns[capacity]
+        routes.append({"vehicle_id": columns["vehicle_id"], **capacities, "route": route})
+
+    add_node_lists_to_route(routes)
+    flag_vehicle_constraints(routes, vrp_parameters)
+    return routes
+
+
+class LazyRoutes(Sequence):
+    """
+    The routes as list of node dicts, created from the route columns the first time they are
+    accessed (see `columnar_solution` in `VRPParameters`).
+    """
+
+    def __init__(self, route_columns: List[Dict], vrp_parameters: VRPParameters):
+        self.route_columns = route_columns
+        self.vrp_parameters = vrp_parameters
+        self._routes: Optional[List[Dict]] = None
+
+    def to_list(self) -> List[Dict]:
+        if self._routes is None:
+            self._routes = route_columns_to_dicts(self.route_columns, self.vrp_parameters)
+        return self._routes
+
+    def __getitem__(self, i):
+        return self.to_list()[i]
+
+    def __len__(self):
+        return len(self.route_columns)
+
+    def __repr__(self):
+        return repr(self.to_list())
+
+
 def process_solution_data(solution, vrp_model):
     """Prints solution on console and retrieves processed results.
     {
@@ -63,135 +211,133 @@ def process_solution_data(solution, vrp_model):
     }
     "
 
+    With `columnar_solution` the routes are also added as NumPy arrays per route in
+    "route_columns" (see `extract_route_columns`), and "routes" is only created when used.
     """
+    route_columns = extract_route_columns(solution, vrp_model)
+    parameters = vrp_model.parameters
 
-    has_time_dimension = vrp_model.model_type != ModelType.distance
-    time_dimension = vrp_model.routing.GetDimensionOrDie("Time") if has_time_dimension else None
-    total_time = 0
-    total_distance = 0
-    total_load = 0
-    total_cost = 0
-    total_weight = 0
-    num_vehicles_used = 0
-    routes = []
+    def total(field: str):
+        return sum(int(columns[f"{field}_accumulated"][-1]) for columns in route_columns)
 
-    for vehicle_id in range(vrp_model.data["num_vehicles"]):
-        index = vrp_model.routing.Start(vehicle_id)
-        next_i = solution.Value(vrp_model.routing.NextVar(index))
-        if vrp_model.routing.IsEnd(next_i):
-            # vehicle not used
-            continue
+    result = {
+        "routes": (
+            LazyRoutes(route_columns, parameters)
+            if parameters.columnar_solution
+            else route_columns_to_dicts(route_columns, parameters)
+        ),
+        "meta": vrp_model.data["meta"],
+        "filter": vrp_model.data.get("filter", {}),
+        "summary": {
+            "total_time": total("time"),
+            "total_distance": total("distance"),
+            "total_cost": total("cost"),
+            "total_load": total("load"),
+            "total_weight": total("weight"),
+            "num_vehicles_used": len(route_columns),
+        },
+        "parameters": parameters.to_dict(),
+    }
+    if parameters.columnar_solution:
+        result["route_columns"] = route_columns
+    return result
 
-        num_vehicles_used += 1
-        route = []
 
-        start_time = None
-        index = vrp_model.routing.Start(vehicle_id)
-        route_distance = this_distance = 0
-        route_cost = this_cost = 0
-        route_load = this_load = 0
-        route_weight = this_weight = 0
-        route_time = this_time = 0
-        previous_node_index = previous_index = -1
-        while not vrp_model.routing.IsEnd(index):
-            node_index = vrp_model.manager.IndexToNode(index)
-
-            # number of items
-            if "number_of_items" in vrp_model.data:
-                this_load = vrp_model.data["number_of_items"][node_index]
-                route_load += this_load
-
-            # order weight
-            if "weights" in vrp_model.data:
-                this_weight = vrp_model.data["weights"][node_index]
-                route_weight += this_weight
-
-            # time
-            if has_time_dimension:
-                time_var = time_dimension.CumulVar(index)
-                if start_time is None:
-                    start_time = solution.Min(time_var)
-
-            if previous_index >= 0:
-                # time
-                this_time = vrp_model.data["time_matrix"][previous_node_index][node_index]
-                route_time += this_time
-
-                # distance
-                this_distance = vrp_model.data["distance_matrix"][previous_node_index][node_index]
-                route_distance += this_distance
-
-                # cost
-                this_cost = vrp_model.routing.GetArcCostForVehicle(
-                    previous_index, index, vehicle_id
-                )
-                route_cost += this_cost
-
-            time_window = (
-                vrp_model.data["time_windows"][node_index]
-                if "time_windows" in vrp_model.data
-                else []
-            )
+def route_time_ranges(
+    data: dict, parameters: VRPParameters, nodes: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Range of feasible times at each node of the route (starting at the depot), given the time
+    windows, waiting at most allowed_waiting_time_at_del at each node and a free start time.
+    """
+    times = data["time_matrix"][nodes[:-1], nodes[1:]]
+    earliest = np.zeros(len(nodes))
+    latest = np.full(len(nodes), parameters.max_time_duration)
+    if "time_windows" in data and parameters.model_type in [ModelType.scheduled, ModelType.live]:
+        time_windows = np.asarray(data["time_windows"])[nodes]
+        earliest = np.maximum(earliest, time_windows[:, 0])
+        latest = np.minimum(latest, time_windows[:, 1])
 
-            route.append(
+    waiting = parameters.allowed_waiting_time_at_del
+    for k in range(1, len(nodes)):
+        earliest[k] = max(earliest[k], earliest[k - 1] + times[k - 1])
+        latest[k] = min(latest[k], latest[k - 1] + times[k - 1] + waiting)
+    for k in range(len(nodes) - 2, -1, -1):
+        earliest[k] = max(earliest[k], earliest[k + 1] - times[k] - waiting)
+        latest[k] = min(latest[k], latest[k + 1] - times[k])
+    return earliest.astype(np.int64), latest.astype(np.int64)
+
+
+def process_routes_data(data: dict, parameters: VRPParameters, routes: List[List[int]]) -> dict:
+    """
+    Create the same result as `process_solution_data` for routes of node indices (without
+    the depot), e.g. after inserting orders without solving (see `insertion`).
+    The time start and end of a node is the range of feasible times for the route.
+    """
+    has_time_dimension = parameters.model_type != ModelType.distance
+    cost_matrix = data[cost_matrix_field(parameters.model_type)]
+    result_routes = []
+    for vehicle_id, route in enumerate(routes):
+        if len(route) == 0:
+            continue
+        nodes = np.array([data["depot"]] + list(route), dtype=np.int64)
+        arc_times = np.append([0], data["time_matrix"][nodes[:-1], nodes[1:]])
+        arc_distances = np.append([0], data["distance_matrix"][nodes[:-1], nodes[1:]])
+        arc_costs = np.append([0], cost_matrix[nodes[:-1], nodes[1:]])
+        loads = data["number_of_items"][nodes] if "number_of_items" in data else 0 * nodes
+        weights = data["weights"][nodes] if "weights" in data else 0 * nodes
+        if has_time_dimension:
+            time_start, time_end = route_time_ranges(data, parameters, nodes)
+
+        route_nodes = []
+        for i, node_index in enumerate(nodes):
+            route_nodes.append(
                 {
-                    "node_index": node_index,
-                    "index": index,
-                    "node_name": vrp_model.data["node_names"][node_index],
-                    "location": vrp_model.data["locations"][node_index],
-                    "time_start": solution.Min(time_var) if has_time_dimension else None,
-                    "time_end": solution.Max(time_var) if has_time_dimension else None,
-                    "time_window": time_window,
-                    "time": this_time,
-                    "time_accumulated": route_time,
-                    "distance": this_distance,
-                    "distance_accumulated": route_distance,
-                    "cost": this_cost,
-                    "cost_accumulated": route_cost,
-                    "load": this_load,
-                    "load_accumulated": route_load,
-                    "weight": this_weight,
-                    "weight_accumulated": route_weight,
+                    "node_index": int(node_index),
+                    "index": None,
+                    "node_name": data["node_names"][node_index],
+                    "location": data["locations"][node_index],
+                    "time_start": int(time_start[i]) if has_time_dimension else None,
+                    "time_end": int(time_end[i]) if has_time_dimension else None,
+                    "time_window": (
+                        data["time_windows"][node_index] if "time_windows" in data else []
+                    ),
+                    "time": int(arc_times[i]),
+                    "time_accumulated": int(arc_times[: i + 1].sum()),
+                    "distance": int(arc_distances[i]),
+                    "distance_accumulated": int(arc_distances[: i + 1].sum()),
+                    "cost": int(arc_costs[i]),
+                    "cost_accumulated": int(arc_costs[: i + 1].sum()),
+                    "load": int(loads[i]),
+                    "load_accumulated": int(loads[: i + 1].sum()),
+                    "weight": int(weights[i]),
+                    "weight_accumulated": int(weights[: i + 1].sum()),
                 }
             )
 
-            previous_index = index
-            previous_node_index = node_index
-            index = solution.Value(vrp_model.routing.NextVar(index))
-
-        total_time += route_time
-        total_distance += route_distance
-        total_cost += route_cost
-        total_load += route_load
-        total_weight += route_weight
-
         capacities = dict()
         for capacity in ["courier_item_capacities", "courier_weight_capacities"]:
-            if capacity in vrp_model.data:
-                capacities[capacity] = vrp_model.data[capacity][vehicle_id]
-
-        routes.append(
-            {
-                "vehicle_id": vehicle_id,
-                **capacities,
-                "route": route,
-            }
-        )
+            if capacity in data:
+                capacities[capacity] = data[capacity][vehicle_id]
+        result_routes.append({"vehicle_id": vehicle_id, **capacities, "route": route_nodes})
 
-    add_node_lists_to_route(routes)
-    flag_vehicle_constraints(routes, vrp_model.parameters)
+    add_node_lists_to_route(result_routes)
+    flag_vehicle_constraints(result_routes, parameters)
+
+    def total(field: str):
+        return sum(route["route"][-1][f"{field}_accumulated"] for route in result_routes)
 
     return {
-        "routes": routes,
-        "meta": vrp_model.data["meta"],
-        "filter": vrp_model.data["filter"],
+        "routes": result_routes,
+        "meta": data["meta"],
+        "filter": data.get("filter", {}),
         "summary": {
-            "total_time": total_time,
-            "total_distance": total_distance,
-            "total_cost": total_cost,
-            "total_load": total_load,
-            "total_weight": total_weight,
-            "num_vehicles_used": num_vehicles_used,
+            "total_time": total("time"),
+            "total_distance": total("distance"),
+            "total_cost": total("cost"),
+            "total_load": total("load"),
+            "total_weight": total("weight"),
+            "num_vehicles_used": len(result_routes),
         },
-        "parameters": vrp_model.parameters.to_dict(),
+        "parameters": parameters.to_dict(),
     }
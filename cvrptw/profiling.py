@@ -0,0 +1,78 @@
+"""
+Measure the phases of a solve (filtering, matrices, model, search, ...), such that it is clear
+where the time goes for different instance sizes.
+
+Per phase the wall time, the CPU time (of this process) and the peak memory traced by
+`tracemalloc` are stored in seconds and MB. Note that `tracemalloc` only traces memory allocated
+by Python (and Numpy), not the memory used by OR-tools itself.
+The time from the start of the search to the first solution is stored as the `first_solution`
+phase (wall time only).
+"""
+
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from .vrp_parameters import VRPParameters
+
+Phases = Dict[str, Dict[str, float]]
+
+
+def create_phases(parameters: VRPParameters, phases: Optional[Phases] = None) -> Optional[Phases]:
+    """Create the phases dictionary (copy of `phases` if set), None if not profiling."""
+    if not parameters.profile_phases:
+        return None
+    return {name: values.copy() for name, values in (phases or {}).items()}
+
+
+@contextmanager
+def measure_phase(phases: Optional[Phases], name: str):
+    """
+    Measure the wall time, CPU time and peak traced memory of the phase and add them to
+    `phases[name]`. If the phase is measured more than once, the times are summed and the
+    maximum of the peak memory is kept. Nothing is measured if `phases` is None.
+    Note: phases can't be nested, since the peak memory is reset at the start of a phase.
+    """
+    if phases is None:
+        yield
+        return
+
+    start_tracing = not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    memory_start = tracemalloc.get_traced_memory()[0]
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield
+    finally:
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.process_time() - cpu_start
+        peak_memory = tracemalloc.get_traced_memory()[1] - memory_start
+        if start_tracing:
+            tracemalloc.stop()
+
+        phase = phases.setdefault(name, {"wall_time": 0.0, "cpu_time": 0.0, "peak_memory_mb": 0.0})
+        phase["wall_time"] += wall_time
+        phase["cpu_time"] += cpu_time
+        phase["peak_memory_mb"] = max(phase["peak_memory_mb"], peak_memory / 2**20)
+
+
+class FirstSolutionTimer:
+    """
+    Solution callback that stores the wall time from the start of the search (`start_search`)
+    to the first solution in `phases["first_solution"]`.
+    """
+
+    def __init__(self, phases: Phases):
+        self.phases = phases
+        self.search_start = None
+
+    def start_search(self):
+        self.search_start = time.perf_counter()
+
+    def __call__(self):
+        if self.search_start is not None and "first_solution" not in self.phases:
+            self.phases["first_solution"] = {"wall_time": time.perf_counter() - self.search_start}
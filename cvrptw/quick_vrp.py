@@ -1,14 +1,18 @@
 import time
-from typing import List, Optional, Tuple, Union
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
 
 import numpy as np
-import pandas as pd
 from ortools.constraint_solver import pywrapcp, routing_enums_pb2
 
-from .distance import coord_distance
+from .distance import calculate_distances, coord_distance
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-def quick_vrp_from_df(df: pd.DataFrame, max_calc_time: Optional[int] = None, verbose: bool = False):
+
+def quick_vrp_from_df(
+    df: "pd.DataFrame", max_calc_time: Optional[int] = None, verbose: bool = False
+):
     """
     Solve the VRP based on distances only.
     It assumes the locations are coordinates.
@@ -53,6 +57,7 @@ class QuickVRP:
         dist_func: function to calculate the distance between 2 locations
         extra_cost_per_visit: extra cost per visit (e.g. time to deliver)
         max_calc_time: maximum time to calculate the solution (in seconds)
+        show_cost_matrix: print the full cost matrix when solving
     """
 
     def __init__(
@@ -63,6 +68,7 @@ class QuickVRP:
         extra_cost_per_visit: float = 0.0,
         max_calc_time: Optional[int] = None,
         verbose: bool = False,
+        show_cost_matrix: bool = False,
     ):
         self.start_location = start_location
         self.visit_locations = visit_locations
@@ -70,6 +76,7 @@ class QuickVRP:
         self.extra_cost_per_visit = extra_cost_per_visit
         self.max_calc_time = max_calc_time
         self.verbose = verbose
+        self.show_cost_matrix = show_cost_matrix
         self.manager = None
         self.routing = None
         self.start_location_index: Optional[List[int]] = None
@@ -86,9 +93,10 @@ class QuickVRP:
                 index = np.where(unique_locations == start_location)[0][0]
                 self.start_location_index.append(index)
 
-            print("start loc", self.start_location)
-            print("unique", unique_locations)
-            print("index", self.start_location_index)
+            if self.verbose:
+                print("start loc", self.start_location)
+                print("unique", unique_locations)
+                print("index", self.start_location_index)
             self.start_location = unique_locations
 
     @property
@@ -116,32 +124,27 @@ class QuickVRP:
         return start_loc_type is list or start_loc_type is tuple or start_loc_type is np.ndarray
 
     def cost_matrix(self):
-        cost_mat = np.zeros((self.n_items, self.n_items))
+        """
+        The cost matrix: from the start location(s) to the visits, between the visits (plus the
+        extra cost per visit) and 0 to go back to the start location(s).
+        """
         n_start_locations = self.n_start_locations
-        for i in range(self.n_items):
-            for j in range(self.n_items):
-                if i == j:
-                    continue
-                if i < n_start_locations:
-                    if n_start_locations == 1:
-                        cost_mat[i, j] = self.dist_func(
-                            self.start_location, self.visit_locations[j - 1]
-                        )
-                    else:
-                        cost_mat[i, j] = self.dist_func(
-                            self.start_location[i], self.visit_locations[j - n_start_locations]
-                        )
-                elif j < n_start_locations:
-                    # don't count going back
-                    cost_mat[i, j] = 0
-                else:
-                    cost_mat[i, j] = (
-                        self.dist_func(
-                            self.visit_locations[i - n_start_locations],
-                            self.visit_locations[j - n_start_locations],
-                        )
-                        + self.extra_cost_per_visit
-                    )
+        visit_locations = np.asarray(self.visit_locations, dtype=float)
+        start_locations = np.asarray(self.start_location, dtype=float).reshape(-1, 2)
+        cost_mat = np.zeros((self.n_items, self.n_items))
+        if len(visit_locations) == 0:
+            return cost_mat
+        # visit of each column, note: with multiple start locations the columns of the other
+        # start locations have the distance to the last visits (negative index)
+        visit_of_column = np.arange(self.n_items) - n_start_locations
+        cost_mat[:n_start_locations] = calculate_distances(
+            start_locations, visit_locations[visit_of_column], self.dist_func
+        )
+        cost_mat[n_start_locations:, n_start_locations:] = (
+            calculate_distances(visit_locations, visit_locations, self.dist_func)
+            + self.extra_cost_per_visit
+        )
+        np.fill_diagonal(cost_mat, 0)
         return cost_mat
 
     def process_solution(self, solution) -> dict:
@@ -172,15 +175,20 @@ class QuickVRP:
 
     def solve(self) -> dict:
         cost_mat = self.cost_matrix()
-        if self.verbose:
+        if self.show_cost_matrix:
             print("Cost matrix:", cost_mat)
+        elif self.verbose:
+            print("Cost matrix shape:", cost_mat.shape)
         self.manager = pywrapcp.RoutingIndexManager(len(cost_mat), self.num_vehicles, 0)
         self.routing = pywrapcp.RoutingModel(self.manager)
 
+        # OR-tools needs integer costs, a float returned by the callback is read as 0
+        int_cost_mat = np.rint(cost_mat).astype(np.int64).tolist()
+
         def cost_callback(from_index, to_index):
             from_node = self.manager.IndexToNode(from_index)
             to_node = self.manager.IndexToNode(to_index)
-            return cost_mat[from_node][to_node]
+            return int_cost_mat[from_node][to_node]
 
         transit_callback_index = self.routing.RegisterTransitCallback(cost_callback)
         self.routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
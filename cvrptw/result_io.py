@@ -0,0 +1,100 @@
+"""
+Save and load solver results.
+
+Formats (`result_format` in `VRPParameters`):
+- `json`: indented json, written while encoding (no copy of the result),
+- `compact_json`: json without indentation and whitespace, also written while encoding,
+- `npz`: NumPy archive, the route columns (see `process_solution.extract_route_columns`) are
+  stored as arrays and the rest of the result as compact json.
+"""
+
+import json
+from typing import Dict
+
+import numpy as np
+
+from .process_solution import route_columns_to_dicts
+from .utils import ResultEncoder, save_as_json
+from .vrp_parameters import VRPParameters
+
+RESULT_FORMATS = ["json", "compact_json", "npz"]
+# key in the npz file with the json of the result without the route columns
+NPZ_RESULT_KEY = "result"
+
+
+def result_file_name(out_file: str, result_format: str = "json") -> str:
+    """The output file name with the extension of the format."""
+    extension = ".npz" if result_format == "npz" else ".json"
+    return out_file if out_file.endswith(extension) else out_file + extension
+
+
+def save_result(result: Dict, out_file: str, result_format: str = "json") -> str:
+    """Save the result in the format, returns the file name (with extension)."""
+    if result_format not in RESULT_FORMATS:
+        raise Exception(f"Unknown result format {result_format}, use one of {RESULT_FORMATS}")
+    out_file = result_file_name(out_file, result_format)
+    if result_format == "npz":
+        save_as_npz(result, out_file)
+    else:
+        save_as_json(result, out_file, compact=result_format == "compact_json")
+    return out_file
+
+
+def save_as_npz(result: Dict, out_file: str):
+    """
+    Save the result as NumPy archive, the arrays of the route columns as `route_{i}_{field}`.
+    If there are route columns the routes are not stored, they are created again when loading.
+    """
+    arrays = dict()
+    json_result = dict(result)
+    if "route_columns" in result:
+        json_result.pop("routes", None)
+        json_result["route_columns"] = []
+        for i, columns in enumerate(result["route_columns"]):
+            scalars = dict()
+            for field, value in columns.items():
+                if value is None:
+                    continue
+                elif isinstance(value, (np.ndarray, list)):
+                    arrays[f"route_{i}_{field}"] = np.asarray(value)
+                else:
+                    scalars[field] = value
+            json_result["route_columns"].append(scalars)
+
+    arrays[NPZ_RESULT_KEY] = np.array(
+        json.dumps(json_result, cls=ResultEncoder, separators=(",", ":"))
+    )
+    with open(out_file, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def load_npz(file_name: str) -> Dict:
+    """Load a result saved with `save_as_npz`, with the routes as list of node dicts."""
+    with np.load(file_name) as npz:
+        result = json.loads(str(npz[NPZ_RESULT_KEY]))
+        if "route_columns" not in result:
+            return result
+
+        route_columns = result["route_columns"]
+        for key in npz.files:
+            if key == NPZ_RESULT_KEY:
+                continue
+            _, i, field = key.split("_", 2)
+            route_columns[int(i)][field] = npz[key]
+
+    for columns in route_columns:
+        columns["node_name"] = columns["node_name"].tolist()
+        for field in ["time_window", "time_start", "time_end"]:
+            columns.setdefault(field, None)
+    result["routes"] = route_columns_to_dicts(
+        route_columns, VRPParameters.create(result["parameters"])
+    )
+    return result
+
+
+def load_result(file_name: str) -> Dict:
+    """Load a result saved in any of the formats (the format is given by the extension)."""
+    if file_name.endswith(".npz"):
+        return load_npz(file_name)
+    with open(file_name, "r") as f:
+        return json.load(f)
@@ -1,5 +1,7 @@
+import numpy as np
 from ortools.constraint_solver import pywrapcp, routing_enums_pb2
 
+from .arc_pruning import prune_arcs
 from .notw_vrp import NoTWVRP
 from .vrp_parameters import ModelType, VRPParameters
 
@@ -33,6 +35,18 @@ class ScheduledVRP(NoTWVRP):
             index = self.manager.NodeToIndex(location_idx)
             time_dimension.CumulVar(index).SetRange(int(time_window[0]), int(time_window[1]))
 
+        if self.parameters.prune_arcs:
+            self.remove_infeasible_arcs()
+
+    def remove_infeasible_arcs(self):
+        """Remove the arcs that can't be in a feasible route from the model, see arc_pruning."""
+        infeasible = prune_arcs(self.data, self.parameters)
+        for node, row in enumerate(infeasible):
+            if not row.any():
+                continue
+            to_indices = [self.manager.NodeToIndex(int(to_node)) for to_node in np.flatnonzero(row)]
+            self.routing.NextVar(self.manager.NodeToIndex(node)).RemoveValues(to_indices)
+
     def get_search_parameters(self):
         search_parameters = pywrapcp.DefaultRoutingSearchParameters()
         search_parameters.first_solution_strategy = (
@@ -0,0 +1,262 @@
+"""
+Local solve server: a long running process that accepts orders and VRP parameters as json over
+HTTP and solves them in a pool of worker processes that already imported the solver, such that
+a request does not pay for starting Python and importing the libraries.
+
+Run it with `python -m cvrptw.server` and post a job to `/solve`:
+    {
+        "orders": [{"order_id": ..., "pickup_lat": ..., ...}, ...],  # rows of the input csv
+        "parameters": {"model_type": "scheduled", ...},  # see VRPParameters
+        "deadline": 30  # optional, seconds
+    }
+The response is the result of `run_solve` (status 200), or an error:
+- 400: invalid request (e.g. an order without one of the required columns),
+- 503: too many jobs queued (retry later),
+- 504: the job did not finish before the deadline,
+- 500: the solver failed (if a worker process died, the workers are restarted).
+`GET /health` returns the number of workers and running jobs (a job that missed its deadline
+is counted until its worker finished it).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
+from http import HTTPStatus
+from numbers import Number
+from typing import List, Optional, Tuple
+
+from .utils import ResultEncoder
+from .vrp_parameters import ModelType, VRPParameters
+
+logger = logging.getLogger(__name__)
+
+# extra time (s) on top of the deadline for the worker to build the model and process the result
+DEADLINE_GRACE_TIME = 5
+MAX_REQUEST_SIZE = 100 * 2**20
+# columns of the input csv that each order should have (and order_id or id)
+ORDER_COLUMNS = [
+    "pickup_lat",
+    "pickup_lon",
+    "delivery_lat",
+    "delivery_lon",
+    "order_number_items",
+    "time_window_start_s",
+    "time_window_end_s",
+]
+LIVE_ORDER_COLUMNS = ["pickup_time_window_start_s", "pickup_time_window_end_s"]
+
+
+def warm_up_worker():
+    """Import the solver in the worker process."""
+    from . import solver  # noqa: F401
+
+
+def solve_job(orders: list, parameters_data: dict) -> dict:
+    """Solve the orders (run in a worker process), returns the result."""
+    import pandas as pd
+
+    from .solver import run_solve_from_dataframe
+
+    parameters = VRPParameters.create(parameters_data)
+    return run_solve_from_dataframe(pd.DataFrame(orders), parameters, show=False, graph=False)
+
+
+def validate_orders(orders, parameters: VRPParameters) -> Optional[str]:
+    """Check that the orders are rows with the required columns, returns the error if not."""
+    if not isinstance(orders, list) or len(orders) == 0:
+        return "orders should be a non-empty list of orders"
+    columns = ORDER_COLUMNS
+    if parameters.model_type == ModelType.live:
+        columns = columns + LIVE_ORDER_COLUMNS
+    for i, order in enumerate(orders):
+        if not isinstance(order, dict):
+            return f"order {i} should be an object"
+        if "order_id" not in order and "id" not in order:
+            return f"order {i} has no order_id"
+        for column in columns:
+            value = order.get(column)
+            if not isinstance(value, Number) or isinstance(value, bool):
+                return f"order {i} should have a number {column}"
+    return None
+
+
+class SolveServer:
+    """HTTP server that solves the jobs in a pool of warm worker processes."""
+
+    def __init__(self, n_workers: int, max_queued_jobs: int, default_deadline: Optional[float]):
+        self.n_workers = n_workers
+        self.max_queued_jobs = max_queued_jobs
+        self.default_deadline = default_deadline
+        self.n_jobs = 0
+        self.executor = None
+
+    def create_executor(self) -> List[Future]:
+        """Start the worker processes, returns the futures of importing the solver in each."""
+        self.executor = ProcessPoolExecutor(max_workers=self.n_workers)
+        return [self.executor.submit(warm_up_worker) for _ in range(self.n_workers)]
+
+    def start_workers(self):
+        """Start the worker processes and import the solver in each of them."""
+        for warm_up in self.create_executor():
+            warm_up.result()
+
+    async def restart_workers(self, broken_executor: ProcessPoolExecutor):
+        """
+        Replace the pool of which a worker process died, only once for all the jobs that failed
+        on it. New jobs go to the new pool while it is warming up.
+        """
+        if broken_executor is not self.executor:
+            return
+        logger.warning("A worker process died, restarting the workers ...")
+        broken_executor.shutdown(wait=False, cancel_futures=True)
+        warm_ups = self.create_executor()
+        await asyncio.gather(*map(asyncio.wrap_future, warm_ups))
+
+    async def solve(self, job: dict) -> Tuple[HTTPStatus, dict]:
+        """Solve a job in a worker, with backpressure on the number of jobs and a deadline."""
+        if "orders" not in job or "parameters" not in job:
+            return HTTPStatus.BAD_REQUEST, {"error": "orders and parameters are required"}
+        try:
+            parameters = VRPParameters.create(job["parameters"])
+        except (KeyError, TypeError, ValueError) as e:
+            return HTTPStatus.BAD_REQUEST, {"error": f"invalid parameters: {e}"}
+        error = validate_orders(job["orders"], parameters)
+        if error is not None:
+            return HTTPStatus.BAD_REQUEST, {"error": f"invalid orders: {error}"}
+        deadline = job.get("deadline", self.default_deadline)
+        if deadline is not None and (not isinstance(deadline, (int, float)) or deadline <= 0):
+            return HTTPStatus.BAD_REQUEST, {"error": "deadline should be a positive number"}
+        if self.n_jobs >= self.max_queued_jobs:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "too many jobs, retry later"}
+
+        # the solver stops at the deadline, the grace time is to create and process the model
+        timeout = None
+        if deadline is not None:
+            parameters = replace(
+                parameters, max_calc_time=max(1, min(parameters.max_calc_time, int(deadline)))
+            )
+            timeout = deadline + DEADLINE_GRACE_TIME
+
+        # the job is counted until the worker finished it, also when the deadline passed (a job
+        # that did not start yet is cancelled)
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        t = time.time()
+        try:
+            job_future = executor.submit(solve_job, job["orders"], parameters.to_dict())
+            self.n_jobs += 1
+            job_future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.job_done))
+            result = await asyncio.wait_for(asyncio.wrap_future(job_future), timeout)
+        except asyncio.TimeoutError:
+            return HTTPStatus.GATEWAY_TIMEOUT, {"error": f"no result within {deadline} s"}
+        except BrokenProcessPool:
+            await self.restart_workers(executor)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "the worker process died"}
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"solver failed: {e}"}
+        logger.info(f"Solved job of {len(job['orders'])} orders in {time.time() - t:.2f} s")
+        return HTTPStatus.OK, result
+
+    def job_done(self):
+        self.n_jobs -= 1
+
+    async def handle_request(self, method: str, path: str, body: bytes) -> Tuple[HTTPStatus, dict]:
+        if method == "GET" and path == "/health":
+            return HTTPStatus.OK, {"n_workers": self.n_workers, "n_jobs": self.n_jobs}
+        if method == "POST" and path == "/solve":
+            try:
+                job = json.loads(body)
+            except ValueError as e:
+                return HTTPStatus.BAD_REQUEST, {"error": f"invalid json: {e}"}
+            if not isinstance(job, dict):
+                return HTTPStatus.BAD_REQUEST, {"error": "the job should be a json object"}
+            return await self.solve(job)
+        return HTTPStatus.NOT_FOUND, {"error": f"unknown endpoint {method} {path}"}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Handle one HTTP/1.1 request per connection."""
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = dict()
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            content_length = int(headers.get("content-length", 0))
+            if len(request_line) < 2:
+                status, response = HTTPStatus.BAD_REQUEST, {"error": "invalid request"}
+            elif content_length > MAX_REQUEST_SIZE:
+                status, response = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "too large"}
+            else:
+                body = await reader.readexactly(content_length)
+                status, response = await self.handle_request(request_line[0], request_line[1], body)
+
+            response_body = json.dumps(response, cls=ResultEncoder).encode()
+            writer.write(
+                (
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(response_body)}\r\n"
+                    "Connection: close\r\n\r\n"
+                ).encode()
+                + response_body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logger.warning(f"Error in connection: {e}")
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        logger.info(f"Starting {self.n_workers} workers ...")
+        self.start_workers()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        logger.info(f"Serving on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Local VRP solve server.")
+    arg_parser.add_argument("--host", default="127.0.0.1", type=str, help="Host to listen on.")
+    arg_parser.add_argument("--port", "-p", default=8080, type=int, help="Port to listen on.")
+    arg_parser.add_argument(
+        "--workers", "-w", default=2, type=int, help="Number of worker processes."
+    )
+    arg_parser.add_argument(
+        "--max-queued-jobs",
+        "-q",
+        default=16,
+        type=int,
+        help="Maximum number of running and queued jobs, more are refused.",
+    )
+    arg_parser.add_argument(
+        "--deadline",
+        "-d",
+        default=None,
+        type=float,
+        help="Default deadline in seconds per job (if not set in the job).",
+    )
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    server = SolveServer(args.workers, args.max_queued_jobs, args.deadline)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server.executor is not None:
+            server.executor.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main()
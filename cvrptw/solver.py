@@ -1,31 +1,23 @@
-from .distance_vrp import DistanceVRP
-from .graph_routes import graph_routes
-from .input_data_generator import create_data_model_from_csv_file
-from .live_vrp import LiveVRP
-from .notw_vrp import NoTWVRP
-from .scheduled_vrp import ScheduledVRP
-from .time_vrp import TimeVRP
-from .utils import save_as_json, show_dict
-from .vrp_model import VRPModel
-from .vrp_parameters import ModelType, VRPParameters
+import time
+from typing import TYPE_CHECKING, Optional
 
+from .decomposition import global_node_layout, solve_decomposed
+from .input_data_generator import (
+    create_data_model_from_csv_file,
+    create_data_model_from_dataframe,
+    read_orders_csv,
+)
+from .model_factory import model_factory
+from .result_io import save_result
+from .utils import show_dict
+from .vrp_model import VRPModel
+from .vrp_parameters import ModelType, VRPParameters  # noqa: F401
 
-def model_factory(data, parameters: VRPParameters):
-    """Create a VPR model based on the type."""
-    if parameters.model_type == ModelType.distance:
-        return DistanceVRP(data, parameters)
-    elif parameters.model_type == ModelType.time:
-        return TimeVRP(data, parameters)
-    elif parameters.model_type == ModelType.scheduled:
-        return ScheduledVRP(data, parameters)
-    elif parameters.model_type == ModelType.live:
-        return LiveVRP(data, parameters)
-    elif parameters.model_type == ModelType.no_tw:
-        return NoTWVRP(data, parameters)
-    raise Exception(f"Unknown solver type {parameters.model_type.name}")
+if TYPE_CHECKING:
+    import pandas as pd
 
 
-def run_solve(model: VRPModel, graph=True, show=True, out_file=None):
+def run_solve(model: VRPModel, graph=True, show=True, out_file=None, initial_solution=None):
     """
     Run the solver.
     Args:
@@ -33,16 +25,19 @@ def run_solve(model: VRPModel, graph=True, show=True, out_file=None):
         graph: create the graph
         show: show the result on screen
         out_file: output file
+        initial_solution: previous solution to start from (routes, result or json file)
     """
     if show:
         show_dict(model.data, header="INPUT DATA")
 
     print(f"Running solver ({model.n_orders} orders; {model.n_nodes} nodes)...")
-    result = model.solve()
+    result = model.solve(initial_solution)
 
     if show:
         show_dict(result, header="SOLUTION")
     if graph and "routes" in result:
+        from .graph_routes import graph_routes
+
         graph_routes(model.data, result["routes"], out_file, show)
 
     return result
@@ -54,6 +49,7 @@ def run_solve_from_file(
     parameters: VRPParameters,
     show=True,
     graph=True,
+    initial_solution=None,
 ):
     """
     Run and solve the problem from a file.
@@ -63,15 +59,81 @@ def run_solve_from_file(
         parameters: VRP parameters
         show: show the output on the screen
         graph: create the graph file
+        initial_solution: previous solution to start from (routes, result or json file)
     """
+    if parameters.decomposition:
+        return run_solve_decomposed_from_file(
+            file_name, out_file, parameters, show, graph, initial_solution
+        )
+
     data, df_in = create_data_model_from_csv_file(
         file_name,
         parameters,
         return_df=True,
     )
     model = model_factory(data, parameters)
-    result = run_solve(model, out_file=out_file, show=show, graph=graph)
+    result = run_solve(
+        model, out_file=out_file, show=show, graph=graph, initial_solution=initial_solution
+    )
+    if out_file is not None:
+        save_result(result, out_file, parameters.result_format)
+    return result
+
+
+def run_solve_from_dataframe(
+    df_in: "pd.DataFrame",
+    parameters: VRPParameters,
+    show=True,
+    graph=False,
+    out_file: Optional[str] = None,
+    initial_solution=None,
+):
+    """
+    Run and solve the problem for the orders in the dataframe (same columns as the csv file).
+    Args:
+        df_in: the orders
+        parameters: VRP parameters
+        show: show the output on the screen
+        graph: create the graph file
+        out_file: output file name of the graph
+        initial_solution: previous solution to start from (routes, result or json file)
+    The time to create the data model is added as `data_model_duration` to `result["solver"]`.
+    """
+    if parameters.decomposition:
+        result = solve_decomposed(df_in, parameters, initial_solution)
+        if show:
+            show_dict(result, header="SOLUTION")
+        return result
+
+    t = time.time()
+    data = create_data_model_from_dataframe(df_in, parameters)
+    data_model_duration = time.time() - t
+    model = model_factory(data, parameters)
+    result = run_solve(
+        model, out_file=out_file, show=show, graph=graph, initial_solution=initial_solution
+    )
+    result["solver"]["data_model_duration"] = data_model_duration
+    return result
+
+
+def run_solve_decomposed_from_file(
+    file_name: str,
+    out_file: str,
+    parameters: VRPParameters,
+    show=True,
+    graph=True,
+    initial_solution=None,
+):
+    """Run and solve the problem from a file in geographic clusters (see `decomposition`)."""
+    df_in = read_orders_csv(file_name)
+    result = solve_decomposed(df_in, parameters, initial_solution)
+    if show:
+        show_dict(result, header="SOLUTION")
+    if graph and len(result["routes"]) > 0:
+        from .graph_routes import graph_routes
+
+        _, locations = global_node_layout(df_in, parameters)
+        graph_routes({"locations": locations}, result["routes"], out_file, show)
     if out_file is not None:
-        out_json_file = out_file if out_file[-5:] == ".json" else out_file + ".json"
-        save_as_json(result, out_json_file)
+        save_result(result, out_file, parameters.result_format)
     return result
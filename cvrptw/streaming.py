@@ -0,0 +1,123 @@
+"""
+Solve a VRP model and stream each improving solution as soon as it is found, such that the first
+feasible plan can be used while the solver keeps searching for better ones.
+
+The solver runs in a background thread. The solution callback only reads the routes and the
+objective, the results are created (with `process_routes_data`) by the consumer.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from typing import AsyncIterator, Iterator, List
+
+from .process_solution import process_routes_data
+
+# message types between the solver thread and the consumer
+_SOLUTION = "solution"
+_RESULT = "result"
+_ERROR = "error"
+
+
+def current_routes(vrp_model) -> List[List[int]]:
+    """The routes (node indices without depot) per vehicle of the current solution in a search."""
+    routing = vrp_model.routing
+    routes = []
+    for vehicle_id in range(vrp_model.data["num_vehicles"]):
+        route = []
+        index = routing.NextVar(routing.Start(vehicle_id)).Value()
+        while not routing.IsEnd(index):
+            route.append(vrp_model.manager.IndexToNode(index))
+            index = routing.NextVar(index).Value()
+        routes.append(route)
+    return routes
+
+
+def make_solution_listener(
+    vrp_model, messages: queue.Queue, start_time: float, stop: threading.Event
+) -> callable:
+    """Create a solution callback that puts the routes of each improving solution on the queue."""
+
+    class SolutionListener:
+        def __init__(self):
+            self._best_objective = None
+
+        def __call__(self):
+            if stop.is_set():
+                vrp_model.routing.solver().FinishCurrentSearch()
+                return
+            objective = vrp_model.routing.CostVar().Max()
+            if self._best_objective is not None and objective >= self._best_objective:
+                return
+            self._best_objective = objective
+            messages.put(
+                (_SOLUTION, (current_routes(vrp_model), objective, time.time() - start_time))
+            )
+
+    return SolutionListener()
+
+
+def solve_iter(vrp_model, initial_solution=None) -> Iterator[dict]:
+    """
+    Solve the model and yield the result of each improving solution when it is found, with the
+    objective, the elapsed time (s) and the number of the solution in `result["solver"]`.
+    The last yielded result is the final result of `VRPModel.solve`.
+    When the generator is closed before the end, the search is finished at the next solution.
+    Note: with a portfolio (n_portfolio_workers > 1) only the final result is yielded.
+    """
+    messages = queue.Queue()
+    stop = threading.Event()
+    start_time = time.time()
+    vrp_model.solution_listener = make_solution_listener(vrp_model, messages, start_time, stop)
+
+    def run_solve():
+        try:
+            messages.put((_RESULT, vrp_model.solve(initial_solution)))
+        except Exception as e:
+            messages.put((_ERROR, e))
+
+    thread = threading.Thread(target=run_solve, name="solve_iter", daemon=True)
+    thread.start()
+    n_solutions = 0
+    try:
+        while True:
+            message_type, message = messages.get()
+            if message_type == _ERROR:
+                raise message
+            if message_type == _RESULT:
+                message["solver"]["elapsed"] = time.time() - start_time
+                yield message
+                return
+
+            routes, objective, elapsed = message
+            n_solutions += 1
+            result = process_routes_data(vrp_model.data, vrp_model.parameters, routes)
+            result["solver"] = {
+                "model": vrp_model.model_name,
+                "status": "searching",
+                "objective": objective,
+                "elapsed": elapsed,
+                "n_solutions": n_solutions,
+            }
+            yield result
+    finally:
+        stop.set()
+        vrp_model.solution_listener = None
+
+
+async def solve_async(vrp_model, initial_solution=None) -> AsyncIterator[dict]:
+    """Asynchronous version of `solve_iter`, the solver does not block the event loop."""
+    loop = asyncio.get_running_loop()
+    results = solve_iter(vrp_model, initial_solution)
+    done = object()
+    try:
+        while True:
+            result = await loop.run_in_executor(None, next, results, done)
+            if result is done:
+                return
+            yield result
+    finally:
+        # the generator can still be running in the executor when the task is cancelled
+        if not results.gi_running:
+            results.close()
@@ -19,9 +19,8 @@ class TimeVRP(DistanceVRP):
     def _create_model(self):
         super()._create_model()
 
-        # Create and register a transit callback for the time between 2 points
-        time_callback = self.create_callback("time_matrix")
-        self.transit_callback_index_time = self.routing.RegisterTransitCallback(time_callback)
+        # Register the transit for the time between 2 points
+        self.transit_callback_index_time = self.register_transit("time_matrix")
 
         # Add Time dimension (used in planning when to do the orders, and to constraint
         #  on time windows).
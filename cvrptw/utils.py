@@ -1,35 +1,46 @@
 import json
 import numbers
+from collections.abc import Sequence
 from typing import Dict, List
 
 import numpy as np
 
 
-def prepare_data_for_json(d):
-    """Return value that has simple types and are serializable with json.dump."""
-    result = d
-    if type(d) is dict:
-        result = dict()
-        for k, v in d.items():
-            result[k] = prepare_data_for_json(v)
-    elif type(d) is list:
-        result = []
-        for x in d:
-            result.append(prepare_data_for_json(x))
-    elif type(d) is np.int64 or type(d) is np.int32:
-        result = int(d)
-    elif type(d) is np.cfloat:
-        result = float(d)
-    elif type(d) is np.ndarray:
-        result = d.tolist()
-
-    return result
-
-
-def save_as_json(result: dict, out_file: str):
-    clean_dict = prepare_data_for_json(result)
+def is_lazy_sequence(d) -> bool:
+    """A sequence that creates its list when used (e.g. `process_solution.LazyRoutes`)."""
+    return isinstance(d, Sequence) and hasattr(d, "to_list")
+
+
+class ResultEncoder(json.JSONEncoder):
+    """
+    Json encoder for the results: NumPy scalars and arrays, and lazy sequences, are encoded
+    when they are found, such that the result does not have to be copied to simple types first.
+    """
+
+    def default(self, o):
+        if isinstance(o, np.integer):
+            return int(o)
+        elif isinstance(o, np.floating):
+            return float(o)
+        elif isinstance(o, np.bool_):
+            return bool(o)
+        elif isinstance(o, np.ndarray):
+            return o.tolist()
+        elif is_lazy_sequence(o):
+            return o.to_list()
+        return super().default(o)
+
+
+def save_as_json(result: dict, out_file: str, compact: bool = False):
+    """
+    Save the result as json, written while encoding (the json string of the full result is
+    never in memory). Compact json has no indentation and whitespace.
+    """
     with open(out_file, "w") as f:
-        json.dump(clean_dict, f, indent=4)
+        if compact:
+            json.dump(result, f, cls=ResultEncoder, separators=(",", ":"))
+        else:
+            json.dump(result, f, cls=ResultEncoder, indent=4)
 
 
 def show_dict(d: dict, indent=0, header=None):
@@ -45,7 +56,7 @@ def show_dict(d: dict, indent=0, header=None):
         if type(v) is dict:
             print(f"{indent_str}** {k} **")
             show_dict(v, indent + 4)
-        elif type(v) is list and len(v) > 0 and type(v[0]) is dict:
+        elif (type(v) is list or is_lazy_sequence(v)) and len(v) > 0 and type(v[0]) is dict:
             for i, x in enumerate(v):
                 print(f"{indent_str}{i})")
                 show_dict(x, indent + 4)
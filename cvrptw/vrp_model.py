@@ -2,21 +2,51 @@
 
 import abc
 import time
+from collections import deque
+from typing import AsyncIterator, Iterator, List, Optional
 
-from ortools.constraint_solver import pywrapcp
+import numpy as np
+from ortools.constraint_solver import pywrapcp, routing_enums_pb2
 
+from .fleet_size import estimate_fleet_size, set_fleet_size
+from .initial_solution import InitialSolution, create_initial_routes
+from .neighbors import nearest_neighbors, non_neighbor_arcs, set_neighbor_search_parameters
+from .portfolio import solve_portfolio
 from .process_solution import process_solution_data
+from .profiling import FirstSolutionTimer, create_phases, measure_phase
+from .streaming import solve_async, solve_iter
 from .vrp_parameters import ModelType, VRPParameters
 
 # status: https://developers.google.com/optimization/routing/routing_options#search-status
-SOLVER_STATUS = [
-    "0-not solved",
-    "1-success",
-    "2-no solution found",
-    "3-time-out without solution",
-    "4-invalid model",
-    "exception",
-]
+# status of the routing model, OR-tools 9.5 added partial success (a solution, but the local
+# optimum was not reached), infeasible and optimal
+if hasattr(routing_enums_pb2, "RoutingSearchStatus"):
+    SOLVER_STATUS = [
+        "0-not solved",
+        "1-success",
+        "2-partial success",
+        "3-no solution found",
+        "4-time-out without solution",
+        "5-invalid model",
+        "6-infeasible",
+        "7-optimal",
+    ]
+else:
+    SOLVER_STATUS = [
+        "0-not solved",
+        "1-success",
+        "2-no solution found",
+        "3-time-out without solution",
+        "4-invalid model",
+    ]
+# status code when the solver raised an exception
+SOLVER_EXCEPTION = -1
+
+
+def solver_status_name(status: int) -> str:
+    if status == SOLVER_EXCEPTION:
+        return "exception"
+    return SOLVER_STATUS[status] if 0 <= status < len(SOLVER_STATUS) else f"{status}-unknown"
 
 
 def make_routing_monitor(routing_model: pywrapcp.RoutingModel, failure_limit: int) -> callable:
@@ -57,6 +87,83 @@ def make_routing_monitor(routing_model: pywrapcp.RoutingModel, failure_limit: in
     return RoutingMonitor(routing_model)
 
 
+def has_stop_criteria(parameters: VRPParameters) -> bool:
+    """Check if any of the convergence stop criteria is set."""
+    return (
+        parameters.stop_target_objective is not None
+        or parameters.stop_no_improvement_solutions is not None
+        or parameters.stop_min_improvement is not None
+    )
+
+
+def make_convergence_monitor(
+    routing_model: pywrapcp.RoutingModel, parameters: VRPParameters
+) -> callable:
+    """
+    Create a solution callback that finishes the search when it converged, it stops when:
+    - the objective is at most stop_target_objective,
+    - the last stop_no_improvement_solutions solutions did not improve the best objective,
+    - the best objective improved less than stop_min_improvement (fraction) in the last
+      stop_improvement_window seconds.
+    The criteria are only checked when a solution is found and nothing is printed.
+    The reason to stop is stored in `stop_reason`.
+    """
+
+    class ConvergenceMonitor:
+        def __init__(self, model: pywrapcp.RoutingModel):
+            self.model = model
+            self.stop_reason = None
+            self._best_objective = None
+            self._n_no_improvement = 0
+            # (time, best objective) of the improvements within the window
+            self._history = deque()
+
+        def __call__(self):
+            objective = self.model.CostVar().Max()
+            now = time.monotonic()
+            if self._best_objective is None or objective < self._best_objective:
+                self._best_objective = objective
+                self._n_no_improvement = 0
+                self._history.append((now, objective))
+            else:
+                self._n_no_improvement += 1
+
+            self.stop_reason = self._check_stop(now)
+            if self.stop_reason is not None:
+                self.model.solver().FinishCurrentSearch()
+
+        def _check_stop(self, now: float) -> Optional[str]:
+            if (
+                parameters.stop_target_objective is not None
+                and self._best_objective <= parameters.stop_target_objective
+            ):
+                return "target objective"
+            if (
+                parameters.stop_no_improvement_solutions is not None
+                and self._n_no_improvement >= parameters.stop_no_improvement_solutions
+            ):
+                return "no improvement"
+            if parameters.stop_min_improvement is not None:
+                # keep the last improvement before the window as reference
+                window_start = now - parameters.stop_improvement_window
+                while len(self._history) > 1 and self._history[1][0] <= window_start:
+                    self._history.popleft()
+                reference_time, reference_objective = self._history[0]
+                if reference_time <= window_start:
+                    improvement = reference_objective - self._best_objective
+                    if improvement <= parameters.stop_min_improvement * abs(reference_objective):
+                        return "converged"
+            return None
+
+    return ConvergenceMonitor(routing_model)
+
+
+def is_int_data(values) -> bool:
+    """Check if the values (list or Numpy array, 1 or 2 dimensions) are all integers."""
+    values = np.asarray(values)
+    return values.dtype.kind in "iu"
+
+
 class VRPModel(abc.ABC):
     """The abstract VRP model that generates the OR-tools model."""
 
@@ -66,6 +173,11 @@ class VRPModel(abc.ABC):
         self.manager = None
         self.data = data
         self.parameters = parameters
+        self.phases = None
+        self.first_solution_timer = None
+        self.convergence_monitor = None
+        # called at each solution during the search, see streaming
+        self.solution_listener = None
 
     @property
     def n_nodes(self) -> int:
@@ -94,6 +206,14 @@ class VRPModel(abc.ABC):
         if self.parameters.track_solver_progress:
             routing_monitor = make_routing_monitor(self.routing, 10)
             self.routing.AddAtSolutionCallback(routing_monitor)
+        if has_stop_criteria(self.parameters):
+            self.convergence_monitor = make_convergence_monitor(self.routing, self.parameters)
+            self.routing.AddAtSolutionCallback(self.convergence_monitor)
+        if self.solution_listener is not None:
+            self.routing.AddAtSolutionCallback(self.solution_listener)
+        if self.phases is not None:
+            self.first_solution_timer = FirstSolutionTimer(self.phases)
+            self.routing.AddAtSolutionCallback(self.first_solution_timer)
 
     def create_callback(self, data_field: str):
         """Create a callback function for the solver."""
@@ -107,6 +227,33 @@ class VRPModel(abc.ABC):
         assert data_field in self.data
         return lambda index: self.data[data_field][self.manager.IndexToNode(index)]
 
+    def use_transit_matrix(self, data_field: str) -> bool:
+        """
+        Check if the data field can be registered as matrix/vector, which is evaluated
+        by OR-tools itself, instead of calling a Python callback for each arc.
+        """
+        return (
+            self.parameters.use_transit_matrices
+            and hasattr(self.routing, "RegisterTransitMatrix")
+            and is_int_data(self.data[data_field])
+        )
+
+    def register_transit(self, data_field: str) -> int:
+        """Register the transit between 2 nodes of a matrix in the data, returns the index."""
+        assert data_field in self.data
+        if self.use_transit_matrix(data_field):
+            values = np.asarray(self.data[data_field], dtype=np.int64).tolist()
+            return self.routing.RegisterTransitMatrix(values)
+        return self.routing.RegisterTransitCallback(self.create_callback(data_field))
+
+    def register_unary_transit(self, data_field: str) -> int:
+        """Register the transit of a node of a vector in the data, returns the index."""
+        assert data_field in self.data
+        if self.use_transit_matrix(data_field):
+            values = np.asarray(self.data[data_field], dtype=np.int64).tolist()
+            return self.routing.RegisterUnaryTransitVector(values)
+        return self.routing.RegisterUnaryTransitCallback(self.create_callback_1d(data_field))
+
     @property
     @abc.abstractmethod
     def transit_callback_index_cost(self):
@@ -117,6 +264,20 @@ class VRPModel(abc.ABC):
         self._create_model()
         # Define cost of each arc.
         self.routing.SetArcCostEvaluatorOfAllVehicles(self.transit_callback_index_cost)
+        if self.parameters.n_neighbors:
+            self.data["neighbors"] = nearest_neighbors(
+                self.data, self.parameters, self.parameters.n_neighbors
+            )
+            if self.parameters.restrict_to_neighbors:
+                self.remove_non_neighbor_arcs()
+
+    def remove_non_neighbor_arcs(self):
+        """Only allow arcs to the nearest neighbors of each node, see neighbors."""
+        for node, to_nodes in enumerate(non_neighbor_arcs(self.data, self.data["neighbors"])):
+            if len(to_nodes) == 0:
+                continue
+            to_indices = [self.manager.NodeToIndex(int(to_node)) for to_node in to_nodes]
+            self.routing.NextVar(self.manager.NodeToIndex(node)).RemoveValues(to_indices)
 
     @abc.abstractmethod
     def _create_model(self):
@@ -135,7 +296,41 @@ class VRPModel(abc.ABC):
     def model_name(self):
         return self.model_type.name
 
-    def solve(self):
+    def set_search_strategy(self, search_parameters):
+        """Override the search strategy of the model if set in the parameters."""
+        if self.parameters.first_solution_strategy:
+            search_parameters.first_solution_strategy = (
+                routing_enums_pb2.FirstSolutionStrategy.Value.Value(
+                    self.parameters.first_solution_strategy
+                )
+            )
+        if self.parameters.local_search_metaheuristic:
+            search_parameters.local_search_metaheuristic = (
+                routing_enums_pb2.LocalSearchMetaheuristic.Value.Value(
+                    self.parameters.local_search_metaheuristic
+                )
+            )
+        if self.parameters.n_neighbors:
+            set_neighbor_search_parameters(
+                search_parameters, self.parameters.n_neighbors, self.n_nodes
+            )
+
+    def read_initial_assignment(self, initial_routes, search_parameters):
+        """
+        Create the assignment of the initial routes (node indices) to start the search from.
+        Returns None if the routes are not a feasible solution for the model.
+        """
+        self.routing.CloseModelWithParameters(search_parameters)
+        index_routes = [[self.manager.NodeToIndex(n) for n in route] for route in initial_routes]
+        return self.routing.ReadAssignmentFromRoutes(index_routes, True)
+
+    def solve(self, initial_solution: Optional[InitialSolution] = None):
+        """
+        Solve the model.
+        Args:
+            initial_solution: optional previous solution to start the search from,
+                see `initial_solution.create_initial_routes` for the formats.
+        """
         if len(self.data["distance_matrix"]) <= 1:
             return {
                 "solver": {
@@ -144,37 +339,132 @@ class VRPModel(abc.ABC):
                     "error": "no data",
                 }
             }
-        self.create_model()
+        if self.parameters.n_portfolio_workers > 1:
+            return solve_portfolio(self, initial_solution)
+
+        self.phases = create_phases(self.parameters, self.data.get("phases"))
+        initial_routes = None
+        if initial_solution is not None:
+            initial_routes = create_initial_routes(initial_solution, self.data, self.parameters)
+        if not self.parameters.estimate_fleet_size:
+            return self.solve_model(initial_routes)
+
+        # solve with the estimated number of vehicles, double it if no solution is found (a
+        # partial success, i.e. the time limit was reached, also has a solution), the retries
+        # share the max_calc_time of the search
+        deadline = (
+            time.time() + self.parameters.max_calc_time if self.parameters.max_calc_time else None
+        )
+        max_vehicles = self.data["num_vehicles"]
+        with measure_phase(self.phases, "fleet_size"):
+            fleet_size = estimate_fleet_size(self.data, self.parameters)
+        n_vehicles = max(fleet_size["n_vehicles"], len(initial_routes or []))
+        n_retries = 0
+        while True:
+            set_fleet_size(self.data, self.parameters, min(n_vehicles, max_vehicles))
+            print(f"Solving with {self.data['num_vehicles']} of max {max_vehicles} vehicles ...")
+            time_limit = None if deadline is None else deadline - time.time()
+            result = self.solve_model(initial_routes, time_limit)
+            if "routes" in result or n_vehicles >= max_vehicles:
+                break
+            if deadline is not None and time.time() >= deadline:
+                print("No time left to solve with more vehicles")
+                break
+            n_vehicles *= 2
+            n_retries += 1
+            self.routing = None
+            self.manager = None
+        result["solver"]["fleet_size"] = {
+            **fleet_size,
+            "n_vehicles": self.data["num_vehicles"],
+            "n_retries": n_retries,
+        }
+        return result
+
+    def solve_iter(self, initial_solution: Optional[InitialSolution] = None) -> Iterator[dict]:
+        """
+        Solve the model and yield the result of each improving solution, the last result is
+        the final result of `solve` (see `streaming.solve_iter`).
+        """
+        return solve_iter(self, initial_solution)
+
+    def solve_async(
+        self, initial_solution: Optional[InitialSolution] = None
+    ) -> AsyncIterator[dict]:
+        """Asynchronous iterator over the improving solutions, see `solve_iter`."""
+        return solve_async(self, initial_solution)
+
+    def solve_model(
+        self, initial_routes: Optional[List[List[int]]] = None, time_limit: Optional[float] = None
+    ):
+        """
+        Create the model and solve it.
+        Args:
+            initial_routes: optional routes (node indices) to start the search from
+            time_limit: time limit (s) of the search instead of max_calc_time
+        """
+        t = time.time()
+        with measure_phase(self.phases, "model"):
+            self.create_model()
+        model_duration = time.time() - t
+        if self.parameters.random_seed is not None:
+            self.routing.solver().ReSeed(self.parameters.random_seed)
 
         search_parameters = self.get_search_parameters()
-        if self.parameters.max_calc_time:
+        self.set_search_strategy(search_parameters)
+        if time_limit is not None:
+            search_parameters.time_limit.FromMilliseconds(max(1, int(time_limit * 1000)))
+        elif self.parameters.max_calc_time:
             search_parameters.time_limit.seconds = self.parameters.max_calc_time
 
+        initial_assignment = None
+        if initial_routes is not None:
+            with measure_phase(self.phases, "initial_solution"):
+                initial_assignment = self.read_initial_assignment(initial_routes, search_parameters)
+            if initial_assignment is None:
+                print("Warning: initial solution is not feasible, solving without it")
+
         # Solve the problem.
         print("Solving ...")
         t = time.time()
-        try:
-            solution = self.routing.SolveWithParameters(search_parameters)
-            solver_status = self.routing.status()
-        except Exception as e:
-            print("Error while running solver:", e)
-            solution = None
-            solver_status = 5
+        if self.first_solution_timer is not None:
+            self.first_solution_timer.start_search()
+        with measure_phase(self.phases, "search"):
+            try:
+                if initial_assignment is not None:
+                    solution = self.routing.SolveFromAssignmentWithParameters(
+                        initial_assignment, search_parameters
+                    )
+                else:
+                    solution = self.routing.SolveWithParameters(search_parameters)
+                solver_status = self.routing.status()
+            except Exception as e:
+                print("Error while running solver:", e)
+                solution = None
+                solver_status = SOLVER_EXCEPTION
 
         duration = time.time() - t
 
         # Print solution on console.
         if solution:
-            result = process_solution_data(solution, self)
+            with measure_phase(self.phases, "process_solution"):
+                result = process_solution_data(solution, self)
         else:
             result = {}
 
         result["solver"] = {
             "model": self.model_name,
             "duration": duration,
+            "model_duration": model_duration,
             "status_code": solver_status,
-            "status": SOLVER_STATUS[solver_status],
+            "status": solver_status_name(solver_status),
         }
+        if initial_routes is not None:
+            result["solver"]["initial_solution_used"] = initial_assignment is not None
+        if self.convergence_monitor is not None and self.convergence_monitor.stop_reason:
+            result["solver"]["stop_reason"] = self.convergence_monitor.stop_reason
+        if self.phases is not None:
+            result["solver"]["phases"] = self.phases
 
         print("---solver stats----")
         print("Status:  ", result["solver"]["status"])
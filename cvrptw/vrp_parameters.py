@@ -70,9 +70,48 @@ class VRPParameters:
     # Meta parameters
     max_calc_time: int = 10
     track_solver_progress: bool = False
+    # stop the search before max_calc_time (not used if not set): when the objective reaches the
+    # target, after n solutions without improvement, or when the best objective improved less
+    # than the fraction in the last window (seconds), see vrp_model.make_convergence_monitor
+    stop_target_objective: Optional[int] = None
+    stop_no_improvement_solutions: Optional[int] = None
+    stop_min_improvement: Optional[float] = None
+    stop_improvement_window: float = 2
+    # register the (integer) matrices in OR-tools instead of Python callbacks
+    use_transit_matrices: bool = True
+    # remove the arcs that can't be feasible from the scheduled and live models, see arc_pruning
+    prune_arcs: bool = False
+    # number of nearest (feasible) neighbors per node used by the local search (all if not set),
+    # if restrict_to_neighbors only arcs to these neighbors are allowed, see neighbors
+    n_neighbors: Optional[int] = None
+    restrict_to_neighbors: bool = False
     vehicle_constraints: Optional[ConstraintsParameters] = None
     filter_infeasible_orders: bool = True
     multi_pickup: bool = False
+    # Search parameters, override the model's defaults when set (OR-tools enum names)
+    first_solution_strategy: Optional[str] = None
+    local_search_metaheuristic: Optional[str] = None
+    random_seed: Optional[int] = None
+    # number of processes solving in parallel, each with different search parameters
+    n_portfolio_workers: int = 1
+    # directory to cache the distance matrices (not cached if not set) and its maximum size
+    distance_cache_dir: Optional[str] = None
+    distance_cache_max_size_mb: int = 1024
+    # solve clusters of orders ("sweep" or "kmeans", not decomposed if not set), see decomposition
+    decomposition: Optional[str] = None
+    decomposition_cluster_size: int = 100
+    n_decomposition_workers: int = 1
+    # create the model with the estimated number of vehicles instead of one per order (grown
+    # if no solution is found), with a margin (fraction) on the estimate, see fleet_size
+    estimate_fleet_size: bool = False
+    fleet_size_margin: float = 0.1
+    # add the wall time, CPU time and peak memory per phase to result["solver"]["phases"]
+    profile_phases: bool = False
+    # also return the routes as NumPy arrays per route (result["route_columns"]), the routes as
+    # node dicts are only created when used, see process_solution
+    columnar_solution: bool = False
+    # format of the output file: "json", "compact_json" or "npz", see result_io
+    result_format: str = "json"
 
     def to_dict(self):
         dict_data = self.__dict__.copy()
@@ -86,7 +125,7 @@ class VRPParameters:
         data = data_input.copy()
         if "model_type" in data:
             data["model_type"] = ModelType[data_input["model_type"]]
-        if "vehicle_constraints" in data:
+        if data.get("vehicle_constraints") is not None:
             data["vehicle_constraints"] = ConstraintsParameters.create(data["vehicle_constraints"])
         return cls(**data)
 
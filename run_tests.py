@@ -6,30 +6,55 @@ filename as the config file name.
 Format of file names:
 - Input: `{number}_{name}_input.csv`
 - Config: `{number}_{name}_config_{config_name}.json`
-- Output:  `{number}_{name}_output_{config_name}.json`
+- Output:  `{number}_{name}_output_{config_name}.json` (or `.npz`, see `--format`)
 
 Where `number` has 3 digits. And `config_name` is the model type used.
+Each output file is read again to check it can be loaded (see `cvrptw.result_io`).
+
+With `--imports` it checks that the solver core is imported without pandas and the plotting
+libraries, and within the maximum import time.
 """
 
 import argparse
 import os
 import re
+import subprocess
+import sys
 from glob import glob
+from typing import Optional
 
+from cvrptw.result_io import RESULT_FORMATS, load_result, result_file_name
 from cvrptw.solver import run_solve_from_file
 from cvrptw.vrp_parameters import VRPParameters
 
 
-def run_vrp(input_data_csv: str, config_file: str, output_file: str, save_graph: bool):
+def run_vrp(
+    input_data_csv: str,
+    config_file: str,
+    output_file: str,
+    save_graph: bool,
+    result_format: Optional[str] = None,
+):
     """Run the VRP solver for a certain input and config and store the result to the output file."""
     print(f"Solving VRP {input_data_csv} with config {config_file} and save to {output_file}...")
     vrp_parameters = VRPParameters.create_from_file(config_file)
+    if result_format is not None:
+        vrp_parameters.result_format = result_format
     run_solve_from_file(input_data_csv, output_file, vrp_parameters, show=False, graph=save_graph)
+    result_file = result_file_name(output_file, vrp_parameters.result_format)
+    result = load_result(result_file)
+    print(f"Saved {len(result.get('routes', []))} routes in {result_file}")
     print("=" * 30)
     print()
 
 
-def run_for_config(input_data_csv: str, config_file: str, output_dir: str, save_graph: bool):
+def run_for_config(
+    input_data_csv: str,
+    config_file: str,
+    output_dir: str,
+    save_graph: bool,
+    result_format: Optional[str] = None,
+):
     """Run the VRP for an input and a config and create the output file name based
     on the config file name. Then it runs the VRP solver and stores the output."""
     m = re.match(r".*(\d{3}_.*)_config_(.*)\.json", config_file)
@@ -37,10 +62,12 @@ def run_for_config(input_data_csv: str, config_file: str, output_dir: str, save_
         print("Unknown config file name format:", config_file)
         return
     output_file = os.path.join(output_dir, f"{m[1]}_output_{m[2]}")
-    run_vrp(input_data_csv, config_file, output_file, save_graph)
+    run_vrp(input_data_csv, config_file, output_file, save_graph, result_format)
 
 
-def run_all_configs(input_data_csv: str, output_dir: str, save_graph: bool):
+def run_all_configs(
+    input_data_csv: str, output_dir: str, save_graph: bool, result_format: Optional[str] = None
+):
     """Run the VRP solver for all configuration of a certain input."""
     m = re.match(r".*(\d{3}_.*)_input\.csv", input_data_csv)
     if m is None:
@@ -48,13 +75,44 @@ def run_all_configs(input_data_csv: str, output_dir: str, save_graph: bool):
         return
     file_start = m[1]
     for config_file in glob(f"tests/{file_start}_config_*.json"):
-        run_for_config(input_data_csv, config_file, output_dir, save_graph)
+        run_for_config(input_data_csv, config_file, output_dir, save_graph, result_format)
+
 
+# the modules of the solver core and the libraries they should not import
+CORE_MODULES = ["cvrptw.solver", "cvrptw.model_factory", "cvrptw.process_solution"]
+OPTIONAL_MODULES = ["pandas", "matplotlib", "plotly", "seaborn"]
 
-def run_all(output_dir: str, save_graph: bool):
+
+def check_imports(max_import_time: float) -> bool:
+    """Import the solver core in a new process, check the time and the imported modules."""
+    code = (
+        "import sys, time\n"
+        "t = time.perf_counter()\n"
+        f"import {', '.join(CORE_MODULES)}\n"
+        "print(time.perf_counter() - t)\n"
+        f"print(' '.join(m for m in {OPTIONAL_MODULES!r} if m in sys.modules))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    import_time = float(output[0])
+    imported = output[1].split() if len(output) > 1 else []
+    print(f"Import time of the solver core: {import_time:.3f} s (max {max_import_time} s)")
+
+    ok = True
+    if import_time > max_import_time:
+        ok = False
+        print(" import time is more than the maximum")
+    if len(imported) > 0:
+        ok = False
+        print(" the solver core imports", ", ".join(imported))
+    return ok
+
+
+def run_all(output_dir: str, save_graph: bool, result_format: Optional[str] = None):
     """Run the VRP solver for all problems and configs in the tests directory."""
     for input_file in glob("tests/???_*_input.csv"):
-        run_all_configs(input_file, output_dir, save_graph)
+        run_all_configs(input_file, output_dir, save_graph, result_format)
 
 
 def main():
@@ -84,17 +142,38 @@ def main():
         action="store_true",
         help="Save graph to file.",
     )
+    arg_parser.add_argument(
+        "-f",
+        "--format",
+        default=None,
+        choices=RESULT_FORMATS,
+        help="Format of the output files (the format of the config if not set).",
+    )
+    arg_parser.add_argument(
+        "--imports",
+        default=False,
+        action="store_true",
+        help="Only check the imports of the solver core.",
+    )
+    arg_parser.add_argument(
+        "--max-import-time",
+        default=2.0,
+        type=float,
+        help="Maximum import time (s) of the solver core when checking the imports.",
+    )
     args = arg_parser.parse_args()
 
-    if args.input:
+    if args.imports:
+        sys.exit(0 if check_imports(args.max_import_time) else 1)
+    elif args.input:
         if args.config:
-            run_for_config(args.input, args.config, args.output, args.graph)
+            run_for_config(args.input, args.config, args.output, args.graph, args.format)
         else:
-            run_all_configs(args.input, args.output, args.graph)
+            run_all_configs(args.input, args.output, args.graph, args.format)
     elif args.config:
         print("Also set the test case when setting the configuration.")
     else:
-        run_all(args.output, args.graph)
+        run_all(args.output, args.graph, args.format)
 
 
 if __name__ == "__main__":
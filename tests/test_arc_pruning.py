@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from cvrptw.arc_pruning import infeasible_arcs
+from cvrptw.initial_solution import create_initial_routes
+from cvrptw.input_data_generator import create_data_model_from_dataframe
+from cvrptw.instance_generator import generate_orders
+from cvrptw.model_factory import model_factory
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+
+@pytest.mark.parametrize("model_type", [ModelType.scheduled, ModelType.live])
+def test_pruned_arcs_not_in_unpruned_solution(model_type):
+    parameters = VRPParameters(model_type, max_calc_time=2, prune_arcs=False)
+    data = create_data_model_from_dataframe(generate_orders(30, seed=4), parameters)
+    infeasible = infeasible_arcs(data, parameters)
+    assert infeasible.any()
+
+    result = model_factory(data, parameters).solve()
+
+    assert "routes" in result
+    for route in create_initial_routes(result, data):
+        nodes = [data["depot"]] + route + [data["depot"]]
+        assert not infeasible[nodes[:-1], nodes[1:]].any()
+
+
+def test_capacity_of_largest_vehicle():
+    parameters = VRPParameters(ModelType.scheduled, courier_item_capacity=5)
+    data = create_data_model_from_dataframe(generate_orders(10, seed=0), parameters)
+    data["number_of_items"] = np.array([0] + [1] * 10)
+    infeasible = infeasible_arcs(data, parameters)
+    data["number_of_items"] = np.array([0] + [3] * 10)
+    assert infeasible_arcs(data, parameters)[1:, 1:].sum() == 10 * 9
+    data["courier_item_capacities"][0] = 6
+    np.testing.assert_array_equal(infeasible_arcs(data, parameters), infeasible)
@@ -0,0 +1,60 @@
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from cvrptw.distance import coord_distance
+from cvrptw.input_data_generator import (
+    MAX_EXACT_BUNDLE_SIZE,
+    bundle_route_distance,
+    shortest_bundle_route_distance,
+)
+
+PICKUP = (41.39, 2.17)
+
+
+def bundle_locations(n_orders: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.array(PICKUP) + rng.random((n_orders, 2)) * 0.02
+
+
+def brute_force_distance(pickup, order_locations) -> float:
+    """Distance of the shortest route, trying each visiting order with the scalar distance."""
+    return min(
+        coord_distance(pickup, order_locations[route[0]])
+        + sum(
+            coord_distance(order_locations[a], order_locations[b]) for a, b in zip(route, route[1:])
+        )
+        for route in permutations(range(len(order_locations)))
+    )
+
+
+@pytest.mark.parametrize("n_orders", [3, 4])
+def test_exact_distance_same_as_brute_force(n_orders):
+    order_locations = bundle_locations(n_orders)
+    distance, n_routes = bundle_route_distance(PICKUP, order_locations, coord_distance)
+    assert n_routes == 1
+    assert distance == pytest.approx(brute_force_distance(PICKUP, order_locations))
+    # the same bundle in another order
+    reversed_distance, _ = bundle_route_distance(PICKUP, order_locations[::-1], coord_distance)
+    assert reversed_distance == pytest.approx(distance)
+
+
+def test_large_bundle_estimated():
+    order_locations = bundle_locations(MAX_EXACT_BUNDLE_SIZE + 1, seed=1)
+    n_cached = shortest_bundle_route_distance.cache_info().currsize
+    distance, n_routes = bundle_route_distance(PICKUP, order_locations, coord_distance)
+    assert shortest_bundle_route_distance.cache_info().currsize == n_cached
+    assert n_routes == 1
+    # the estimate (rounded costs, no metaheuristic) is close to the shortest route
+    shortest = brute_force_distance(PICKUP, order_locations)
+    assert shortest - len(order_locations) <= distance <= 1.05 * shortest
+
+
+def test_unnamed_distance_function_not_cached():
+    n_cached = shortest_bundle_route_distance.cache_info().currsize
+    distance, _ = bundle_route_distance(
+        PICKUP, bundle_locations(3), lambda pos1, pos2: coord_distance(pos1, pos2)
+    )
+    assert shortest_bundle_route_distance.cache_info().currsize == n_cached
+    assert distance == pytest.approx(brute_force_distance(PICKUP, bundle_locations(3)))
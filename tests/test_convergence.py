@@ -0,0 +1,37 @@
+import pytest
+
+from cvrptw.input_data_generator import create_data_model_from_dataframe
+from cvrptw.instance_generator import generate_orders
+from cvrptw.model_factory import model_factory
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+MAX_CALC_TIME = 5
+
+
+@pytest.mark.parametrize(
+    "stop_parameters, stop_reason",
+    [
+        ({"stop_target_objective": 10**12}, "target objective"),
+        ({"stop_no_improvement_solutions": 1}, "no improvement"),
+        ({"stop_min_improvement": 0.5, "stop_improvement_window": 0.2}, "converged"),
+    ],
+)
+def test_stop_reason(stop_parameters, stop_reason):
+    # the metaheuristic keeps searching until the time limit if the search is not stopped
+    parameters = VRPParameters(
+        ModelType.scheduled,
+        max_calc_time=MAX_CALC_TIME,
+        local_search_metaheuristic="GUIDED_LOCAL_SEARCH",
+        **stop_parameters,
+    )
+    data = create_data_model_from_dataframe(generate_orders(30, seed=0), parameters)
+    result = model_factory(data, parameters).solve()
+    assert "routes" in result
+    assert result["solver"]["stop_reason"] == stop_reason
+    assert result["solver"]["duration"] < MAX_CALC_TIME
+
+
+def test_no_stop_reason_without_criteria():
+    parameters = VRPParameters(ModelType.scheduled, max_calc_time=1)
+    data = create_data_model_from_dataframe(generate_orders(30, seed=0), parameters)
+    assert "stop_reason" not in model_factory(data, parameters).solve()["solver"]
@@ -0,0 +1,94 @@
+import numpy as np
+
+from cvrptw.decomposition import (
+    delivery_node_names,
+    repair_boundaries,
+    solve_cluster,
+    solve_decomposed,
+    sweep_clusters,
+)
+from cvrptw.initial_solution import create_initial_routes
+from cvrptw.instance_generator import generate_orders
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+
+def test_sweep_clusters_split_by_time_window():
+    df = generate_orders(90, seed=0)
+    clusters = sweep_clusters(df, 10)
+    assert sorted(np.concatenate(clusters).tolist()) == list(range(90))
+    assert all(len(cluster) <= 10 for cluster in clusters)
+    # 3 sectors of 30 orders, each split in 3 slices of increasing time windows
+    starts = df["time_window_start_s"].values
+    for sector in range(3):
+        slices = clusters[3 * sector : 3 * sector + 3]
+        assert all(starts[a].max() <= starts[b].min() for a, b in zip(slices, slices[1:]))
+
+
+def test_repair_boundaries_changes_only_accepted_neighbours():
+    df = generate_orders(30, seed=1)
+    parameters = VRPParameters(ModelType.scheduled, max_calc_time=1)
+    clusters = sweep_clusters(df, 10)
+    plans = []
+    for cluster in clusters:
+        data, result = solve_cluster(df.iloc[cluster], parameters)
+        routes = create_initial_routes(result, data)
+        plans.append({"data": data, "parameters": parameters, "routes": routes})
+    # a single order route that should be moved to a neighbour
+    data = plans[0]["data"]
+    route = max(plans[0]["routes"], key=len)
+    plans[0]["routes"].remove(route)
+    plans[0]["routes"] += [[node] for node in route]
+    n_nodes = [len(plan["data"]["locations"]) for plan in plans]
+
+    n_moved = repair_boundaries(df, clusters, plans, parameters)
+    assert n_moved > 0
+
+    n_added = [len(plan["data"]["locations"]) - n for plan, n in zip(plans, n_nodes)]
+    assert sum(n_added) == n_moved
+    assert len(data["locations"]) == n_nodes[0]
+    for plan in plans:
+        routed = [node for route in plan["routes"] for node in route]
+        assert max(routed, default=0) < len(plan["data"]["locations"])
+        assert len(plan["data"]["node_names"]) == len(plan["data"]["locations"])
+
+    names = delivery_node_names(df, parameters)
+    routed_names = [
+        plan["data"]["node_names"][node]
+        for plan in plans
+        for route in plan["routes"]
+        for node in route
+    ]
+    assert sorted(routed_names) == sorted(names)
+
+
+def test_solve_decomposed():
+    df = generate_orders(40, seed=2)
+    parameters = VRPParameters(
+        ModelType.scheduled, max_calc_time=1, decomposition="sweep", decomposition_cluster_size=10
+    )
+    result = solve_decomposed(df, parameters)
+    assert result["solver"]["decomposition"]["n_clusters"] == 4
+    delivered = [node["node_name"] for route in result["routes"] for node in route["route"][1:]]
+    assert sorted(delivered) == sorted(map(str, df["order_id"]))
+
+
+def test_orders_of_failed_cluster_are_unassigned():
+    df = generate_orders(20, seed=2)
+    parameters = VRPParameters(
+        ModelType.scheduled,
+        max_calc_time=1,
+        filter_infeasible_orders=False,
+        decomposition="sweep",
+        decomposition_cluster_size=10,
+    )
+    clusters = sweep_clusters(df, 10)
+    # an order of the first cluster can not be delivered in its time window
+    df.loc[clusters[0][0], ["time_window_start_s", "time_window_end_s"]] = [0, 1]
+
+    result = solve_decomposed(df, parameters)
+
+    assert result["solver"]["status_code"] == 1
+    names = delivery_node_names(df, parameters)
+    assert sorted(result["unassigned"]) == sorted(names[i] for i in clusters[0])
+    delivered = [node["node_name"] for route in result["routes"] for node in route["route"][1:]]
+    assert sorted(delivered) == sorted(names[i] for i in clusters[1])
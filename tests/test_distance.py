@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from cvrptw.distance import calculate_paired_distances, coord_distance, euclidean_distance
+from cvrptw.input_data_generator import filter_orders
+from cvrptw.instance_generator import generate_orders
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+
+def scalar(distance_func):
+    """The distance function without a vectorized version, such that it is called per pair."""
+    return lambda pos1, pos2: distance_func(pos1, pos2)
+
+
+@pytest.mark.parametrize(
+    "distance_func, scale", [(coord_distance, 0.05), (euclidean_distance, 1e4)]
+)
+def test_paired_distances_same_as_scalar(distance_func, scale):
+    rng = np.random.default_rng(0)
+    locations_from = 41.39 + rng.random((50, 2)) * scale
+    locations_to = 41.39 + rng.random((50, 2)) * scale
+    np.testing.assert_allclose(
+        calculate_paired_distances(locations_from, locations_to, distance_func),
+        [distance_func(p, q) for p, q in zip(locations_from, locations_to)],
+    )
+
+
+@pytest.mark.parametrize("multi_pickup", [False, True])
+def test_filter_orders_same_as_scalar(multi_pickup):
+    df = generate_orders(100, seed=0, n_stores=3 if multi_pickup else 1)
+    order_locations = df[["delivery_lat", "delivery_lon"]].values
+    pickup_locations = df[["pickup_lat", "pickup_lon"]].values
+    distances = [coord_distance(p, q) for p, q in zip(pickup_locations, order_locations)]
+    # part of the orders is too far
+    parameters = VRPParameters(
+        ModelType.live, multi_pickup=multi_pickup, max_delivery_distance=np.median(distances)
+    )
+
+    def filtered(distance_func):
+        return filter_orders(
+            order_locations,
+            df[["time_window_start_s", "time_window_end_s"]].values,
+            df["order_number_items"].values,
+            df["weight"].values,
+            pickup_locations if multi_pickup else pickup_locations[0],
+            df[["pickup_time_window_start_s", "pickup_time_window_end_s"]].values,
+            parameters,
+            distance_func,
+            df["order_id"].values,
+            None,
+        )
+
+    result = filtered(coord_distance)
+    expected = filtered(scalar(coord_distance))
+    assert result[5] == expected[5] and result[5]["distance_infeasible"] > 0
+    for values, expected_values in zip(result[:5] + result[6:], expected[:5] + expected[6:]):
+        np.testing.assert_array_equal(values, expected_values)
@@ -0,0 +1,70 @@
+import time
+
+from cvrptw import vrp_model
+from cvrptw.fleet_size import estimate_fleet_size
+from cvrptw.input_data_generator import create_data_model_from_dataframe
+from cvrptw.instance_generator import generate_orders
+from cvrptw.model_factory import model_factory
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+PARAMETERS = VRPParameters(ModelType.scheduled, max_calc_time=1, estimate_fleet_size=True)
+
+
+def create_model(n_orders: int = 20):
+    data = create_data_model_from_dataframe(generate_orders(n_orders, seed=0), PARAMETERS)
+    return model_factory(data, PARAMETERS)
+
+
+def test_estimate_within_bounds():
+    model = create_model()
+    fleet_size = estimate_fleet_size(model.data, PARAMETERS)
+    assert 1 <= fleet_size["lower_bound"] <= fleet_size["n_vehicles"] <= 20
+
+
+def test_fleet_grows_until_solution(monkeypatch):
+    # too few vehicles for the time windows, the fleet is doubled until there is a solution
+    monkeypatch.setattr(
+        vrp_model, "estimate_fleet_size", lambda data, parameters: {"n_vehicles": 1}
+    )
+    result = create_model(8).solve()
+    assert "routes" in result
+    assert result["solver"]["fleet_size"]["n_vehicles"] > 1
+    assert result["solver"]["fleet_size"]["n_retries"] > 0
+    assert result["summary"]["num_vehicles_used"] <= result["solver"]["fleet_size"]["n_vehicles"]
+
+
+def test_partial_success_keeps_fleet(monkeypatch):
+    model = create_model()
+    calls = []
+
+    def solve_model(initial_routes=None, time_limit=None):
+        calls.append(model.data["num_vehicles"])
+        return {"routes": [], "solver": {"status_code": 2, "status": "2-partial success"}}
+
+    monkeypatch.setattr(model, "solve_model", solve_model)
+    result = model.solve()
+    assert len(calls) == 1
+    assert result["solver"]["fleet_size"]["n_vehicles"] == calls[0]
+    assert result["solver"]["fleet_size"]["n_retries"] == 0
+
+
+def test_fleet_growth_within_max_calc_time(monkeypatch):
+    model = create_model()
+    time_limits = []
+
+    def solve_model(initial_routes=None, time_limit=None):
+        time_limits.append(time_limit)
+        time.sleep(0.4)
+        return {"solver": {"status_code": 2, "status": "2-no solution found"}}
+
+    monkeypatch.setattr(
+        vrp_model, "estimate_fleet_size", lambda data, parameters: {"n_vehicles": 1}
+    )
+    monkeypatch.setattr(model, "solve_model", solve_model)
+    t = time.time()
+    result = model.solve()
+    # max_calc_time is 1 s, the third try starts after 0.8 s and the fleet is not grown again
+    assert time.time() - t < 1.5
+    assert len(time_limits) == 3
+    assert time_limits[0] <= 1 and all(a > b for a, b in zip(time_limits, time_limits[1:]))
+    assert result["solver"]["fleet_size"]["n_retries"] == 2
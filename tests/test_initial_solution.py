@@ -0,0 +1,56 @@
+import pytest
+
+from cvrptw.initial_solution import create_initial_routes
+from cvrptw.input_data_generator import create_data_model_from_dataframe
+from cvrptw.instance_generator import generate_orders
+from cvrptw.model_factory import model_factory
+from cvrptw.solver import run_solve_from_dataframe
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+MODEL_TYPES = [ModelType.scheduled, ModelType.live]
+
+
+def solve(df, parameters, initial_solution=None):
+    data = create_data_model_from_dataframe(df, parameters)
+    return data, model_factory(data, parameters).solve(initial_solution)
+
+
+@pytest.mark.parametrize("model_type", MODEL_TYPES)
+def test_new_orders_are_added_to_the_routes(model_type):
+    df = generate_orders(12, seed=0)
+    parameters = VRPParameters(model_type, max_calc_time=1)
+    _, previous = solve(df.iloc[:10], parameters)
+    data = create_data_model_from_dataframe(df, parameters)
+
+    routes = create_initial_routes(previous, data)
+    n_nodes_per_order = 2 if model_type == ModelType.live else 1
+    assert sum(len(route) for route in routes) == 10 * n_nodes_per_order
+    routes = create_initial_routes(previous, data, parameters)
+    nodes = sorted(node for route in routes for node in route)
+    assert nodes == [node for node in range(len(data["node_names"])) if node != data["depot"]]
+
+
+@pytest.mark.parametrize("model_type", MODEL_TYPES)
+def test_warm_start_with_new_and_removed_orders(model_type):
+    df = generate_orders(12, seed=0)
+    parameters = VRPParameters(model_type, max_calc_time=1)
+    _, previous = solve(df.iloc[:11], parameters)
+    _, result = solve(df.iloc[1:], parameters, initial_solution=previous)
+    assert result["solver"]["initial_solution_used"]
+    assert "initial_solution_used" not in previous["solver"]
+
+
+def test_warm_start_from_dataframe_and_decomposed():
+    df = generate_orders(30, seed=1)
+    parameters = VRPParameters(ModelType.scheduled, max_calc_time=1)
+    previous = run_solve_from_dataframe(df.iloc[:29], parameters, show=False)
+    result = run_solve_from_dataframe(df, parameters, show=False, initial_solution=previous)
+    assert result["solver"]["initial_solution_used"]
+
+    parameters = VRPParameters(
+        ModelType.scheduled, max_calc_time=1, decomposition="sweep", decomposition_cluster_size=10
+    )
+    previous = run_solve_from_dataframe(df.iloc[:29], parameters, show=False)
+    result = run_solve_from_dataframe(df, parameters, show=False, initial_solution=previous)
+    clusters = result["solver"]["decomposition"]["clusters"]
+    assert all(cluster["initial_solution_used"] for cluster in clusters)
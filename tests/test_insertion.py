@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from cvrptw.distance import coord_distance
+from cvrptw.input_data_generator import create_data_model_from_dataframe
+from cvrptw.insertion import (
+    add_orders_to_data_model,
+    create_plan,
+    evaluate_routes,
+    insert_orders,
+    reoptimize_plan,
+)
+from cvrptw.instance_generator import generate_orders
+from cvrptw.model_factory import model_factory
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+MODEL_TYPES = [ModelType.scheduled, ModelType.live]
+
+
+def create_parameters(model_type: ModelType) -> VRPParameters:
+    return VRPParameters(model_type, max_calc_time=1, filter_infeasible_orders=False)
+
+
+@pytest.mark.parametrize("model_type", MODEL_TYPES)
+def test_extended_data_model_matches_full_model(model_type):
+    df = generate_orders(12, seed=0)
+    parameters = create_parameters(model_type)
+    data = create_data_model_from_dataframe(df.iloc[:8], parameters)
+    new_nodes = add_orders_to_data_model(data, df.iloc[8:], parameters, coord_distance)
+    full = create_data_model_from_dataframe(df, parameters)
+
+    assert len(new_nodes) == 4
+    assert sorted(data["node_names"]) == sorted(full["node_names"])
+    # the nodes of the new orders are at the end, compare in the order of the full model
+    position = {name: i for i, name in enumerate(data["node_names"])}
+    order = np.array([position[name] for name in full["node_names"]])
+    for field in ["distance_matrix", "time_matrix", "cost_matrix"]:
+        np.testing.assert_allclose(data[field][np.ix_(order, order)], full[field], atol=1)
+    np.testing.assert_array_equal(data["time_windows"][order], full["time_windows"])
+    np.testing.assert_array_equal(data["number_of_items"][order], full["number_of_items"])
+    assert data["num_vehicles"] == full["num_vehicles"]
+
+
+@pytest.mark.parametrize("model_type", MODEL_TYPES)
+def test_insert_orders_in_plan(model_type):
+    df = generate_orders(12, seed=1)
+    parameters = create_parameters(model_type)
+    data = create_data_model_from_dataframe(df.iloc[:8], parameters)
+    plan = create_plan(data, parameters, model_factory(data, parameters).solve())
+
+    insert_orders(plan, df.iloc[8:])
+
+    assert len(plan["inserted"]) + len(plan["unassigned"]) == 4
+    nodes = [node for route in plan["routes"] for node in route]
+    assert len(nodes) == len(set(nodes))
+    n_nodes_per_order = 2 if model_type == ModelType.live else 1
+    assert len(nodes) == (12 - len(plan["unassigned"])) * n_nodes_per_order
+    for route in plan["routes"]:
+        feasible, _ = evaluate_routes(data, parameters, np.array([[data["depot"]] + route]))
+        assert feasible.all()
+
+
+def solved_plan(df, parameters):
+    data = create_data_model_from_dataframe(df, parameters)
+    return create_plan(data, parameters, model_factory(data, parameters).solve())
+
+
+@pytest.mark.parametrize("model_type", MODEL_TYPES)
+def test_bundled_orders_in_same_route(model_type):
+    df = generate_orders(12, seed=2)
+    parameters = create_parameters(model_type)
+    plan = solved_plan(df.iloc[:8], parameters)
+    new_orders = df.iloc[8:].assign(bundle_id=[1, 2, 1, 3])
+    # the bundled orders go to a nearby address at the same time, the others are not bundled
+    columns = ["delivery_lat", "time_window_start_s", "time_window_end_s"]
+    new_orders.loc[new_orders.index[2], columns] = new_orders.loc[new_orders.index[0], columns]
+
+    insert_orders(plan, new_orders)
+
+    bundle = plan["data"]["on_the_way_bundles"][-1]
+    assert len(bundle) == 2
+    names = plan["data"]["node_names"][-4:]
+    assert plan["inserted"][names[0]] == plan["inserted"][names[2]]
+    assert set(bundle) <= set(plan["routes"][plan["inserted"][names[0]]])
+
+
+def test_infeasible_bundle_is_unassigned():
+    df = generate_orders(12, seed=2)
+    parameters = create_parameters(ModelType.scheduled)
+    plan = solved_plan(df.iloc[:8], parameters)
+    routes = [list(route) for route in plan["routes"]]
+    new_orders = df.iloc[8:10].assign(bundle_id=1, time_window_start_s=[40000, 80000])
+    new_orders["time_window_end_s"] = new_orders["time_window_start_s"] + 600
+
+    insert_orders(plan, new_orders)
+
+    assert plan["inserted"] == dict() and len(plan["unassigned"]) == 2
+    assert plan["routes"] == routes
+
+
+@pytest.mark.parametrize("model_type", MODEL_TYPES)
+def test_reoptimize_starts_from_insertion(model_type):
+    df = generate_orders(12, seed=1)
+    parameters = create_parameters(model_type)
+    plan = insert_orders(solved_plan(df.iloc[:8], parameters), df.iloc[8:])
+
+    result = reoptimize_plan(plan, max_calc_time=1).result()
+
+    assert result["solver"]["initial_solution_used"]
+    assert result["summary"]["num_vehicles_used"] <= len(plan["routes"])
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cvrptw.instance_generator import generate_orders, orders_per_store
+from cvrptw.solver import run_solve_from_dataframe
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+
+def test_same_seed_same_orders():
+    pd.testing.assert_frame_equal(generate_orders(50, seed=3), generate_orders(50, seed=3))
+    assert not generate_orders(50, seed=3).equals(generate_orders(50, seed=4))
+
+
+def test_time_windows_and_weights():
+    df = generate_orders(200, seed=0, spatial="clustered", time_window_profile="uniform")
+    assert (df["time_window_start_s"] >= 11 * 3600).all()
+    assert (df["time_window_end_s"] - df["time_window_start_s"] == 30 * 60).all()
+    assert (df["pickup_time_window_start_s"] <= df["time_window_start_s"]).all()
+    assert (df["order_number_items"] >= 1).all() and (df["weight"] > 0).all()
+    assert "bundle_id" not in df.columns
+
+
+def test_bundles_have_one_store():
+    df = generate_orders(100, seed=1, n_stores=3, bundle_fraction=0.5, bundle_size=3)
+    assert df["bundle_id"].nunique() < len(df)
+    assert (df.groupby("bundle_id")["store_address_id"].nunique() == 1).all()
+    assert (df.groupby("bundle_id").size() <= 3).all()
+
+
+def test_orders_per_store():
+    df = generate_orders(60, seed=2, n_stores=3)
+    stores = orders_per_store(df)
+    assert sum(len(df_store) for df_store in stores.values()) == len(df)
+    for df_store in stores.values():
+        assert df_store[["pickup_lat", "pickup_lon"]].nunique().max() == 1
+
+
+@pytest.mark.parametrize("model_type", [ModelType.scheduled, ModelType.live])
+def test_solve_with_default_parameters(model_type):
+    df = generate_orders(20, seed=0)
+    result = run_solve_from_dataframe(df, VRPParameters(model_type, max_calc_time=1), show=False)
+    assert result["solver"]["status_code"] in (1, 2, 7)
+    n_delivered = sum(len(route["route"]) - 1 for route in result["routes"])
+    n_orders = len(df) - result["filter"]["n_filtered"]
+    assert n_delivered == n_orders * (2 if model_type == ModelType.live else 1)
+    assert np.isfinite(result["summary"]["total_cost"])
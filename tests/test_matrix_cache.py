@@ -0,0 +1,71 @@
+from multiprocessing import Pool
+
+import numpy as np
+
+from cvrptw.distance import calculate_all_pairs_distances, coord_distance
+from cvrptw.matrix_cache import DistanceMatrixCache, entry_size
+
+LOCATIONS = 41.39 + np.random.default_rng(0).random((30, 2)) * 0.05
+
+
+def cached_shape(args):
+    cache_dir, n = args
+    cache = DistanceMatrixCache(cache_dir)
+    return cache.all_pairs_distances(LOCATIONS[:n], coord_distance).shape
+
+
+def test_cache_hit_returns_same_distances(tmp_path):
+    cache = DistanceMatrixCache(str(tmp_path))
+    first = np.array(cache.all_pairs_distances(LOCATIONS, coord_distance))
+    second = cache.all_pairs_distances(LOCATIONS, coord_distance)
+    np.testing.assert_allclose(second, first)
+    assert len(cache.read_index()) == 1
+
+
+def test_subset_is_reused(tmp_path):
+    cache = DistanceMatrixCache(str(tmp_path))
+    cache.all_pairs_distances(LOCATIONS[:10], coord_distance)
+    index = cache.read_index()
+    key, positions = cache.find_subset(index, LOCATIONS[::-1], "cvrptw.distance.coord_distance")
+    assert key in index
+    np.testing.assert_array_equal(positions, np.arange(29, 19, -1))
+
+    distances = cache.all_pairs_distances(LOCATIONS, coord_distance)
+    np.testing.assert_allclose(distances, calculate_all_pairs_distances(LOCATIONS, coord_distance))
+
+
+def test_same_locations_in_other_order_is_hit(tmp_path):
+    cache = DistanceMatrixCache(str(tmp_path))
+    cache.all_pairs_distances(LOCATIONS[:10], coord_distance)
+    reordered = LOCATIONS[[3, 1, 7, 0, 9, 2, 8, 4, 6, 5]]
+    distances = cache.all_pairs_distances(reordered, coord_distance)
+    np.testing.assert_allclose(distances, calculate_all_pairs_distances(reordered, coord_distance))
+    assert len(cache.read_index()) == 1
+
+
+def test_hit_updates_last_used_without_writing_index(tmp_path):
+    cache = DistanceMatrixCache(str(tmp_path))
+    cache.all_pairs_distances(LOCATIONS[:10], coord_distance)
+    cache.all_pairs_distances(LOCATIONS[10:20], coord_distance)
+    first, second = sorted(cache.read_index(), key=cache.last_used)
+    index_path = tmp_path / "index.json"
+    index_mtime = index_path.stat().st_mtime_ns
+
+    cache.all_pairs_distances(LOCATIONS[:10], coord_distance)
+    assert index_path.stat().st_mtime_ns == index_mtime
+    assert cache.last_used(first) >= cache.last_used(second)
+
+    # the least recently used matrix is evicted
+    cache.max_size_bytes = 2 * entry_size(10)
+    cache.all_pairs_distances(LOCATIONS[20:30], coord_distance)
+    index = cache.read_index()
+    assert first in index and second not in index
+    assert not (tmp_path / f"{second}_locations.npy").exists()
+
+
+def test_parallel_workers_keep_all_entries(tmp_path):
+    sizes = list(range(10, 26))
+    with Pool(4) as pool:
+        shapes = pool.map(cached_shape, [(str(tmp_path), n) for n in sizes])
+    assert shapes == [(n, n) for n in sizes]
+    assert len(DistanceMatrixCache(str(tmp_path)).read_index()) == len(sizes)
@@ -0,0 +1,39 @@
+import pytest
+
+from cvrptw.input_data_generator import create_data_model_from_dataframe
+from cvrptw.instance_generator import generate_orders
+from cvrptw.model_factory import model_factory
+from cvrptw.portfolio import is_better_result, portfolio_configurations, strategy_combinations
+from cvrptw.vrp_parameters import ConfigError, ModelType, VRPParameters
+
+
+def test_consecutive_workers_use_different_strategies():
+    combinations = strategy_combinations()
+    assert len(set(combinations)) == len(combinations)
+    configurations = portfolio_configurations(4)
+    strategies = [c.get("first_solution_strategy") for c in configurations]
+    metaheuristics = [c.get("local_search_metaheuristic") for c in configurations]
+    assert len(set(strategies)) == 4 and len(set(metaheuristics)) == 4
+
+
+def test_partial_solutions_are_compared():
+    partial = {"routes": [], "summary": {"total_cost": 10}, "solver": {"status_code": 2}}
+    success = {"routes": [], "summary": {"total_cost": 20}, "solver": {"status_code": 1}}
+    assert is_better_result(partial, success)
+    assert not is_better_result({"solver": {"status_code": 3}}, success)
+    assert is_better_result(success, {"solver": {"status_code": 3}})
+
+
+def test_solve_portfolio():
+    parameters = VRPParameters(ModelType.scheduled, max_calc_time=1, n_portfolio_workers=2)
+    data = create_data_model_from_dataframe(generate_orders(10, seed=0), parameters)
+    result = model_factory(data, parameters).solve()
+    assert "routes" in result
+    assert len(result["solver"]["portfolio"]) == 2
+
+
+def test_portfolio_requires_max_calc_time():
+    parameters = VRPParameters(ModelType.scheduled, max_calc_time=0, n_portfolio_workers=2)
+    data = create_data_model_from_dataframe(generate_orders(10, seed=0), parameters)
+    with pytest.raises(ConfigError):
+        model_factory(data, parameters).solve()
@@ -0,0 +1,73 @@
+import pytest
+
+from cvrptw import vrp_model
+from cvrptw.input_data_generator import create_data_model_from_dataframe
+from cvrptw.instance_generator import generate_orders
+from cvrptw.model_factory import model_factory
+from cvrptw.process_solution import process_solution_data
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+FIELDS = ["time", "distance", "cost", "load", "weight"]
+
+
+def baseline_routes(solution, model) -> list:
+    """The nodes of the routes, walking the solution and calling the solver for each arc."""
+    routing, data = model.routing, model.data
+    has_time_dimension = model.model_type != ModelType.distance
+    time_dimension = routing.GetDimensionOrDie("Time") if has_time_dimension else None
+    routes = []
+    for vehicle_id in range(data["num_vehicles"]):
+        index = routing.Start(vehicle_id)
+        if routing.IsEnd(solution.Value(routing.NextVar(index))):
+            continue
+        route = []
+        accumulated = {field: 0 for field in FIELDS}
+        previous_index = previous_node = None
+        while not routing.IsEnd(index):
+            node = model.manager.IndexToNode(index)
+            values = {field: 0 for field in FIELDS}
+            values["load"] = data["number_of_items"][node]
+            values["weight"] = data["weights"][node] if "weights" in data else 0
+            if previous_index is not None:
+                values["time"] = data["time_matrix"][previous_node][node]
+                values["distance"] = data["distance_matrix"][previous_node][node]
+                values["cost"] = routing.GetArcCostForVehicle(previous_index, index, vehicle_id)
+            node_values = {"node_index": node, "node_name": data["node_names"][node]}
+            for field in FIELDS:
+                accumulated[field] += values[field]
+                node_values[field] = values[field]
+                node_values[f"{field}_accumulated"] = accumulated[field]
+            if has_time_dimension:
+                time_var = time_dimension.CumulVar(index)
+                node_values["time_start"] = solution.Min(time_var)
+                node_values["time_end"] = solution.Max(time_var)
+            route.append(node_values)
+            previous_index, previous_node = index, node
+            index = solution.Value(routing.NextVar(index))
+        routes.append(route)
+    return routes
+
+
+@pytest.mark.parametrize("columnar_solution", [False, True])
+@pytest.mark.parametrize(
+    "model_type", [ModelType.distance, ModelType.time, ModelType.scheduled, ModelType.live]
+)
+def test_solution_same_as_baseline(monkeypatch, model_type, columnar_solution):
+    baselines = []
+
+    def process_solution(solution, model):
+        baselines.append(baseline_routes(solution, model))
+        return process_solution_data(solution, model)
+
+    monkeypatch.setattr(vrp_model, "process_solution_data", process_solution)
+    parameters = VRPParameters(model_type, max_calc_time=1, columnar_solution=columnar_solution)
+    data = create_data_model_from_dataframe(generate_orders(20, seed=0), parameters)
+    result = model_factory(data, parameters).solve()
+
+    assert len(baselines) == 1 and len(result["routes"]) == len(baselines[0])
+    for route, expected in zip(result["routes"], baselines[0]):
+        nodes = [{key: node[key] for key in expected[0]} for node in route["route"]]
+        assert nodes == expected
+    for field in FIELDS:
+        expected_total = sum(route[-1][f"{field}_accumulated"] for route in baselines[0])
+        assert result["summary"][f"total_{field}"] == pytest.approx(expected_total)
@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from cvrptw.solver import run_solve_from_file
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+INPUT_FILE = os.path.join(os.path.dirname(__file__), "realistic_10_orders.csv")
+PHASES = ["filtering", "matrices", "model", "search", "process_solution"]
+
+
+def solve(model_type: ModelType, profile_phases: bool) -> dict:
+    parameters = VRPParameters(model_type, max_calc_time=1, profile_phases=profile_phases)
+    return run_solve_from_file(INPUT_FILE, None, parameters, show=False, graph=False)
+
+
+@pytest.mark.parametrize("model_type", [ModelType.scheduled, ModelType.live])
+def test_phases_are_measured(model_type):
+    phases = solve(model_type, True)["solver"]["phases"]
+    assert set(PHASES) <= set(phases)
+    for name in PHASES:
+        assert phases[name]["wall_time"] >= 0 and phases[name]["cpu_time"] >= 0
+        assert phases[name]["peak_memory_mb"] >= 0
+    assert phases["first_solution"]["wall_time"] >= 0
+
+
+def test_no_phases_without_profiling():
+    assert "phases" not in solve(ModelType.scheduled, False)["solver"]
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from cvrptw.distance import coord_distance, euclidean_distance
+from cvrptw.quick_vrp import QuickVRP
+
+RNG = np.random.default_rng(0)
+VISITS = [tuple(location) for location in 41.39 + RNG.random((12, 2)) * 0.05]
+STORES = [tuple(location) for location in 41.39 + RNG.random((3, 2)) * 0.05]
+
+
+def baseline_cost_matrix(vrp: QuickVRP) -> np.ndarray:
+    """The cost matrix calculated per cell."""
+    n_start_locations = vrp.n_start_locations
+    cost_mat = np.zeros((vrp.n_items, vrp.n_items))
+    for i in range(vrp.n_items):
+        for j in range(vrp.n_items):
+            if i == j:
+                continue
+            if i < n_start_locations:
+                if n_start_locations == 1:
+                    cost_mat[i, j] = vrp.dist_func(vrp.start_location, vrp.visit_locations[j - 1])
+                else:
+                    cost_mat[i, j] = vrp.dist_func(
+                        vrp.start_location[i], vrp.visit_locations[j - n_start_locations]
+                    )
+            elif j < n_start_locations:
+                # don't count going back
+                cost_mat[i, j] = 0
+            else:
+                cost_mat[i, j] = (
+                    vrp.dist_func(
+                        vrp.visit_locations[i - n_start_locations],
+                        vrp.visit_locations[j - n_start_locations],
+                    )
+                    + vrp.extra_cost_per_visit
+                )
+    return cost_mat
+
+
+@pytest.mark.parametrize("dist_func, scale", [(coord_distance, 1), (euclidean_distance, 1e4)])
+@pytest.mark.parametrize("multi_pickup", [False, True])
+def test_cost_matrix_same_as_baseline(dist_func, scale, multi_pickup):
+    visits = [(lat * scale, lon * scale) for lat, lon in VISITS]
+    stores = [(lat * scale, lon * scale) for lat, lon in STORES]
+    start_location = [stores[i % 3] for i in range(len(visits))] if multi_pickup else stores[0]
+    vrp = QuickVRP(start_location, visits, dist_func, extra_cost_per_visit=60)
+    np.testing.assert_allclose(vrp.cost_matrix(), baseline_cost_matrix(vrp), rtol=1e-9)
@@ -0,0 +1,42 @@
+import json
+import os
+
+import pytest
+
+from cvrptw.result_io import RESULT_FORMATS, load_result, save_result
+from cvrptw.solver import run_solve_from_file
+from cvrptw.utils import ResultEncoder
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+INPUT_FILE = os.path.join(os.path.dirname(__file__), "realistic_10_orders.csv")
+
+
+def solve(model_type: ModelType, columnar_solution: bool) -> dict:
+    parameters = VRPParameters(model_type, max_calc_time=1, columnar_solution=columnar_solution)
+    return run_solve_from_file(INPUT_FILE, None, parameters, show=False, graph=False)
+
+
+@pytest.mark.parametrize("result_format", RESULT_FORMATS)
+@pytest.mark.parametrize("columnar_solution", [False, True])
+@pytest.mark.parametrize("model_type", [ModelType.scheduled, ModelType.live])
+def test_round_trip(tmp_path, result_format, columnar_solution, model_type):
+    result = solve(model_type, columnar_solution)
+    out_file = save_result(result, str(tmp_path / "result"), result_format)
+    loaded = load_result(out_file)
+
+    expected = json.loads(json.dumps(result, cls=ResultEncoder))
+    if result_format == "npz" and columnar_solution:
+        # the route columns are stored as arrays
+        expected.pop("route_columns")
+        loaded.pop("route_columns")
+        loaded = json.loads(json.dumps(loaded, cls=ResultEncoder))
+    assert loaded == expected
+
+
+def test_compact_json(tmp_path):
+    result = solve(ModelType.scheduled, False)
+    out_file = save_result(result, str(tmp_path / "result"), "compact_json")
+    with open(out_file) as f:
+        text = f.read()
+    assert "\n" not in text and ", " not in text
+    assert json.loads(text)["summary"] == result["summary"]
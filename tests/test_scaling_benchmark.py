@@ -0,0 +1,24 @@
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+from vrp_scaling_benchmark import (
+    PHASES,
+    compare_with_baseline,
+    fit_exponents,
+    median_times,
+    run_ladder,
+)
+
+
+def test_tiny_ladder():
+    parameters = VRPParameters(ModelType.scheduled, max_calc_time=1)
+    runs = run_ladder([5, 10], ["uniform:wide", "clustered:tight"], parameters, 1, seed=0)
+    assert len(runs) == 4
+    assert all(run["status_code"] in (1, 2) for run in runs)
+
+    medians = median_times(runs)
+    assert set(medians) == {"uniform:wide", "clustered:tight"}
+    assert set(medians["uniform:wide"]) == {"5", "10"}
+    exponents = fit_exponents(medians)
+    assert set(exponents["uniform:wide"]) == set(PHASES)
+
+    report = {"medians": medians}
+    assert compare_with_baseline(report, report, tolerance=0.25) == []
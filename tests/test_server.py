@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from cvrptw import server
+from cvrptw.server import SolveServer, validate_orders
+from cvrptw.vrp_parameters import VRPParameters
+
+ORDERS = [
+    {
+        "order_id": i,
+        "pickup_lat": 52.3702,
+        "pickup_lon": 4.8952,
+        "delivery_lat": 52.3702 + 0.002 * i,
+        "delivery_lon": 4.8952,
+        "order_number_items": 1,
+        "weight": 1,
+        "time_window_start_s": 3600,
+        "time_window_end_s": 7200,
+        "pickup_time_window_start_s": 0,
+        "pickup_time_window_end_s": 3600,
+    }
+    for i in range(1, 4)
+]
+JOB = {"orders": ORDERS, "parameters": {"model_type": "scheduled", "max_calc_time": 1}}
+
+
+def slow_job(orders, parameters_data):
+    time.sleep(0.5)
+    return {"solver": {"status": "1-success"}}
+
+
+def crashing_job(orders, parameters_data):
+    os._exit(1)
+
+
+def quick_job(orders, parameters_data):
+    return {"solver": {"status": "1-success"}}
+
+
+def test_timed_out_job_is_counted_until_finished(monkeypatch):
+    monkeypatch.setattr(server, "solve_job", slow_job)
+    monkeypatch.setattr(server, "DEADLINE_GRACE_TIME", 0)
+
+    async def run():
+        solve_server = SolveServer(1, max_queued_jobs=1, default_deadline=None)
+        solve_server.executor = ThreadPoolExecutor(max_workers=1)
+        status, _ = await solve_server.solve({**JOB, "deadline": 0.1})
+        assert status == HTTPStatus.GATEWAY_TIMEOUT
+        # the worker is still busy with the job, new jobs are refused
+        assert solve_server.n_jobs == 1
+        status, _ = await solve_server.solve(JOB)
+        assert status == HTTPStatus.SERVICE_UNAVAILABLE
+
+        await asyncio.sleep(0.6)
+        assert solve_server.n_jobs == 0
+        status, result = await solve_server.solve(JOB)
+        assert status == HTTPStatus.OK and result["solver"]["status"] == "1-success"
+        assert solve_server.n_jobs == 0
+        solve_server.executor.shutdown()
+
+    asyncio.run(run())
+
+
+def test_solve_request():
+    async def run():
+        solve_server = SolveServer(1, max_queued_jobs=1, default_deadline=None)
+        solve_server.start_workers()
+        status, result = await solve_server.handle_request("POST", "/solve", json.dumps(JOB))
+        solve_server.executor.shutdown()
+        assert status == HTTPStatus.OK
+        assert result["summary"]["num_vehicles_used"] >= 1
+
+    asyncio.run(run())
+
+
+def test_invalid_orders_are_refused():
+    live_job = {**JOB, "parameters": {"model_type": "live", "max_calc_time": 1}}
+    without_pickup_time = [
+        {k: v for k, v in order.items() if k != "pickup_time_window_end_s"} for order in ORDERS
+    ]
+
+    async def run():
+        solve_server = SolveServer(1, max_queued_jobs=1, default_deadline=None)
+        for job in [
+            {**JOB, "orders": {"order_id": 1}},
+            {**JOB, "orders": []},
+            {**JOB, "orders": [1, 2]},
+            {**JOB, "orders": [{**ORDERS[0], "delivery_lat": "north"}]},
+            {**live_job, "orders": without_pickup_time},
+        ]:
+            status, result = await solve_server.solve(job)
+            assert status == HTTPStatus.BAD_REQUEST and "invalid orders" in result["error"]
+        # the pickup time windows are only required for the live model
+        assert validate_orders(without_pickup_time, VRPParameters.create(JOB["parameters"])) is None
+
+    asyncio.run(run())
+
+
+def test_workers_restarted_after_crash(monkeypatch):
+    async def run():
+        solve_server = SolveServer(1, max_queued_jobs=2, default_deadline=None)
+        solve_server.start_workers()
+        executor = solve_server.executor
+        monkeypatch.setattr(server, "solve_job", crashing_job)
+        status, _ = await solve_server.solve(JOB)
+        assert status == HTTPStatus.INTERNAL_SERVER_ERROR
+        assert solve_server.executor is not executor
+
+        monkeypatch.setattr(server, "solve_job", quick_job)
+        status, result = await solve_server.solve(JOB)
+        solve_server.executor.shutdown()
+        assert status == HTTPStatus.OK and result["solver"]["status"] == "1-success"
+        assert solve_server.n_jobs == 0
+
+    asyncio.run(run())
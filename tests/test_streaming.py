@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import time
+
+from cvrptw.input_data_generator import create_data_model_from_dataframe
+from cvrptw.instance_generator import generate_orders
+from cvrptw.model_factory import model_factory
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+# the metaheuristic keeps finding solutions until the time limit
+SEARCH_PARAMETERS = VRPParameters(
+    ModelType.scheduled, max_calc_time=2, local_search_metaheuristic="GUIDED_LOCAL_SEARCH"
+)
+
+
+def create_model(parameters: VRPParameters = SEARCH_PARAMETERS):
+    data = create_data_model_from_dataframe(generate_orders(30, seed=0), parameters)
+    return model_factory(data, parameters)
+
+
+def route_names(result: dict):
+    return [[node["node_name"] for node in route["route"]] for route in result["routes"]]
+
+
+def solver_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "solve_iter"]
+
+
+def test_solve_iter_improves_until_final_result():
+    results = list(create_model().solve_iter())
+    assert len(results) > 1
+    objectives = [result["solver"]["objective"] for result in results[:-1]]
+    assert all(a > b for a, b in zip(objectives, objectives[1:]))
+    assert all(result["solver"]["status"] == "searching" for result in results[:-1])
+    final = results[-1]
+    assert final["solver"]["status"] != "searching" and "objective" not in final["solver"]
+    assert final["summary"]["total_cost"] <= results[0]["summary"]["total_cost"]
+
+
+def test_solve_async_same_as_solve():
+    # without metaheuristic the search is deterministic
+    parameters = VRPParameters(ModelType.scheduled, max_calc_time=2)
+
+    async def run():
+        return [result async for result in create_model(parameters).solve_async()]
+
+    results = asyncio.run(run())
+    expected = create_model(parameters).solve()
+    assert route_names(results[-1]) == route_names(expected)
+    assert results[-1]["summary"] == expected["summary"]
+
+
+def test_solver_thread_ends_when_consumer_stops():
+    results = create_model().solve_iter()
+    first = next(results)
+    assert first["solver"]["n_solutions"] == 1
+    assert len(solver_threads()) == 1
+    results.close()
+    # the search is finished at the next solution, well before the time limit
+    t = time.time()
+    while solver_threads() and time.time() - t < 1:
+        time.sleep(0.01)
+    assert solver_threads() == []
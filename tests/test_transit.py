@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from cvrptw.input_data_generator import create_data_model_from_csv_file
+from cvrptw.model_factory import model_factory
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+INPUT_FILE = os.path.join(os.path.dirname(__file__), "example_3_orders_input.csv")
+MATRICES = ["distance_matrix", "time_matrix", "cost_matrix"]
+
+
+def solve(model_type: ModelType, use_transit_matrices: bool):
+    parameters = VRPParameters(
+        model_type, max_calc_time=1, use_transit_matrices=use_transit_matrices
+    )
+    model = model_factory(create_data_model_from_csv_file(INPUT_FILE, parameters), parameters)
+    return model, model.solve()
+
+
+def route_names(result: dict):
+    return [[node["node_name"] for node in route["route"]] for route in result["routes"]]
+
+
+@pytest.mark.parametrize("model_type", [ModelType.distance, ModelType.time, ModelType.live])
+def test_transit_matrices_same_as_callbacks(model_type):
+    model, result = solve(model_type, True)
+    assert any(model.use_transit_matrix(field) for field in MATRICES if field in model.data)
+    _, expected = solve(model_type, False)
+    assert result["summary"] == expected["summary"]
+    assert route_names(result) == route_names(expected)
@@ -1,8 +1,10 @@
 import argparse
-import os
-import shutil
+import json
+import multiprocessing as mp
 import time
 import uuid
+from multiprocessing.connection import Connection, wait
+from typing import Dict, List, Optional, Tuple
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -10,7 +12,9 @@ import pandas as pd
 import seaborn as sns
 from haversine import Unit, haversine
 
-from cvrptw.solver import run_solve_from_file
+from cvrptw.instance_generator import generate_orders
+from cvrptw.solver import run_solve_from_dataframe
+from cvrptw.utils import ResultEncoder
 from cvrptw.vrp_parameters import ModelType, VRPParameters
 
 DELIVERY_COLS = ["delivery_lat", "delivery_lon"]
@@ -171,83 +175,176 @@ def randomized_data(n: int, df: pd.DataFrame):
 
 
 def run_vrp(df: pd.DataFrame, parameters: VRPParameters, save_input_when_fail):
-    name = "_temp_input_" + str(uuid.uuid4()) + "_" + parameters.model_type.name
-    temp_input_csv_file = name + ".csv"
-    save_data(df, temp_input_csv_file)
+    """
+    Solve the orders in memory. The input is only saved (as csv) if it failed to solve and
+    save_input_when_fail is set. The time to save it, to build the models and to solve is
+    added to the solver results (io_duration, build_duration and duration).
+    """
     assert not df.empty
-    output_file = name + "_out"
-
-    results = run_solve_from_file(
-        temp_input_csv_file,
-        output_file,
-        parameters,
-        show=False,
-        graph=False,
-    )
-
-    if save_input_when_fail and results["solver"]["status_code"] != 1:
-        error_csv_file = "_" + results["solver"]["status"] + "_" + temp_input_csv_file
-        print(
-            f"Failed to find a solution {results['solver']['status']}, "
-            f"saving as {error_csv_file}"
+    # same index as when read from a csv file
+    df = df.reset_index(drop=True)
+    results = run_solve_from_dataframe(df, parameters, show=False, graph=False)
+    solver_results = results["solver"]
+    build_durations = [solver_results.get(k, 0) for k in ["data_model_duration", "model_duration"]]
+    solver_results["build_duration"] = sum(build_durations)
+
+    t = time.time()
+    if save_input_when_fail and solver_results.get("status_code") != 1:
+        error_csv_file = (
+            f"_{solver_results['status']}_input_{uuid.uuid4()}_{parameters.model_type.name}.csv"
         )
-        shutil.copy(temp_input_csv_file, error_csv_file)
-
-    os.remove(temp_input_csv_file)
+        print(f"Failed to find a solution {solver_results['status']}, saving as {error_csv_file}")
+        save_data(df, error_csv_file)
+    solver_results["io_duration"] = time.time() - t
 
     return results
 
 
 def run_vrp_w_random_data(
-    df_base: pd.DataFrame,
+    df_base: Optional[pd.DataFrame],
     parameters: VRPParameters,
     n: int,
     save_input_when_fail,
 ):
-    df_rand = randomized_data(n, df_base)
+    if df_base is None:
+        df_rand = generate_orders(n, seed=np.random.randint(2**31))
+    else:
+        df_rand = randomized_data(n, df_base)
     return run_vrp(df_rand, parameters, save_input_when_fail)
 
 
+def benchmark_run(
+    df_base: Optional[pd.DataFrame],
+    parameters: VRPParameters,
+    n: int,
+    iteration: int,
+    seed: int,
+    save_input_when_fail,
+) -> dict:
+    """Solve one random problem of n orders (with the seed), returns the meta results."""
+    this_meta = {"n_orders": n, "iteration": iteration, "seed": seed}
+    np.random.seed(seed)
+    try:
+        result = run_vrp_w_random_data(df_base, parameters, n, save_input_when_fail)
+        meta_res = {
+            **result["solver"],
+            **result.get("meta", {}),
+            **result.get("summary", {}),
+            **result.get("filter", {}),
+        }
+    except Exception as e:
+        print("Exception:", e)
+        msg = e.message if hasattr(e, "message") else str(e)
+        meta_res = {"status_code": -1, "status": "exception", "exception": msg}
+    return {**this_meta, **meta_res}
+
+
+def benchmark_worker(connection, *args):
+    """Run `benchmark_run` in a separate process and send the meta results."""
+    connection.send(benchmark_run(*args))
+    connection.close()
+
+
+def append_result(results_store: Optional[str], meta_res: dict):
+    """Append the meta results of a run as a line to the jsonl results store."""
+    if results_store is None:
+        return
+    with open(results_store, "a") as f:
+        f.write(json.dumps(meta_res, cls=ResultEncoder) + "\n")
+
+
+def benchmark_runs(order_nums, n_repeats, seed: int) -> List[Tuple[int, int, int]]:
+    """All runs (n orders, iteration, seed), each run has its own seed."""
+    runs = [(n, i) for n in order_nums for i in range(n_repeats)]
+    return [(n, i, seed + run_index) for run_index, (n, i) in enumerate(runs)]
+
+
 def run_diff_nums(
-    df_base: pd.DataFrame,
+    df_base: Optional[pd.DataFrame],
     parameters: VRPParameters,
     order_nums,
     n_repeats,
     save_input_when_fail,
+    seed: int = 0,
+    results_store: Optional[str] = None,
 ):
     meta_res_list = []
-    for n in order_nums:
-        for i in range(n_repeats):
-            this_meta = {"n_orders": n, "iteration": i}
-            try:
-                result = run_vrp_w_random_data(
-                    df_base,
-                    parameters,
-                    n,
-                    save_input_when_fail,
-                )
-                meta_res = {
-                    **result["solver"],
-                    **result.get("meta", {}),
-                    **result.get("summary", {}),
-                    **result.get("filter", {}),
-                }
-            except Exception as e:
-                print("Exception:", e)
-                msg = e.message if hasattr(e, "message") else str(e)
-                meta_res = {"status_code": -1, "status": "exception", "exception": msg}
-
-            meta_res_list.append({**this_meta, **meta_res})
-            pd.DataFrame(meta_res_list).to_csv("_out_meta_tmp.csv")
+    for n, i, run_seed in benchmark_runs(order_nums, n_repeats, seed):
+        meta_res = benchmark_run(df_base, parameters, n, i, run_seed, save_input_when_fail)
+        meta_res_list.append(meta_res)
+        append_result(results_store, meta_res)
 
     return meta_res_list
 
 
+def run_diff_nums_parallel(
+    df_base: Optional[pd.DataFrame],
+    parameters: VRPParameters,
+    order_nums,
+    n_repeats,
+    save_input_when_fail,
+    n_jobs: int,
+    run_timeout: float,
+    seed: int = 0,
+    results_store: Optional[str] = None,
+):
+    """
+    Same as `run_diff_nums` but with n_jobs runs in parallel, each in its own process such that
+    a crash of the solver only fails that run. Runs taking more than run_timeout seconds are
+    stopped. The results store has the runs in the order in which they finished.
+    """
+    pending = benchmark_runs(order_nums, n_repeats, seed)
+    running: Dict[mp.Process, Tuple[dict, Connection, float]] = dict()
+    meta_res_list = []
+    while pending or running:
+        while pending and len(running) < n_jobs:
+            n, i, run_seed = pending.pop(0)
+            receiver, sender = mp.Pipe(duplex=False)
+            process = mp.Process(
+                target=benchmark_worker,
+                args=(sender, df_base, parameters, n, i, run_seed, save_input_when_fail),
+                daemon=True,
+            )
+            process.start()
+            sender.close()
+            this_meta = {"n_orders": n, "iteration": i, "seed": run_seed}
+            running[process] = (this_meta, receiver, time.time())
+
+        wait([receiver for _, receiver, _ in running.values()], timeout=1)
+        for process, (this_meta, receiver, start_time) in list(running.items()):
+            alive = process.is_alive()
+            if receiver.poll():
+                try:
+                    meta_res = receiver.recv()
+                except EOFError:
+                    meta_res = {**this_meta, "status_code": -1, "status": "crashed"}
+            elif not alive:
+                meta_res = {**this_meta, "status_code": -1, "status": "crashed"}
+            elif time.time() - start_time > run_timeout:
+                process.kill()
+                meta_res = {**this_meta, "status_code": -1, "status": "timeout"}
+            else:
+                continue
+
+            process.join()
+            receiver.close()
+            if meta_res["status"] == "crashed":
+                meta_res["exit_code"] = process.exitcode
+            del running[process]
+            print(f"Run n={this_meta['n_orders']} #{this_meta['iteration']}: {meta_res['status']}")
+            meta_res_list.append(meta_res)
+            append_result(results_store, meta_res)
+
+    return sorted(meta_res_list, key=lambda m: (m["n_orders"], m["iteration"]))
+
+
 def print_results(df_meta: pd.DataFrame):
     pd.set_option("display.max_columns", 50)
     COLS_TO_SHOW = [
         "n_orders",
         "iteration",
+        "io_duration",
+        "build_duration",
         "duration",
         "status_code",
         "n_max_courier",
@@ -272,8 +369,7 @@ def main():
         "-i",
         "--input",
         default=None,
-        required=True,
-        help="Input csv file, or random example if not set.",
+        help="Input csv file, synthetic orders (see cvrptw.instance_generator) if not set.",
     )
     arg_parser.add_argument(
         "-o",
@@ -322,6 +418,13 @@ def main():
         action="store_true",
         help="Filter the data and create the time windows.",
     )
+    arg_parser.add_argument(
+        "-dc",
+        "--distance-cache",
+        default=None,
+        type=str,
+        help="Directory to cache the distance matrices.",
+    )
     arg_parser.add_argument(
         "-sf",
         "--save-failed",
@@ -329,6 +432,30 @@ def main():
         action="store_true",
         help="Save input when failed to solve.",
     )
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        default=1,
+        type=int,
+        help="Number of runs in parallel, each in a separate process.",
+    )
+    arg_parser.add_argument(
+        "--run-timeout",
+        default=None,
+        type=float,
+        help="Stop a parallel run after this time (s), default: 2 * max-calc-time + 60.",
+    )
+    arg_parser.add_argument(
+        "--seed",
+        default=None,
+        type=int,
+        help="Seed of the first run, the next runs use the next seeds (random if not set).",
+    )
+    arg_parser.add_argument(
+        "--results-store",
+        default="_out_meta_tmp.jsonl",
+        help="Jsonl file to which the results of each run are appended.",
+    )
     args = arg_parser.parse_args()
 
     print("CVRPTW")
@@ -343,25 +470,46 @@ def main():
         print(f"n {args.n} > n-max {args.n_max} is not valid")
         return
 
-    print(f"Reading {args.input}...")
-    input_df = read_file(
-        args.input, bin_duration=60 * 30, do_filter=args.filter, add_meta=args.filter
-    )
-    if args.filter:
-        input_df = filter_data2(input_df)
+    input_df = None
+    if args.input:
+        print(f"Reading {args.input}...")
+        input_df = read_file(
+            args.input, bin_duration=60 * 30, do_filter=args.filter, add_meta=args.filter
+        )
+        if args.filter:
+            input_df = filter_data2(input_df)
 
     model_type = ModelType[args.model]
-    vrp_parameters = VRPParameters(model_type, max_calc_time=args.max_calc_time)
+    vrp_parameters = VRPParameters(
+        model_type, max_calc_time=args.max_calc_time, distance_cache_dir=args.distance_cache
+    )
 
-    print("Running benchmark...")
+    seed = args.seed if args.seed is not None else np.random.randint(2**30)
+    print(f"Running benchmark (seed {seed}; {args.jobs} jobs)...")
     start_time = time.time()
-    meta_results = run_diff_nums(
-        input_df,
-        vrp_parameters,
-        range(args.n, args.n_max + 1),
-        args.repeat,
-        args.save_failed,
-    )
+    if args.jobs > 1:
+        run_timeout = args.run_timeout or 2 * args.max_calc_time + 60
+        meta_results = run_diff_nums_parallel(
+            input_df,
+            vrp_parameters,
+            range(args.n, args.n_max + 1),
+            args.repeat,
+            args.save_failed,
+            args.jobs,
+            run_timeout,
+            seed,
+            args.results_store,
+        )
+    else:
+        meta_results = run_diff_nums(
+            input_df,
+            vrp_parameters,
+            range(args.n, args.n_max + 1),
+            args.repeat,
+            args.save_failed,
+            seed,
+            args.results_store,
+        )
     duration = time.time() - start_time
     print(f"Benchmark finished, took {duration:.2} s")
 
@@ -0,0 +1,250 @@
+"""
+Scaling benchmark: solve random problems of increasing size (an instance ladder) for several
+spatial and time window distributions, measure the time of each phase of the solve, and fit
+how each phase scales with the number of orders (time ~ n^exponent).
+
+The report (json) has all runs, the median time per phase, size and distribution, and the
+fitted exponents. When a baseline report is given, the phases are compared and the benchmark
+fails (exit code 1) when a phase is slower than the baseline beyond the tolerance.
+
+Phases (wall time in s, see `cvrptw.profiling`):
+- `data_model`: creating the data model (includes filtering and matrices),
+- `filtering`, `matrices`: filtering the orders and calculating the matrices,
+- `model`: building the OR-tools model,
+- `first_solution`: from the start of the search to the first solution,
+- `search`: the full search,
+- `process_solution`: post-processing the solution.
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from cvrptw.input_data_generator import create_random_data_model_test
+from cvrptw.model_factory import model_factory
+from cvrptw.utils import ResultEncoder
+from cvrptw.vrp_parameters import ModelType, VRPParameters
+
+LADDER = [10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+# (spatial distribution, time windows), see `create_random_data_model_test`
+DISTRIBUTIONS = ["uniform:wide", "uniform:tight", "clustered:wide", "clustered:tight"]
+PHASES = [
+    "data_model",
+    "filtering",
+    "matrices",
+    "model",
+    "first_solution",
+    "search",
+    "process_solution",
+]
+# phases faster than this (s) are not compared with the baseline, they are mostly noise
+MIN_COMPARED_TIME = 0.05
+
+
+def run_instance(
+    n: int, distribution: str, parameters: VRPParameters, seed: int, max_dist: int = 4000
+) -> dict:
+    """Solve one random problem and return the time per phase, status and objective."""
+    spatial, time_windows = distribution.split(":")
+    np.random.seed(seed)
+    parameters = replace(parameters, profile_phases=True)
+
+    t = time.perf_counter()
+    data = create_random_data_model_test(
+        n, n, parameters, max_dist=max_dist, xparam=int(time_windows == "tight"), spatial=spatial
+    )
+    data_model_time = time.perf_counter() - t
+    result = model_factory(data, parameters).solve()
+
+    phases = result["solver"].get("phases", {})
+    times = {name: phase["wall_time"] for name, phase in phases.items() if name in PHASES}
+    return {
+        "n_orders": n,
+        "distribution": distribution,
+        "seed": seed,
+        "status_code": result["solver"].get("status_code"),
+        "status": result["solver"]["status"],
+        "objective": result.get("summary", {}).get("total_cost"),
+        "num_vehicles_used": result.get("summary", {}).get("num_vehicles_used"),
+        "times": {"data_model": data_model_time, **times},
+    }
+
+
+def median_times(runs: List[dict]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Median time per distribution, number of orders (as str) and phase."""
+    grouped: Dict[str, Dict[str, Dict[str, List[float]]]] = dict()
+    for run in runs:
+        per_n = grouped.setdefault(run["distribution"], dict())
+        per_phase = per_n.setdefault(str(run["n_orders"]), dict())
+        for phase, value in run["times"].items():
+            per_phase.setdefault(phase, []).append(value)
+
+    return {
+        distribution: {
+            n: {phase: float(np.median(values)) for phase, values in per_phase.items()}
+            for n, per_phase in per_n.items()
+        }
+        for distribution, per_n in grouped.items()
+    }
+
+
+def fit_exponents(medians: dict) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Fit time = c * n^exponent per distribution and phase (least squares on log-log), None if
+    there are less than 2 sizes with a positive time.
+    """
+    exponents = dict()
+    for distribution, per_n in medians.items():
+        exponents[distribution] = dict()
+        for phase in PHASES:
+            points = [(int(n), t[phase]) for n, t in per_n.items() if t.get(phase, 0) > 0]
+            if len(points) < 2:
+                exponents[distribution][phase] = None
+                continue
+            n_orders, times = np.log(np.array(points, dtype=float)).T
+            exponents[distribution][phase] = float(np.polyfit(n_orders, times, 1)[0])
+    return exponents
+
+
+def compare_with_baseline(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """The phases that are slower than the baseline by more than the tolerance (fraction)."""
+    regressions = []
+    for distribution, per_n in report["medians"].items():
+        for n, times in per_n.items():
+            baseline_times = baseline["medians"].get(distribution, {}).get(n, {})
+            for phase, value in times.items():
+                if phase not in baseline_times or value < MIN_COMPARED_TIME:
+                    continue
+                if value > baseline_times[phase] * (1 + tolerance):
+                    regressions.append(
+                        f"{distribution} n={n} {phase}: {value:.3f} s "
+                        f"(baseline {baseline_times[phase]:.3f} s)"
+                    )
+    return regressions
+
+
+def run_ladder(
+    ladder: List[int],
+    distributions: List[str],
+    parameters: VRPParameters,
+    n_repeats: int,
+    seed: int,
+) -> List[dict]:
+    runs = []
+    for distribution in distributions:
+        for n in ladder:
+            for i in range(n_repeats):
+                run = run_instance(n, distribution, parameters, seed + len(runs))
+                times = ", ".join(f"{k}={v:.3f}" for k, v in run["times"].items())
+                print(f"{distribution} n={n} #{i}: {run['status']}; {times}")
+                runs.append(run)
+    return runs
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Scaling benchmark of the VRP models.")
+    arg_parser.add_argument(
+        "--model",
+        "-m",
+        default=ModelType.scheduled.name,
+        type=str,
+        choices=[m.name for m in ModelType],
+        help="Model type",
+    )
+    arg_parser.add_argument(
+        "--ladder",
+        default=",".join(map(str, LADDER)),
+        help="Comma separated numbers of orders.",
+    )
+    arg_parser.add_argument(
+        "--n-max",
+        default=None,
+        type=int,
+        help="Only use the numbers of orders of the ladder up to this number.",
+    )
+    arg_parser.add_argument(
+        "--distributions",
+        default=",".join(DISTRIBUTIONS),
+        help="Comma separated distributions (spatial:time_windows).",
+    )
+    arg_parser.add_argument(
+        "--repeat", "-r", default=1, type=int, help="Number of repeats per number of orders."
+    )
+    arg_parser.add_argument(
+        "--max-calc-time",
+        "-mx",
+        default=10,
+        type=int,
+        help="Maximum calculation time (seconds).",
+    )
+    arg_parser.add_argument(
+        "--estimate-fleet-size",
+        "-efs",
+        default=False,
+        action="store_true",
+        help="Create the model with the estimated number of vehicles.",
+    )
+    arg_parser.add_argument("--seed", default=0, type=int, help="Seed of the first run.")
+    arg_parser.add_argument(
+        "--output", "-o", default="scaling_report.json", help="Output report (json)."
+    )
+    arg_parser.add_argument(
+        "--baseline", "-b", default=None, help="Baseline report to compare the phases with."
+    )
+    arg_parser.add_argument(
+        "--tolerance",
+        default=0.25,
+        type=float,
+        help="Maximum slowdown (fraction) of a phase compared to the baseline.",
+    )
+    args = arg_parser.parse_args()
+
+    ladder = [int(n) for n in args.ladder.split(",")]
+    if args.n_max is not None:
+        ladder = [n for n in ladder if n <= args.n_max]
+    distributions = args.distributions.split(",")
+    parameters = VRPParameters(
+        ModelType[args.model],
+        max_calc_time=args.max_calc_time,
+        estimate_fleet_size=args.estimate_fleet_size,
+    )
+
+    print(f"Scaling benchmark of the {args.model} model: n={ladder}; {distributions}")
+    runs = run_ladder(ladder, distributions, parameters, args.repeat, args.seed)
+    medians = median_times(runs)
+    report = {
+        "model": args.model,
+        "parameters": parameters.to_dict(),
+        "runs": runs,
+        "medians": medians,
+        "exponents": fit_exponents(medians),
+    }
+
+    print("Scaling exponents (time ~ n^exponent):")
+    for distribution, exponents in report["exponents"].items():
+        values = ", ".join(f"{k}={v:.2f}" for k, v in exponents.items() if v is not None)
+        print(f" {distribution}: {values}")
+
+    print(f"Writing to {args.output} ...")
+    with open(args.output, "w") as f:
+        json.dump(report, f, cls=ResultEncoder, indent=4)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if len(regressions) > 0:
+            print(f"! {len(regressions)} phases regressed compared to {args.baseline}:")
+            for regression in regressions:
+                print(" ", regression)
+            sys.exit(1)
+        print(f"No regressions compared to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
-import json
 import sys
 from typing import List
 
+from cvrptw.result_io import load_result
+
 
 def in_time_window(t: int, t_window: List[int]) -> bool:
     if len(t_window) == 0:
@@ -72,20 +73,19 @@ def verify(data: dict) -> bool:
     return ok
 
 
-def verify_file(json_file: str) -> bool:
-    with open(json_file, "r") as f:
-        json_data = json.load(f)
-    return verify(json_data)
+def verify_file(result_file: str) -> bool:
+    """Verify a result file in any of the output formats (json or npz)."""
+    return verify(load_result(result_file))
 
 
 def main():
     if len(sys.argv) < 2:
-        print("Parameter required: solutions json file")
+        print("Parameter required: solutions file (json or npz)")
         return
 
-    json_file = sys.argv[1]
-    print(f"Verifying file {json_file}...")
-    result = verify_file(json_file)
+    result_file = sys.argv[1]
+    print(f"Verifying file {result_file}...")
+    result = verify_file(result_file)
 
     if result:
         print("Results comply with the constraints.")